@@ -0,0 +1,263 @@
+import argparse
+import datetime
+import numpy as np
+import os
+import pandas as pd
+import re
+import sys
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from config.config import (ITEM_MASTER_FILE, BP_CONTACT_FILE, SALES_ORDER_FILE, PURCHASE_ORDER_FILE, SALES_ORDER_LINE_FILE,
+                           SALES_ORDER_STATUS_FILE, BUSINESS_PARTNER_FILE, BP_ADDRESS_FILE, MANUFACTURER_FILE)
+
+# Writes a synthetic data set in the same tab-separated layout as the extracts data_import.py reads,
+# at any scale from a few thousand to tens of millions of rows. The scale is the number of sales
+# order lines, the largest file; the other files are sized in proportion (TABLE_RATIOS).
+# Every reference resolves: lines point at existing orders and items, orders at existing customers,
+# items and purchase orders at existing manufacturers. Order totals are summed from their lines,
+# and committed quantities and customer balances from the open orders.
+# Rows are drawn with NumPy a block of orders at a time, so memory stays flat however large the
+# scale, and the same seed always gives the same files.
+#     python data_generator.py 1M /tmp/erp_data [--seed 0] [--end-date 2026-06-30]
+#     DATA_FOLDER=/tmp/erp_data python erp.py import --full
+
+# Rows of each file per sales order line, and the fewest rows a file gets at small scales
+TABLE_RATIOS = {'manufacturers': 0.0001, 'customers': 0.01, 'items': 0.1, 'sales_orders': 0.25, 'purchase_orders': 0.02}
+MINIMUM_ROWS = {'manufacturers': 10, 'customers': 10, 'items': 20, 'sales_orders': 5, 'purchase_orders': 5}
+ORDERS_PER_BLOCK = 100000
+DATE_RANGE_DAYS = 3 * 365
+OPEN_ORDER_DAYS = 60
+TAX_PERCENT = 7.0
+FIRST_SALES_ORDER = 1000
+FIRST_PURCHASE_ORDER = 1000
+FIRST_CUSTOMER = 10001
+
+SCALE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)([km]?)$', re.IGNORECASE)
+SCALE_UNITS = {'': 1, 'k': 1000, 'm': 1000000}
+
+BRANDS = ['Hewlett Packard', 'IBM', 'Dell', 'Lenovo', 'Canon', 'Epson', 'Brother', 'Xerox', 'Samsung', 'Cisco',
+          'Netgear', 'Logitech', 'Acer', 'Asus', 'Toshiba', 'Ricoh', 'Kyocera', 'Lexmark', 'Sharp', 'Panasonic']
+ADJECTIVES = ['Compact', 'Wireless', 'Rugged', 'Portable', 'Industrial', 'Deluxe', 'Standard', 'Premium', 'Slim',
+              'Heavy Duty', 'Silent', 'Modular', 'Refurbished', 'Color', 'Mono', 'Networked']
+NOUNS = ['Printer', 'Scanner', 'Monitor', 'Keyboard', 'Router', 'Switch', 'Laptop', 'Toner', 'Drum', 'Projector',
+         'Docking Station', 'Cable', 'Adapter', 'Server', 'Workstation', 'Tablet', 'Headset', 'Webcam']
+FIRST_NAMES = ['Steve', 'Melissa', 'Chad', 'Shannon', 'Maria', 'James', 'Linda', 'Robert', 'Patricia', 'Michael',
+               'Jennifer', 'David', 'Susan', 'Thomas', 'Karen', 'Daniel', 'Nancy', 'Paul', 'Lisa', 'Mark']
+LAST_NAMES = ['Althardt', 'Meglen', 'Meholic', 'Ballantyne', 'Garcia', 'Smith', 'Johnson', 'Miller', 'Davis',
+              'Wilson', 'Moore', 'Taylor', 'Anderson', 'Thomas', 'Jackson', 'White', 'Harris', 'Martin', 'Clark']
+TITLES = ['President', 'CEO', 'Sales Rep', 'Buyer', 'Purchasing Manager', 'Office Manager', 'Controller', 'IT Director']
+COMPANY_SUFFIXES = ['Inc', 'LLC', 'Corp', 'Co', 'Group', 'Supply', 'Systems']
+STREETS = ['Summit Road', 'Low Pointe Circle', 'Holly Wood Drive', 'Main Street', 'Oak Avenue', 'Lake View Road',
+           'Market Street', 'Industrial Parkway', 'Maple Lane', 'Commerce Drive']
+CITIES = [('York', 'PA'), ('Rochester', 'NY'), ('Pittsburgh', 'PA'), ('Cleveland', 'OH'), ('Columbus', 'OH'),
+          ('Buffalo', 'NY'), ('Baltimore', 'MD'), ('Newark', 'NJ'), ('Richmond', 'VA'), ('Erie', 'PA')]
+SALES_ORDER_STATUSES = [('O', 'Open'), ('C', 'Closed'), ('H', 'Hold')]
+
+def parse_scale(text):
+    # "10k", "2.5M" or a plain number of sales order lines
+    match = SCALE_PATTERN.match(text.strip())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a scale like 10k, 1M or 250000")
+    return int(float(match.group(1)) * SCALE_UNITS[match.group(2).lower()])
+
+def table_sizes(scale):
+    return {name: max(MINIMUM_ROWS[name], int(scale * ratio)) for name, ratio in TABLE_RATIOS.items()}
+
+def output_paths(output_dir):
+    # The same file names the importer reads from DATA_FOLDER
+    return {name: os.path.join(output_dir, os.path.basename(path)) for name, path in [
+        ('manufacturers', MANUFACTURER_FILE), ('business_partners', BUSINESS_PARTNER_FILE),
+        ('contacts', BP_CONTACT_FILE), ('addresses', BP_ADDRESS_FILE), ('statuses', SALES_ORDER_STATUS_FILE),
+        ('items', ITEM_MASTER_FILE), ('sales_orders', SALES_ORDER_FILE), ('sales_order_lines', SALES_ORDER_LINE_FILE),
+        ('purchase_orders', PURCHASE_ORDER_FILE)
+    ]}
+
+def _write(path, columns, append=False):
+    # Same layout as the extracts: tab-separated, no header, CRLF line ends, two decimals
+    pd.DataFrame(columns).to_csv(path, sep='\t', header=False, index=False, mode='a' if append else 'w',
+                                 float_format='%.2f', lineterminator='\r\n')
+
+def _pick(rng, words, count):
+    return pd.Series(np.asarray(words, dtype=object)[rng.integers(len(words), size=count)])
+
+def _codes(prefix, numbers, width=0):
+    return prefix + pd.Series(numbers).astype(str).str.zfill(width)
+
+def _digits(rng, count, length):
+    return pd.Series(rng.integers(10 ** (length - 1), 10 ** length, size=count)).astype(str)
+
+def _phones(rng, count):
+    return _codes('', rng.integers(200, 1000, size=count)) + '-' + _digits(rng, count, 3) + '-' + _digits(rng, count, 4)
+
+def _tax_ids(rng, count):
+    return _digits(rng, count, 2) + '-' + _digits(rng, count, 7)
+
+def _dates(end_date, days_back):
+    return (np.datetime64(end_date, 'D') - days_back.astype('timedelta64[D]')).astype(str)
+
+def _money(values):
+    return np.round(values, 2)
+
+def _sales_order_block(rng, numbers, sizes, item_costs, customer_discounts, lines_per_order, end_date):
+    count = len(numbers)
+    customer = rng.integers(sizes['customers'], size=count)
+    age = rng.integers(DATE_RANGE_DAYS, size=count)
+    status = np.where(age > OPEN_ORDER_DAYS, 'C', _pick(rng, ['O', 'O', 'O', 'H'], count).to_numpy(dtype=str))
+
+    # Lines: 1 to 2 * lines_per_order - 1 per order, numbered from 1 within each order
+    line_counts = rng.integers(1, 2 * lines_per_order, size=count)
+    order_of_line = np.repeat(np.arange(count), line_counts)
+    line_number = np.arange(len(order_of_line)) - np.repeat(np.cumsum(line_counts) - line_counts, line_counts) + 1
+    item = rng.integers(sizes['items'], size=len(order_of_line))
+    quantity = rng.integers(1, 21, size=len(order_of_line)).astype(float)
+    unit_price = _money(item_costs[item] * rng.uniform(1.2, 1.8, size=len(order_of_line)))
+    total_price = _money(quantity * unit_price)
+
+    discount = customer_discounts[customer]
+    subtotal = np.bincount(order_of_line, weights=total_price, minlength=count)
+    cost = np.bincount(order_of_line, weights=quantity * item_costs[item], minlength=count)
+    total_discount = _money(subtotal * discount / 100)
+    total_tax = _money((subtotal - total_discount) * TAX_PERCENT / 100)
+    document_total = _money(subtotal - total_discount + total_tax)
+    paid_to_date = np.where(status == 'C', document_total, 0.0)
+    posting_date = _dates(end_date, age)
+
+    remarks = np.where(
+        rng.random(count) < 0.5,
+        _codes('Based on Sales Quotation ', numbers).to_numpy(dtype=object),
+        (_pick(rng, ADJECTIVES, count) + ' ' + _pick(rng, NOUNS, count) + ' for '
+         + _pick(rng, [city for city, state in CITIES], count)).to_numpy(dtype=object)
+    )
+    orders = {
+        'sales_order_number': numbers, 'bp_code': _codes('C', customer + FIRST_CUSTOMER), 'status_code': status,
+        'posting_date': posting_date, 'due_date': _dates(end_date, np.maximum(age - rng.integers(0, 31, size=count), 0)),
+        'currency': 'USD', 'document_total': document_total, 'total_tax': total_tax, 'discount_percent': discount,
+        'total_discount': total_discount, 'gross_profit': _money(subtotal - total_discount - cost),
+        'paid_to_date': paid_to_date, 'remarks': remarks
+    }
+    lines = {
+        'sales_order_number': numbers[order_of_line], 'line_number': line_number,
+        'item_number': _codes('A', item + 1, 7), 'quantity': quantity, 'unit_price': unit_price,
+        'discount_percent': discount[order_of_line], 'total_price': total_price, 'unused_1': '', 'unused_2': ''
+    }
+
+    # What the open orders add to the items' committed quantities and the customers' balances
+    open_line = (status != 'C')[order_of_line]
+    committed = np.bincount(item[open_line], weights=quantity[open_line], minlength=sizes['items'])
+    balances = np.bincount(customer, weights=document_total - paid_to_date, minlength=sizes['customers'])
+    return orders, lines, committed, balances
+
+def generate_data(output_dir, scale, seed=0, end_date=None):
+    end_date = end_date or datetime.date.today()
+    rng = np.random.default_rng(seed)
+    sizes = table_sizes(scale)
+    paths = output_paths(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Item costs and customer discounts are drawn first because the orders price from them; the
+    # item and customer files are written last, once the open orders they roll up are known
+    manufacturer_codes = _codes('', np.arange(1, sizes['manufacturers'] + 1), max(2, len(str(sizes['manufacturers']))))
+    brands = pd.Series(BRANDS * (sizes['manufacturers'] // len(BRANDS) + 1))[:sizes['manufacturers']].reset_index(drop=True)
+    brands = brands.where(np.arange(sizes['manufacturers']) < len(BRANDS),
+                          brands + ' ' + (np.arange(sizes['manufacturers']) // len(BRANDS)).astype(str))
+    item_costs = _money(rng.gamma(2.0, 60.0, size=sizes['items']) + 1)
+    customer_discounts = rng.choice([0.0, 0.0, 0.0, 2.5, 5.0, 10.0], size=sizes['customers'])
+
+    committed = np.zeros(sizes['items'])
+    balances = np.zeros(sizes['customers'])
+    lines_per_order = max(1, round(scale / sizes['sales_orders']))
+    line_count = 0
+    for start in range(0, sizes['sales_orders'], ORDERS_PER_BLOCK):
+        numbers = FIRST_SALES_ORDER + np.arange(start, min(start + ORDERS_PER_BLOCK, sizes['sales_orders']))
+        orders, lines, block_committed, block_balances = _sales_order_block(
+            rng, numbers, sizes, item_costs, customer_discounts, lines_per_order, end_date)
+        _write(paths['sales_orders'], orders, append=start > 0)
+        _write(paths['sales_order_lines'], lines, append=start > 0)
+        committed += block_committed
+        balances += block_balances
+        line_count += len(lines['line_number'])
+
+    item_manufacturer = rng.integers(sizes['manufacturers'], size=sizes['items'])
+    model_numbers = _digits(rng, sizes['items'], 4)
+    in_stock = np.where(rng.random(sizes['items']) < 0.1, 0, rng.integers(0, 2000, size=sizes['items']))
+    on_order = np.where(rng.random(sizes['items']) < 0.3, rng.integers(1, 200, size=sizes['items']), 0)
+    _write(paths['items'], {
+        'item_number': _codes('A', np.arange(1, sizes['items'] + 1), 7),
+        'description': (brands.iloc[item_manufacturer].reset_index(drop=True) + ' ' + _pick(rng, ADJECTIVES, sizes['items'])
+                        + ' ' + _pick(rng, NOUNS, sizes['items']) + ' ' + model_numbers),
+        'manufacturer_number': manufacturer_codes.iloc[item_manufacturer].reset_index(drop=True),
+        'in_stock': in_stock.astype(float), 'qty_ordered_by_customers': committed,
+        'qty_ordered_from_vendors': on_order.astype(float), 'last_purchase_price': item_costs
+    })
+
+    count = sizes['purchase_orders']
+    age = rng.integers(DATE_RANGE_DAYS, size=count)
+    lead_time = rng.integers(7, 31, size=count)
+    _write(paths['purchase_orders'], {
+        'purchase_order_number': FIRST_PURCHASE_ORDER + np.arange(count),
+        'supplier': manufacturer_codes.iloc[rng.integers(sizes['manufacturers'], size=count)].reset_index(drop=True),
+        'status': np.where(age >= lead_time, 'Received', 'Open'),
+        'total': _money(rng.gamma(2.0, 2500.0, size=count)),
+        'order_date': _dates(end_date, age), 'receipt_date': _dates(end_date, age - lead_time)
+    })
+
+    count = sizes['customers']
+    bp_codes = _codes('C', np.arange(FIRST_CUSTOMER, FIRST_CUSTOMER + count))
+    first_names, last_names = _pick(rng, FIRST_NAMES, count), _pick(rng, LAST_NAMES, count)
+    city = rng.integers(len(CITIES), size=count)
+    cities = pd.Series([CITIES[index][0] for index in city])
+    states = pd.Series([CITIES[index][1] for index in city])
+    streets = _digits(rng, count, 4) + ' ' + _pick(rng, STREETS, count)
+    zip_codes = _digits(rng, count, 5)
+    phones = _phones(rng, count)
+    _write(paths['business_partners'], {
+        'bp_code': bp_codes, 'bp_name': _pick(rng, LAST_NAMES, count) + ' ' + _pick(rng, NOUNS, count) + 's, '
+                                         + _pick(rng, COMPANY_SUFFIXES, count),
+        'bp_type': 'C', 'telephone': phones, 'account_balance': _money(balances),
+        'credit_limit': rng.choice([15000.0, 25000.0, 50000.0, 100000.0], size=count),
+        'discount_percent': customer_discounts, 'federal_tax_id': _tax_ids(rng, count), 'currency': 'USD'
+    })
+    _write(paths['contacts'], {
+        'bp_code': bp_codes, 'contact_name': first_names + ' ' + last_names, 'title': _pick(rng, TITLES, count),
+        'address': streets + ', ' + cities + ', ' + states + ' ' + zip_codes, 'telephone': phones,
+        'mobile_phone': '', 'fax': '',
+        'email': first_names.str.lower() + '.' + last_names.str.lower() + '@' + bp_codes.str.lower() + '.example.com'
+    })
+    _write(paths['addresses'], {
+        'bp_code': np.repeat(bp_codes.to_numpy(), 2), 'address_type': np.tile(['Ship-to', 'Bill-to'], count),
+        'street': np.repeat(streets.to_numpy(), 2), 'city': np.repeat(cities.to_numpy(), 2),
+        'state': np.repeat(states.to_numpy(), 2), 'zip_code': np.repeat(zip_codes.to_numpy(), 2), 'country': 'US',
+        'tax_code': np.where(np.tile([True, False], count), np.repeat(states.to_numpy(), 2), '')
+    })
+
+    count = sizes['manufacturers']
+    _write(paths['manufacturers'], {
+        'manufacturer_code': manufacturer_codes, 'manufacturer_name': brands, 'telephone': _phones(rng, count),
+        'discount_percent': rng.choice([0.0, 2.5, 3.5, 5.0], size=count), 'federal_tax_id': _tax_ids(rng, count),
+        'currency': 'USD'
+    })
+    _write(paths['statuses'], {
+        'status_code': [code for code, description in SALES_ORDER_STATUSES],
+        'description': [description for code, description in SALES_ORDER_STATUSES]
+    })
+
+    return dict(sizes, sales_order_lines=line_count)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a consistent synthetic data set in the import file layout.")
+    parser.add_argument('scale', type=parse_scale, help="number of sales order lines, e.g. 10k, 1M or 10M")
+    parser.add_argument('output_dir', help="directory to write the .txt files to")
+    parser.add_argument('--seed', type=int, default=0, help="the same seed always gives the same files")
+    parser.add_argument('--end-date', type=datetime.date.fromisoformat,
+                        help="date of the newest orders (YYYY-MM-DD); defaults to today")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    sizes = generate_data(args.output_dir, args.scale, args.seed, args.end_date)
+    print(f"Generated in {time.perf_counter() - started:.2f}s: "
+          + ', '.join(f"{count:,} {name.replace('_', ' ')}" for name, count in sizes.items()))
@@ -1,130 +1,434 @@
 import pandas as pd
-from sqlalchemy.orm import sessionmaker
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sqlalchemy import select, Date, DateTime, Integer
+import datetime
+import hashlib
+import io
 import os
+import queue
 import sys
+import threading
+import time
 
 # Add the project root directory to the Python path
 desktop_path = os.path.expanduser("~/Desktop")
 project_root = os.path.join(desktop_path, "MRP_ERP_App")
 sys.path.append(project_root)
 
-from src.models import engine, ItemInventory, CustomerContact, SalesOrder, PurchaseOrder
-from config.config import ITEM_MASTER_FILE, BP_CONTACT_FILE, SALES_ORDER_FILE, PURCHASE_ORDER_FILE
+from models import (engine, init_db, ItemInventory, CustomerContact, SalesOrder, PurchaseOrder, SalesOrderItem, SalesOrderStatus,
+                    BusinessPartner, BPAddress, Manufacturer, ImportFile, ImportRowHash)
+from summaries import sales_summary_groups, refresh_order_summaries, rebuild_sales_summaries
+from search import suspend_search_sync, resume_search_sync
+from config.config import (ITEM_MASTER_FILE, BP_CONTACT_FILE, SALES_ORDER_FILE, PURCHASE_ORDER_FILE, SALES_ORDER_LINE_FILE,
+                           SALES_ORDER_STATUS_FILE, BUSINESS_PARTNER_FILE, BP_ADDRESS_FILE, MANUFACTURER_FILE,
+                           IMPORT_CHUNK_SIZE, IMPORT_PREFETCH_CHUNKS, IMPORT_WORKERS)
 
-Session = sessionmaker(bind=engine)
-session = Session()
+# Writes to these tables feed the sales summary rollups
+SUMMARY_SOURCE_TABLES = {'sales_order', 'sales_order_item'}
 
-def import_item_inventory():
-    try:
-        df = pd.read_csv(ITEM_MASTER_FILE, sep='\t', header=None, names=[
-            'item_number', 'description', 'manufacturer_number', 'in_stock',
-            'qty_ordered_by_customers', 'qty_ordered_from_vendors', 'last_purchase_price'
-        ])
-
-        for _, row in df.iterrows():
-            item = ItemInventory(
-                item_number=row['item_number'],
-                description=row['description'],
-                manufacturer=row['manufacturer_number'],
-                in_stock=row['in_stock'],
-                qty_ordered_by_customers=row['qty_ordered_by_customers'],
-                qty_ordered_from_vendors=row['qty_ordered_from_vendors'],
-                last_purchase_price=row['last_purchase_price']
+# Tables with a surrogate primary key are matched on their natural key instead
+NATURAL_KEYS = {
+    'sales_order_item': ['sales_order_number', 'line_number']
+}
+
+def _key_columns(table):
+    if table.name in NATURAL_KEYS:
+        return NATURAL_KEYS[table.name]
+    return [column.name for column in table.primary_key.columns]
+
+def _conflict_clause(conn, key_columns, columns):
+    quote = conn.dialect.identifier_preparer.quote
+    keys = ', '.join(quote(name) for name in key_columns)
+    updates = [name for name in columns if name not in key_columns]
+    if not updates:
+        return f"ON CONFLICT ({keys}) DO NOTHING"
+    return f"ON CONFLICT ({keys}) DO UPDATE SET " + ', '.join(f"{quote(name)} = excluded.{quote(name)}" for name in updates)
+
+def _driver_rows(table, df):
+    # Convert column-wise and swap NaN/NaT for NULL so the DB-API driver gets plain Python values.
+    # Dates are passed in the same text form SQLAlchemy stores them in.
+    df = df.astype(object).where(pd.notna(df), None)
+    columns = []
+    for name in df.columns:
+        values = df[name].tolist()
+        if isinstance(table.c[name].type, (Date, DateTime)):
+            values = [None if value is None else str(value) for value in values]
+        columns.append(values)
+    return list(zip(*columns))
+
+def _executemany_upsert(conn, table, df, key_columns, chunk_size=IMPORT_CHUNK_SIZE):
+    # SQLite fast path: plain positional executemany batches, skipping per-row parameter processing
+    quote = conn.dialect.identifier_preparer.quote
+    columns = list(df.columns)
+    sql = (
+        f"INSERT INTO {quote(table.name)} ({', '.join(quote(name) for name in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) {_conflict_clause(conn, key_columns, columns)}"
+    )
+    rows = _driver_rows(table, df)
+    for start in range(0, len(rows), chunk_size):
+        conn.exec_driver_sql(sql, rows[start:start + chunk_size])
+
+def _copy_upsert(conn, table, df, key_columns):
+    # PostgreSQL fast path: COPY the frame into a temporary staging table, then upsert it in one statement
+    quote = conn.dialect.identifier_preparer.quote
+    columns = list(df.columns)
+    column_list = ', '.join(quote(name) for name in columns)
+    staging = quote(f"staging_{table.name}")
+
+    df = df.copy()
+    for name in columns:
+        # Integer columns that picked up NaN are floats in pandas, and COPY rejects '1000.0' for an integer
+        if isinstance(table.c[name].type, Integer) and df[name].dtype.kind == 'f':
+            df[name] = df[name].astype('Int64')
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+        f"SELECT {column_list} FROM {quote(table.name)} WITH NO DATA"
+    )
+    conn.exec_driver_sql(f"TRUNCATE {staging}")
+    cursor = conn.connection.cursor()
+    copy_sql = f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)"
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(copy_sql, buffer)
+    else:
+        # psycopg 3
+        with cursor.copy(copy_sql) as copy:
+            copy.write(buffer.getvalue())
+    cursor.close()
+    conn.exec_driver_sql(
+        f"INSERT INTO {quote(table.name)} ({column_list}) SELECT {column_list} FROM {staging} "
+        f"{_conflict_clause(conn, key_columns, columns)}"
+    )
+
+def bulk_upsert(table, df, chunk_size=IMPORT_CHUNK_SIZE, conn=None):
+    if conn is None:
+        with engine.begin() as conn:
+            return bulk_upsert(table, df, chunk_size, conn)
+
+    key_columns = _key_columns(table)
+
+    # The last row wins for duplicate keys, the same as successive session.merge() calls
+    df = df.drop_duplicates(subset=key_columns, keep='last')
+    if df.empty:
+        return 0
+
+    if conn.dialect.name == 'postgresql':
+        _copy_upsert(conn, table, df, key_columns)
+    else:
+        _executemany_upsert(conn, table, df, key_columns, chunk_size)
+
+    return len(df)
+
+def _content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _source_fingerprint(path, incremental=True):
+    stat = os.stat(path)
+    fingerprint = {
+        'file_path': os.path.abspath(path),
+        'size': stat.st_size,
+        'modified_time': stat.st_mtime,
+        'content_hash': None,
+        'imported_at': datetime.datetime.now()
+    }
+    if not incremental:
+        fingerprint['content_hash'] = _content_hash(path)
+        return fingerprint
+
+    with engine.connect() as conn:
+        stored = conn.execute(
+            select(ImportFile.__table__).where(ImportFile.file_path == fingerprint['file_path'])
+        ).first()
+
+    if stored is not None and stored.size == fingerprint['size'] and stored.modified_time == fingerprint['modified_time']:
+        return None
+
+    fingerprint['content_hash'] = _content_hash(path)
+    if stored is not None and stored.content_hash == fingerprint['content_hash']:
+        # Touched but not edited: remember the new mtime so the next run skips hashing as well
+        bulk_upsert(ImportFile.__table__, pd.DataFrame([fingerprint]))
+        return None
+
+    return fingerprint
+
+def _row_keys(table, df):
+    key_columns = _key_columns(table)
+    keys = df[key_columns[0]].astype(str)
+    for name in key_columns[1:]:
+        keys = keys + '|' + df[name].astype(str)
+    return keys
+
+def _stored_row_hashes(conn, table_name, keys, batch_size=500):
+    stored = {}
+    for start in range(0, len(keys), batch_size):
+        stored.update(conn.execute(
+            select(ImportRowHash.row_key, ImportRowHash.row_hash).where(
+                ImportRowHash.table_name == table_name,
+                ImportRowHash.row_key.in_(keys[start:start + batch_size])
             )
-            session.merge(item)
+        ).all())
+    return stored
 
-        session.commit()
-        print("Item inventory data imported successfully.")
-    except Exception as e:
-        print(f"Error importing item inventory data: {str(e)}")
-        session.rollback()
+def _import_chunk(conn, table, df, incremental=True):
+    key_columns = _key_columns(table)
+    df = df.drop_duplicates(subset=key_columns, keep='last')
+    row_hashes = pd.DataFrame({
+        'table_name': table.name,
+        'row_key': _row_keys(table, df).values,
+        'row_hash': pd.util.hash_pandas_object(df, index=False).astype(str).values
+    })
+
+    if incremental:
+        stored = _stored_row_hashes(conn, table.name, row_hashes['row_key'].tolist())
+        changed = (row_hashes['row_key'].map(stored) != row_hashes['row_hash']).values
+        df = df[changed]
+        row_hashes = row_hashes[changed]
+
+    order_numbers = []
+    if table.name in SUMMARY_SOURCE_TABLES:
+        order_numbers = df['sales_order_number'].dropna().unique().tolist()
+        previous_groups = sales_summary_groups(conn, order_numbers)
 
-def import_customer_contacts():
+    bulk_upsert(table, df, conn=conn)
+    bulk_upsert(ImportRowHash.__table__, row_hashes, conn=conn)
+    if order_numbers:
+        refresh_order_summaries(conn, order_numbers, previous_groups)
+    return len(df)
+
+def _read_chunks(path, names, convert, chunk_size=IMPORT_CHUNK_SIZE, dtype=None):
+    for df in pd.read_csv(path, sep='\t', header=None, names=names, dtype=dtype, chunksize=chunk_size):
+        yield convert(df)
+
+def _prefetch(chunks, depth=IMPORT_PREFETCH_CHUNKS):
+    # Parse and convert the next chunks on a worker thread while the current one is being written.
+    # The bounded queue keeps at most `depth` chunks in memory ahead of the writer.
+    pending = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    finished = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(finished)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
     try:
-        df = pd.read_csv(BP_CONTACT_FILE, sep='\t', header=None, names=[
-            'bp_code', 'contact_name', 'title', 'address', 'telephone', 'mobile_phone', 'fax', 'email'
-        ])
-
-        for _, row in df.iterrows():
-            contact = CustomerContact(
-                bp_code=row['bp_code'],
-                contact_name=row['contact_name'],
-                title=row['title'],
-                address=row['address'],
-                telephone=row['telephone'],
-                email=row['email']
-            )
-            session.merge(contact)
+        while True:
+            item = pending.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        worker.join()
 
-        session.commit()
-        print("Customer contact data imported successfully.")
-    except Exception as e:
-        print(f"Error importing customer contact data: {str(e)}")
-        session.rollback()
+def stream_import(table, path, names, convert, fingerprint, incremental=True, chunk_size=IMPORT_CHUNK_SIZE, dtype=None):
+    row_count = 0
+    # A full reload or a first load re-indexes the search table once at the end instead of row by row
+    with engine.begin() as conn:
+        bulk = not incremental or conn.execute(select(table).limit(1)).first() is None
+        search_suspended = bulk and suspend_search_sync(conn, table.name)
 
-def import_sales_orders():
     try:
-        df = pd.read_csv(SALES_ORDER_FILE, sep='\t', header=None, names=[
-            'sales_order_number', 'bp_code', 'status_code', 'posting_date', 'due_date',
-            'promise_date', 'currency', 'document_total', 'total_tax', 'discount_percent',
-            'total_discount', 'gross_profit', 'paid_to_date', 'remarks'
-        ])
-
-        for _, row in df.iterrows():
-            order = SalesOrder(
-                sales_order_number=row['sales_order_number'],
-                bp_code=row['bp_code'],
-                status_code=row['status_code'],
-                posting_date=pd.to_datetime(row['posting_date']),
-                due_date=pd.to_datetime(row['due_date']),
-                promise_date=pd.to_datetime(row['promise_date']),
-                currency=row['currency'],
-                document_total=row['document_total'],
-                total_tax=row['total_tax'],
-                discount_percent=row['discount_percent'],
-                total_discount=row['total_discount'],
-                gross_profit=row['gross_profit'],
-                paid_to_date=row['paid_to_date'],
-                remarks=row['remarks']
-            )
-            session.merge(order)
+        # Each chunk commits on its own; the file fingerprint is only recorded once every chunk is in,
+        # so an interrupted import is picked up again on the next run
+        for df in _prefetch(_read_chunks(path, names, convert, chunk_size, dtype)):
+            with engine.begin() as conn:
+                row_count += _import_chunk(conn, table, df, incremental)
+    finally:
+        if search_suspended:
+            with engine.begin() as conn:
+                resume_search_sync(conn, table.name)
 
-        session.commit()
-        print("Sales order data imported successfully.")
-    except Exception as e:
-        print(f"Error importing sales order data: {str(e)}")
-        session.rollback()
+    bulk_upsert(ImportFile.__table__, pd.DataFrame([fingerprint]))
+    return row_count
+
+def _print_import_summary(label, row_count, started):
+    elapsed = time.perf_counter() - started
+    rate = row_count / elapsed if elapsed > 0 else float(row_count)
+    print(f"{label} data imported successfully ({row_count} rows, {elapsed:.2f}s, {rate:,.0f} rows/sec).")
+
+def _convert_dates(df, columns):
+    for column in columns:
+        df[column] = pd.to_datetime(df[column], errors='coerce').dt.date
+    return df
+
+def _convert_item_inventory(df):
+    return df.rename(columns={'manufacturer_number': 'manufacturer'})
+
+def _convert_customer_contacts(df):
+    return df[['bp_code', 'contact_name', 'title', 'address', 'telephone', 'email']]
+
+def _convert_sales_orders(df):
+    return _convert_dates(df, ['posting_date', 'due_date'])
+
+def _convert_purchase_orders(df):
+    return _convert_dates(df, ['order_date', 'receipt_date'])
 
-def import_purchase_orders():
+def _convert_sales_order_lines(df):
+    return df.drop(columns=['unused_1', 'unused_2'])
+
+def _convert_unchanged(df):
+    return df
+
+class ImportFailed(Exception):
+    pass
+
+def _import_source(label, path, table, names, convert, incremental=True, dtype=None):
     try:
-        df = pd.read_csv(PURCHASE_ORDER_FILE, sep='\t', header=None, names=[
-            'purchase_order_number', 'supplier', 'status', 'total', 'order_date', 'receipt_date'
-        ])
-
-        for _, row in df.iterrows():
-            order = PurchaseOrder(
-                purchase_order_number=row['purchase_order_number'],
-                supplier=row['supplier'],
-                status=row['status'],
-                total=row['total'],
-                order_date=pd.to_datetime(row['order_date']),
-                receipt_date=pd.to_datetime(row['receipt_date']) if pd.notna(row['receipt_date']) else None
-            )
-            session.merge(order)
+        started = time.perf_counter()
+        fingerprint = _source_fingerprint(path, incremental)
+        if fingerprint is None:
+            print(f"{label} source file unchanged, skipped.")
+            return
 
-        session.commit()
-        print("Purchase order data imported successfully.")
+        row_count = stream_import(table, path, names, convert, fingerprint, incremental, dtype=dtype)
+        _print_import_summary(label, row_count, started)
     except Exception as e:
-        print(f"Error importing purchase order data: {str(e)}")
-        session.rollback()
+        # Re-raised with only the message, so it survives the trip back from an import worker
+        raise ImportFailed(f"Error importing {label.lower()} data: {str(e)}") from e
+
+def import_item_inventory(incremental=True):
+    _import_source("Item inventory", ITEM_MASTER_FILE, ItemInventory.__table__, [
+        'item_number', 'description', 'manufacturer_number', 'in_stock',
+        'qty_ordered_by_customers', 'qty_ordered_from_vendors', 'last_purchase_price'
+    ], _convert_item_inventory, incremental, dtype={'item_number': str, 'manufacturer_number': str})
+
+def import_customer_contacts(incremental=True):
+    _import_source("Customer contact", BP_CONTACT_FILE, CustomerContact.__table__, [
+        'bp_code', 'contact_name', 'title', 'address', 'telephone', 'mobile_phone', 'fax', 'email'
+    ], _convert_customer_contacts, incremental, dtype={'bp_code': str, 'telephone': str})
+
+def import_sales_orders(incremental=True):
+    # The Sales Order extract has no promise date column
+    _import_source("Sales order", SALES_ORDER_FILE, SalesOrder.__table__, [
+        'sales_order_number', 'bp_code', 'status_code', 'posting_date', 'due_date',
+        'currency', 'document_total', 'total_tax', 'discount_percent',
+        'total_discount', 'gross_profit', 'paid_to_date', 'remarks'
+    ], _convert_sales_orders, incremental, dtype={'bp_code': str})
 
-def import_all_data():
+def import_purchase_orders(incremental=True):
+    _import_source("Purchase order", PURCHASE_ORDER_FILE, PurchaseOrder.__table__, [
+        'purchase_order_number', 'supplier', 'status', 'total', 'order_date', 'receipt_date'
+    ], _convert_purchase_orders, incremental, dtype={'supplier': str})
+
+def import_sales_order_lines(incremental=True):
+    _import_source("Sales order line", SALES_ORDER_LINE_FILE, SalesOrderItem.__table__, [
+        'sales_order_number', 'line_number', 'item_number', 'quantity', 'unit_price',
+        'discount_percent', 'total_price', 'unused_1', 'unused_2'
+    ], _convert_sales_order_lines, incremental, dtype={'item_number': str})
+
+def import_sales_order_statuses(incremental=True):
+    _import_source("Sales order status", SALES_ORDER_STATUS_FILE, SalesOrderStatus.__table__, [
+        'status_code', 'description'
+    ], _convert_unchanged, incremental, dtype=str)
+
+def import_business_partners(incremental=True):
+    _import_source("Business partner", BUSINESS_PARTNER_FILE, BusinessPartner.__table__, [
+        'bp_code', 'bp_name', 'bp_type', 'telephone', 'account_balance', 'credit_limit',
+        'discount_percent', 'federal_tax_id', 'currency'
+    ], _convert_unchanged, incremental, dtype={'bp_code': str, 'telephone': str, 'federal_tax_id': str})
+
+def import_bp_addresses(incremental=True):
+    _import_source("BP address", BP_ADDRESS_FILE, BPAddress.__table__, [
+        'bp_code', 'address_type', 'street', 'city', 'state', 'zip_code', 'country', 'tax_code'
+    ], _convert_unchanged, incremental, dtype=str)
+
+def import_manufacturers(incremental=True):
+    _import_source("Manufacturer", MANUFACTURER_FILE, Manufacturer.__table__, [
+        'manufacturer_code', 'manufacturer_name', 'telephone', 'discount_percent', 'federal_tax_id', 'currency'
+    ], _convert_unchanged, incremental, dtype={'manufacturer_code': str, 'telephone': str, 'federal_tax_id': str})
+
+# Files in the same stage have no foreign keys between them and are imported concurrently.
+# Each stage only starts once the stages it depends on have been written.
+IMPORT_STAGES = [
+    [import_manufacturers, import_business_partners, import_customer_contacts, import_sales_order_statuses],
+    [import_item_inventory, import_bp_addresses, import_sales_orders, import_purchase_orders],
+    [import_sales_order_lines]
+]
+
+def _init_import_worker():
+    # Pooled connections inherited from the parent process must not be reused here
+    engine.dispose(close=False)
+
+def _run_importer(importer, incremental=True):
+    started = time.perf_counter()
+    importer(incremental)
+    return time.perf_counter() - started
+
+def import_all_data(incremental=True, workers=IMPORT_WORKERS, cancel_event=None):
     print("Starting data import process...")
-    import_item_inventory()
-    import_customer_contacts()
-    import_sales_orders()
-    import_purchase_orders()
-    print("All data imported successfully.")
+    started = time.perf_counter()
+    init_db()
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_import_worker)
+
+    try:
+        for number, stage in enumerate(IMPORT_STAGES, 1):
+            # Stages are the only safe stopping points: every earlier stage is fully written
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"Data import cancelled before stage {number}.")
+                return
+
+            stage_started = time.perf_counter()
+            timings, failures = {}, {}
+            if pool is None:
+                for importer in stage:
+                    try:
+                        timings[importer] = _run_importer(importer, incremental)
+                    except ImportFailed as e:
+                        failures[importer] = e
+            else:
+                futures = {pool.submit(_run_importer, importer, incremental): importer for importer in stage}
+                for future in as_completed(futures):
+                    if future.exception() is None:
+                        timings[futures[future]] = future.result()
+                    else:
+                        failures[futures[future]] = future.exception()
+
+            for importer, elapsed in timings.items():
+                print(f"  {importer.__name__}: {elapsed:.2f}s")
+            # The rest of the stage is kept, but later stages would load rows whose parents are missing
+            if failures:
+                for importer, error in failures.items():
+                    print(f"  {importer.__name__}: {error}")
+                raise ImportFailed(f"Import stage {number} failed ({', '.join(f.__name__ for f in failures)}); "
+                                   f"later stages were not imported.")
+            print(f"Import stage {number} finished in {time.perf_counter() - stage_started:.2f}s.")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if not incremental:
+        with engine.begin() as conn:
+            rebuild_sales_summaries(conn)
+
+    print(f"All data imported successfully in {time.perf_counter() - started:.2f}s.")
 
 if __name__ == "__main__":
     import_all_data()
@@ -0,0 +1,141 @@
+import argparse
+import datetime
+import os
+import sys
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+# Headless entry point for scripted jobs (cron imports, report exports, PO batches):
+#     python erp.py import [--full]
+#     python erp.py report inventory items.csv
+#     python erp.py export-po out/ --status Open
+#     python erp.py mrp --emit
+#     python erp.py release 1001 1002 (or --all)
+#     python erp.py receive 1001 1002 1003
+#     python erp.py order sales C0001 lines.csv --due 2026-11-30
+# Only argparse is loaded up front. Each command imports the modules it needs when it runs, so
+# --help is instant and no command ever loads tkinter or matplotlib.
+
+def _given(**options):
+    # Options left unset on the command line fall back to the defaults in config.py
+    return {name: value for name, value in options.items() if value is not None}
+
+def run_import(args):
+    from data_import import import_all_data, ImportFailed
+    try:
+        import_all_data(incremental=not args.full, **_given(workers=args.workers))
+    except ImportFailed as e:
+        print(e)
+        return 1
+
+def run_report(args):
+    from models import init_db
+    from reports import EXPORTABLE_REPORTS
+    from report_export import export_report
+
+    if args.report not in EXPORTABLE_REPORTS:
+        print(f"Unknown report '{args.report}'. Available reports: {', '.join(sorted(EXPORTABLE_REPORTS))}")
+        return 2
+
+    init_db()
+    export_report(args.report, args.output, args.format, **_given(chunk_size=args.chunk_size))
+
+def run_export_po(args):
+    from models import init_db, Session
+    from pdf_generator import export_purchase_orders
+
+    init_db()
+    session = Session()
+    try:
+        export_purchase_orders(session, args.output_dir, args.first, args.last, args.status, **_given(workers=args.workers))
+    finally:
+        Session.remove()
+
+def run_mrp(args):
+    from models import init_db
+    from mrp import run_mrp
+
+    init_db()
+    run_mrp(args.emit, args.output)
+
+def run_release(args):
+    from models import init_db
+    from receipts import release_purchase_orders
+
+    if not args.order_numbers and not args.all:
+        print("Give the purchase order numbers to release, or --all.")
+        return 2
+    init_db()
+    release_purchase_orders(None if args.all else args.order_numbers)
+
+def run_receive(args):
+    from models import init_db
+    from receipts import receive_purchase_orders
+
+    init_db()
+    receive_purchase_orders(args.order_numbers)
+
+def run_order(args):
+    from models import init_db
+    from order_entry import create_order_from_file
+
+    init_db()
+    if create_order_from_file(args.kind, args.party, args.lines, args.due) is None:
+        return 1
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="erp", description="MRP/ERP batch commands.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="import the data files")
+    import_parser.add_argument('--full', action='store_true', help="reload every file instead of only changed rows")
+    import_parser.add_argument('--workers', type=int, help="importer processes (default: IMPORT_WORKERS)")
+    import_parser.set_defaults(handler=run_import)
+
+    report_parser = commands.add_parser('report', help="export a report to CSV, Parquet or PDF")
+    report_parser.add_argument('report', help="report name, e.g. inventory, sales, low-stock, monthly-sales")
+    report_parser.add_argument('output')
+    report_parser.add_argument('--format', choices=('csv', 'parquet', 'pdf'), help="defaults to the output file extension")
+    report_parser.add_argument('--chunk-size', type=int, help="rows per chunk (default: REPORT_EXPORT_CHUNK_SIZE)")
+    report_parser.set_defaults(handler=run_report)
+
+    po_parser = commands.add_parser('export-po', help="export purchase orders to PDF files")
+    po_parser.add_argument('output_dir')
+    po_parser.add_argument('--from', dest='first', type=int, help="first purchase order number")
+    po_parser.add_argument('--to', dest='last', type=int, help="last purchase order number")
+    po_parser.add_argument('--status', help="only export orders with this status")
+    po_parser.add_argument('--workers', type=int, help="render processes (default: PDF_EXPORT_WORKERS)")
+    po_parser.set_defaults(handler=run_export_po)
+
+    mrp_parser = commands.add_parser('mrp', help="plan purchases for every item")
+    mrp_parser.add_argument('--emit', action='store_true', help="replace the draft purchase orders with the plan")
+    mrp_parser.add_argument('--output', help="write the planned order lines to a CSV file")
+    mrp_parser.set_defaults(handler=run_mrp)
+
+    release_parser = commands.add_parser('release', help="release draft purchase orders so they can be received")
+    release_parser.add_argument('order_numbers', nargs='*', type=int, metavar='order_number')
+    release_parser.add_argument('--all', action='store_true', help="release every draft purchase order")
+    release_parser.set_defaults(handler=run_release)
+
+    receive_parser = commands.add_parser('receive', help="post goods receipts for purchase orders in one transaction")
+    receive_parser.add_argument('order_numbers', nargs='+', type=int, metavar='order_number')
+    receive_parser.set_defaults(handler=run_receive)
+
+    order_parser = commands.add_parser('order', help="create a sales or purchase order from a CSV of lines")
+    order_parser.add_argument('kind', choices=('sales', 'purchase'))
+    order_parser.add_argument('party', help="customer code for sales orders, supplier for purchase orders")
+    order_parser.add_argument('lines', help="CSV with item_number,quantity[,unit_price] per row")
+    order_parser.add_argument('--due', type=datetime.date.fromisoformat, help="due date of a sales order (YYYY-MM-DD)")
+    order_parser.set_defaults(handler=run_order)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
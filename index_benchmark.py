@@ -0,0 +1,126 @@
+from sqlalchemy import create_engine, text
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import Base
+
+# Measures the hot lookup paths with and without the secondary indexes declared in models.py.
+# Prints EXPLAIN QUERY PLAN and the median time of each query for both cases.
+
+HOT_QUERIES = [
+    ("Low stock items", "SELECT item_number, description, in_stock FROM item_inventory WHERE in_stock < 10",
+     lambda rows: {}),
+    ("Orders for a customer", "SELECT sales_order_number, document_total FROM sales_order WHERE bp_code = :bp_code",
+     lambda rows: {'bp_code': f"C{random.randrange(rows // 100):06d}"}),
+    ("Orders in a month", "SELECT SUM(document_total) FROM sales_order WHERE posting_date >= :start AND posting_date < :end",
+     lambda rows: _month_params()),
+    ("Customer orders in a month",
+     "SELECT SUM(document_total) FROM sales_order WHERE bp_code = :bp_code AND posting_date >= :start AND posting_date < :end",
+     lambda rows: dict(_month_params(), bp_code=f"C{random.randrange(rows // 100):06d}")),
+    ("Lines of a sales order", "SELECT * FROM sales_order_item WHERE sales_order_number = :number",
+     lambda rows: {'number': random.randrange(rows)}),
+    ("Sales lines for an item", "SELECT SUM(quantity) FROM sales_order_item WHERE item_number = :item_number",
+     lambda rows: {'item_number': f"I{random.randrange(rows // 5):07d}"}),
+    ("Lines of a purchase order", "SELECT * FROM purchase_order_item WHERE purchase_order_number = :number",
+     lambda rows: {'number': random.randrange(rows // 10)}),
+    ("Purchase lines for an item", "SELECT SUM(quantity) FROM purchase_order_item WHERE item_number = :item_number",
+     lambda rows: {'item_number': f"I{random.randrange(rows // 5):07d}"})
+]
+
+def _month_params():
+    start = datetime.date(2020 + random.randrange(5), random.randrange(1, 13), 1)
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return {'start': start.isoformat(), 'end': end.isoformat()}
+
+def _insert(conn, sql, rows):
+    for start in range(0, len(rows), 50000):
+        conn.exec_driver_sql(sql, rows[start:start + 50000])
+
+def load_rows(engine, rows):
+    items = rows // 5
+    customers = rows // 100
+    purchase_orders = rows // 10
+    first_day = datetime.date(2020, 1, 1)
+    with engine.begin() as conn:
+        _insert(conn, "INSERT INTO item_inventory (item_number, description, in_stock, qty_ordered_by_customers, "
+                      "qty_ordered_from_vendors, last_purchase_price) VALUES (?, ?, ?, ?, ?, ?)",
+                [(f"I{i:07d}", f"Item {i}", float(random.randrange(1000)), float(random.randrange(50)),
+                  float(random.randrange(50)), round(random.uniform(1, 500), 2)) for i in range(items)])
+        _insert(conn, "INSERT INTO sales_order (sales_order_number, bp_code, status_code, posting_date, document_total) "
+                      "VALUES (?, ?, ?, ?, ?)",
+                [(i, f"C{random.randrange(customers):06d}", random.choice('OOOOCCCCCH'),
+                  (first_day + datetime.timedelta(days=random.randrange(1826))).isoformat(),
+                  round(random.uniform(10, 50000), 2)) for i in range(rows)])
+        _insert(conn, "INSERT INTO sales_order_item (sales_order_number, line_number, item_number, quantity, unit_price, "
+                      "total_price) VALUES (?, ?, ?, ?, ?, ?)",
+                [(i // 2, i % 2 + 1, f"I{random.randrange(items):07d}", 1.0, 10.0, 10.0) for i in range(rows)])
+        _insert(conn, "INSERT INTO purchase_order (purchase_order_number, supplier, status, total) VALUES (?, ?, ?, ?)",
+                [(i, f"V{random.randrange(500):04d}", 'Open', 0.0) for i in range(purchase_orders)])
+        _insert(conn, "INSERT INTO purchase_order_item (purchase_order_number, item_number, quantity, unit_price, "
+                      "total_price) VALUES (?, ?, ?, ?, ?)",
+                [(i // 2, f"I{random.randrange(items):07d}", 5.0, 10.0, 50.0) for i in range(purchase_orders * 2)])
+
+def secondary_indexes():
+    return [index for table in Base.metadata.sorted_tables for index in table.indexes if not index.unique]
+
+def run_queries(engine, rows, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for label, sql, make_params in HOT_QUERIES:
+            params = make_params(rows)
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params)]
+            timings = []
+            for _ in range(repeat):
+                params = make_params(rows)
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = (plan, statistics.median(timings))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the secondary indexes declared in models.py.")
+    parser.add_argument('--rows', type=int, default=1000000, help="Sales orders and sales order lines to generate")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per query; the median is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine('sqlite:///' + os.path.join(workdir, 'index_benchmark.db'))
+        Base.metadata.create_all(engine)
+        indexes = secondary_indexes()
+
+        with engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn)
+
+        print(f"Loading {args.rows:,} rows...")
+        load_rows(engine, args.rows)
+        without_indexes = run_queries(engine, args.rows, args.repeat)
+
+        with engine.begin() as conn:
+            for index in indexes:
+                index.create(conn)
+            conn.execute(text("ANALYZE"))
+        with_indexes = run_queries(engine, args.rows, args.repeat)
+        engine.dispose()
+
+    for label, _, _ in HOT_QUERIES:
+        plan_before, before = without_indexes[label]
+        plan_after, after = with_indexes[label]
+        print(f"\n{label}: {before:.2f} ms -> {after:.2f} ms ({before / after if after else float('inf'):.0f}x)")
+        print(f"  without indexes: {'; '.join(plan_before)}")
+        print(f"  with indexes:    {'; '.join(plan_after)}")
+
+if __name__ == "__main__":
+    main()
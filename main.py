@@ -1,9 +1,9 @@
+import time
+STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, text
 import sys
 import os
 import datetime
@@ -13,14 +13,52 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
-from models import engine, ItemInventory, CustomerContact, SalesOrder, PurchaseOrder, SalesOrderItem, PurchaseOrderItem
-from data_import import import_all_data
+from models import engine, init_db, ItemInventory, SalesOrder, SALES_ORDER_DETAIL, TAB_QUERIES
 from config.config import DATABASE_URI
-from pdf_generator import generate_pdf
-
-# Create a session
-Session = sessionmaker(bind=engine)
-session = Session()
+from report_export import export_report
+from virtual_tree import PagedTreeview, ResultGrid
+import reports
+from query_cache import query_cache
+from order_entry import OrderEntryError, create_customer, create_sales_order, create_purchase_order, parse_lines
+from search import search_rows
+from query_profiler import profile_query, run_logged_query, format_profile, top_slow_queries, clear_slow_queries, format_slow_queries
+from task_runner import TaskRunner, TaskStatusBar, StallMonitor
+from config.config import UI_STALL_MONITOR, UI_FIRST_PAINT_TARGET_MS, UI_STARTUP_PROBE, QUERY_MAX_ROWS
+
+# pandas (via data_import), matplotlib and reportlab are imported by the features that use them,
+# from task worker threads where possible, so none of them delay the first window.
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    import matplotlib.backends.backend_tkagg
+    return plt
+
+def sales_order_details(session, order_number):
+    # The text of the sales order window; the order, its customer and its lines with their items
+    # are read with a fixed number of queries whatever the number of lines
+    order = session.scalars(
+        select(SalesOrder).options(*SALES_ORDER_DETAIL).filter_by(sales_order_number=order_number)
+    ).first()
+    if order is None:
+        return None
+
+    contact = order.customer
+    lines = [
+        f"Order Number: {order.sales_order_number}",
+        f"Customer: {order.bp_code}" + (f" ({contact.contact_name})" if contact else ""),
+        f"Status: {order.status_code}",
+        f"Order Date: {order.posting_date}",
+        f"Due Date: {order.due_date}",
+        "",
+        f"{'Line':<6}{'Item':<20}{'Description':<40}{'Quantity':>10}{'Unit Price':>12}{'Total':>12}"
+    ]
+    for line in sorted(order.items, key=lambda line: line.line_number or 0):
+        description = line.item.description if line.item else ""
+        lines.append(f"{line.line_number or '':<6}{line.item_number:<20}{description[:38]:<40}"
+                     f"{line.quantity or 0:>10g}{line.unit_price or 0:>12.2f}{line.total_price or 0:>12.2f}")
+    lines.append("")
+    lines.append(f"Document Total: {order.document_total or 0:.2f}")
+    return "\n".join(lines)
 
 class MRPERPApp:
     def __init__(self, master):
@@ -28,6 +66,13 @@ class MRPERPApp:
         self.master.title("MRP/ERP Application")
         self.master.geometry("1024x768")
 
+        # Database and report work runs in the background; progress shows in the status bar
+        self.status_bar = TaskStatusBar(self.master)
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tasks = TaskRunner(self.master, self.status_bar)
+        self.status_bar.bind_runner(self.tasks)
+        self.stall_monitor = StallMonitor(self.master) if UI_STALL_MONITOR else None
+
         # Create notebook (tabbed interface)
         self.notebook = ttk.Notebook(self.master)
         self.notebook.pack(fill=tk.BOTH, expand=True)
@@ -47,13 +92,18 @@ class MRPERPApp:
         self.notebook.add(self.reports_tab, text="Reports")
         self.notebook.add(self.query_tab, text="Query")
 
-        # Set up tabs
-        self.setup_inventory_tab()
-        self.setup_customers_tab()
-        self.setup_sales_tab()
-        self.setup_purchasing_tab()
-        self.setup_reports_tab()
-        self.setup_query_tab()
+        # Tab contents are built the first time a tab is selected
+        self.tab_setup = {
+            self.inventory_tab: self.setup_inventory_tab,
+            self.customers_tab: self.setup_customers_tab,
+            self.sales_tab: self.setup_sales_tab,
+            self.purchasing_tab: self.setup_purchasing_tab,
+            self.reports_tab: self.setup_reports_tab,
+            self.query_tab: self.setup_query_tab
+        }
+        self.built_tabs = set()
+        self.notebook.bind("<<NotebookTabChanged>>", self.build_selected_tab)
+        self.build_selected_tab()
 
         # Add a menu bar
         self.setup_menu()
@@ -64,29 +114,100 @@ class MRPERPApp:
 
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Import Data", command=self.import_data)
+        file_menu.add_command(label="Full Reload", command=lambda: self.import_data(incremental=False))
+        file_menu.add_command(label="Export Purchase Order PDFs...", command=self.export_purchase_order_pdfs)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.master.quit)
         menubar.add_cascade(label="File", menu=file_menu)
 
-    def import_data(self):
-        import_all_data()
-        messagebox.showinfo("Import Complete", "All data has been imported successfully.")
-        self.refresh_all_data()
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_command(label="Query Cache Statistics", command=self.show_cache_stats)
+        tools_menu.add_command(label="Clear Query Cache", command=query_cache.invalidate)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Slow Query Log", command=self.show_slow_queries)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
+
+    def build_selected_tab(self, event=None):
+        tab = self.master.nametowidget(self.notebook.select())
+        if tab not in self.built_tabs:
+            self.built_tabs.add(tab)
+            self.tab_setup[tab]()
+
+    def import_data(self, incremental=True):
+        def work(session, task):
+            from data_import import import_all_data
+            import_all_data(incremental, cancel_event=task.cancel_event)
+            # Import workers run in other processes, so their writes are not seen by the cache hooks
+            query_cache.invalidate()
+
+        def done(result):
+            messagebox.showinfo("Import Complete", "All data has been imported successfully.")
+            self.refresh_all_data()
+
+        def failed(error):
+            # The stages before the failure are committed, so show what did get in
+            query_cache.invalidate()
+            messagebox.showerror("Import Failed", str(error))
+            self.refresh_all_data()
+
+        self.tasks.submit("Importing data", work, done, failed)
+
+    def show_cache_stats(self):
+        stats = query_cache.stats()
+        messagebox.showinfo("Query Cache Statistics", "\n".join([
+            f"Entries: {stats['entries']}",
+            f"Size: {stats['size_bytes'] / 1024:.0f} KB of {stats['max_bytes'] / 1024:.0f} KB",
+            f"Hits: {stats['hits']}",
+            f"Misses: {stats['misses']}",
+            f"Hit ratio: {stats['hit_ratio']:.1%}",
+            f"Evictions: {stats['evictions']}",
+            f"Invalidations: {stats['invalidations']}"
+        ]))
 
     def refresh_all_data(self):
-        self.refresh_inventory()
-        self.refresh_customers()
-        self.refresh_sales()
-        self.refresh_purchasing()
+        # Tabs that have not been opened yet load fresh data when they are built
+        for tab, refresh in [(self.inventory_tab, self.refresh_inventory), (self.customers_tab, self.refresh_customers),
+                             (self.sales_tab, self.refresh_sales), (self.purchasing_tab, self.refresh_purchasing)]:
+            if tab in self.built_tabs:
+                refresh()
+
+    def add_search_box(self, tab, tree, scope):
+        # Ranked full-text search over the tab's table; Clear goes back to paging through all rows
+        search_frame = ttk.Frame(tab)
+        search_frame.pack(fill=tk.X, padx=5, pady=5, before=tree)
+        search_entry = ttk.Entry(search_frame)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        def run_search(event=None):
+            query = search_entry.get().strip()
+            if not query:
+                tree.refresh()
+                return
+
+            def work(session, task):
+                return search_rows(session, scope, query, tree.query_columns)
+
+            self.tasks.submit("Searching", work, tree.show_rows)
+
+        def clear_search():
+            search_entry.delete(0, tk.END)
+            tree.refresh()
+
+        search_entry.bind("<Return>", run_search)
+        ttk.Button(search_frame, text="Search", command=run_search).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_frame, text="Clear", command=clear_search).pack(side=tk.LEFT, padx=5)
 
     def setup_inventory_tab(self):
         # Create a treeview to display inventory data
-        self.inventory_tree = ttk.Treeview(self.inventory_tab, columns=("Item Number", "Description", "In Stock", "Last Purchase Price"), show="headings")
+        self.inventory_tree = PagedTreeview(self.inventory_tab, self.tasks,
+                                            *TAB_QUERIES['inventory'],
+                                            columns=("Item Number", "Description", "In Stock", "Last Purchase Price"), show="headings")
         self.inventory_tree.heading("Item Number", text="Item Number")
         self.inventory_tree.heading("Description", text="Description")
         self.inventory_tree.heading("In Stock", text="In Stock")
         self.inventory_tree.heading("Last Purchase Price", text="Last Purchase Price")
         self.inventory_tree.pack(fill=tk.BOTH, expand=True)
+        self.add_search_box(self.inventory_tab, self.inventory_tree, 'items')
 
         # Add buttons
         button_frame = ttk.Frame(self.inventory_tab)
@@ -97,12 +218,15 @@ class MRPERPApp:
 
     def setup_customers_tab(self):
         # Create a treeview to display customer data
-        self.customer_tree = ttk.Treeview(self.customers_tab, columns=("BP Code", "Contact Name", "Title", "Telephone"), show="headings")
+        self.customer_tree = PagedTreeview(self.customers_tab, self.tasks,
+                                           *TAB_QUERIES['customers'],
+                                           columns=("BP Code", "Contact Name", "Title", "Telephone"), show="headings")
         self.customer_tree.heading("BP Code", text="BP Code")
         self.customer_tree.heading("Contact Name", text="Contact Name")
         self.customer_tree.heading("Title", text="Title")
         self.customer_tree.heading("Telephone", text="Telephone")
         self.customer_tree.pack(fill=tk.BOTH, expand=True)
+        self.add_search_box(self.customers_tab, self.customer_tree, 'customers')
 
         # Add buttons
         button_frame = ttk.Frame(self.customers_tab)
@@ -113,7 +237,9 @@ class MRPERPApp:
 
     def setup_sales_tab(self):
         # Create a treeview to display sales order data
-        self.sales_tree = ttk.Treeview(self.sales_tab, columns=("Order Number", "Customer", "Status", "Total", "Order Date", "Due Date"), show="headings")
+        self.sales_tree = PagedTreeview(self.sales_tab, self.tasks,
+                                        *TAB_QUERIES['sales'],
+                                        columns=("Order Number", "Customer", "Status", "Total", "Order Date", "Due Date"), show="headings")
         self.sales_tree.heading("Order Number", text="Order Number")
         self.sales_tree.heading("Customer", text="Customer")
         self.sales_tree.heading("Status", text="Status")
@@ -121,6 +247,7 @@ class MRPERPApp:
         self.sales_tree.heading("Order Date", text="Order Date")
         self.sales_tree.heading("Due Date", text="Due Date")
         self.sales_tree.pack(fill=tk.BOTH, expand=True)
+        self.add_search_box(self.sales_tab, self.sales_tree, 'sales_orders')
 
         # Add buttons
         button_frame = ttk.Frame(self.sales_tab)
@@ -128,10 +255,13 @@ class MRPERPApp:
 
         ttk.Button(button_frame, text="Refresh", command=self.refresh_sales).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="New Sale", command=self.create_new_sale).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="View Order", command=self.view_sales_order).pack(side=tk.LEFT, padx=5)
 
     def setup_purchasing_tab(self):
         # Create a treeview to display purchase order data
-        self.purchase_tree = ttk.Treeview(self.purchasing_tab, columns=("Order Number", "Supplier", "Status", "Total", "Order Date"), show="headings")
+        self.purchase_tree = PagedTreeview(self.purchasing_tab, self.tasks,
+                                           *TAB_QUERIES['purchasing'],
+                                           columns=("Order Number", "Supplier", "Status", "Total", "Order Date"), show="headings")
         self.purchase_tree.heading("Order Number", text="Order Number")
         self.purchase_tree.heading("Supplier", text="Supplier")
         self.purchase_tree.heading("Status", text="Status")
@@ -145,8 +275,10 @@ class MRPERPApp:
 
         ttk.Button(button_frame, text="Refresh", command=self.refresh_purchasing).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="New Purchase Order", command=self.create_new_purchase_order).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Release Drafts", command=self.release_purchase_orders).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Confirm Receipt", command=self.confirm_purchase_receipt).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Export PDF", command=self.export_purchase_order_pdf).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Plan Purchases (MRP)", command=self.plan_purchases).pack(side=tk.LEFT, padx=5)
 
     def setup_reports_tab(self):
         report_buttons = [
@@ -161,49 +293,53 @@ class MRPERPApp:
         for text, command in report_buttons:
             ttk.Button(self.reports_tab, text=text, command=command).pack(pady=5)
 
+        # Exports stream straight from the database to the file instead of going through a DataFrame
+        export_frame = ttk.Frame(self.reports_tab)
+        export_frame.pack(pady=10)
+        self.export_titles = {title: name for name, (title, query, columns) in reports.EXPORTABLE_REPORTS.items()}
+        self.export_report_var = tk.StringVar(value=next(iter(self.export_titles)))
+        ttk.Combobox(export_frame, textvariable=self.export_report_var, values=list(self.export_titles),
+                     state="readonly", width=30).pack(side=tk.LEFT, padx=5)
+        ttk.Button(export_frame, text="Export...", command=self.export_selected_report).pack(side=tk.LEFT, padx=5)
+
     def setup_query_tab(self):
         # Create a text widget for SQL input
         self.query_input = tk.Text(self.query_tab, height=10)
         self.query_input.pack(fill=tk.X, padx=5, pady=5)
 
-        # Add an execute button
-        ttk.Button(self.query_tab, text="Execute Query", command=self.execute_query).pack(pady=5)
-
-        # Create a treeview for query results
-        self.query_tree = ttk.Treeview(self.query_tab)
+        # Add execute and cancel buttons
+        button_frame = ttk.Frame(self.query_tab)
+        button_frame.pack(fill=tk.X, padx=5)
+        ttk.Button(button_frame, text="Execute Query", command=self.execute_query).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=self.cancel_query).pack(side=tk.LEFT, padx=5)
+        self.query_profile = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Profile", variable=self.query_profile,
+                        command=self.toggle_profile_panel).pack(side=tk.LEFT, padx=5)
+        self.query_status = ttk.Label(button_frame, text="")
+        self.query_status.pack(side=tk.LEFT, padx=10)
+
+        # Results stream into the grid a page at a time while the query runs
+        self.query_tree = ResultGrid(self.query_tab)
         self.query_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+        # Plan, timings and index suggestions for profiled queries; shown while Profile is ticked
+        self.profile_panel = ttk.LabelFrame(self.query_tab, text="Profile")
+        self.profile_text = tk.Text(self.profile_panel, height=12, wrap=tk.NONE)
+        self.profile_text.pack(fill=tk.BOTH, expand=True)
+        self.query_task = None
+        self.query_generation = 0
+
     def refresh_inventory(self):
-        for i in self.inventory_tree.get_children():
-            self.inventory_tree.delete(i)
-        
-        inventory_data = session.query(ItemInventory).all()
-        for item in inventory_data:
-            self.inventory_tree.insert("", "end", values=(item.item_number, item.description, item.in_stock, item.last_purchase_price))
+        self.inventory_tree.refresh()
 
     def refresh_customers(self):
-        for i in self.customer_tree.get_children():
-            self.customer_tree.delete(i)
-        
-        customer_data = session.query(CustomerContact).all()
-        for customer in customer_data:
-            self.customer_tree.insert("", "end", values=(customer.bp_code, customer.contact_name, customer.title, customer.telephone))
+        self.customer_tree.refresh()
 
     def refresh_sales(self):
-        for i in self.sales_tree.get_children():
-            self.sales_tree.delete(i)
-        
-        sales_data = session.query(SalesOrder).all()
-        for order in sales_data:
-            self.sales_tree.insert("", "end", values=(order.sales_order_number, order.bp_code, order.status_code, order.document_total, order.posting_date, order.due_date))
+        self.sales_tree.refresh()
 
     def refresh_purchasing(self):
-        for i in self.purchase_tree.get_children():
-            self.purchase_tree.delete(i)
-        
-        purchase_data = session.query(PurchaseOrder).all()
-        for order in purchase_data:
-            self.purchase_tree.insert("", "end", values=(order.purchase_order_number, order.supplier, order.status, order.total, order.order_date))
+        self.purchase_tree.refresh()
 
     def add_inventory_item(self):
         # Create a new window for adding inventory item
@@ -234,11 +370,17 @@ class MRPERPApp:
                 in_stock=float(in_stock_entry.get()),
                 last_purchase_price=float(price_entry.get())
             )
-            session.add(new_item)
-            session.commit()
-            messagebox.showinfo("Success", "New item added successfully!")
-            add_window.destroy()
-            self.refresh_inventory()
+
+            def work(session, task):
+                session.add(new_item)
+                session.commit()
+
+            def done(result):
+                messagebox.showinfo("Success", "New item added successfully!")
+                add_window.destroy()
+                self.refresh_inventory()
+
+            self.tasks.submit("Saving item", work, done)
 
         ttk.Button(add_window, text="Save", command=save_item).grid(row=4, column=1, padx=5, pady=5)
 
@@ -265,17 +407,19 @@ class MRPERPApp:
         telephone_entry.grid(row=3, column=1, padx=5, pady=5)
 
         def save_customer():
-            new_customer = CustomerContact(
-                bp_code=bp_code_entry.get(),
-                contact_name=name_entry.get(),
-                title=title_entry.get(),
-                telephone=telephone_entry.get()
-            )
-            session.add(new_customer)
-            session.commit()
-            messagebox.showinfo("Success", "New customer added successfully!")
-            add_window.destroy()
-            self.refresh_customers()
+            bp_code, contact_name = bp_code_entry.get().strip(), name_entry.get()
+            title, telephone = title_entry.get(), telephone_entry.get()
+
+            def work(session, task):
+                create_customer(session.connection(), bp_code, contact_name, title, telephone)
+                session.commit()
+
+            def done(result):
+                messagebox.showinfo("Success", "New customer added successfully!")
+                add_window.destroy()
+                self.refresh_customers()
+
+            self.tasks.submit("Saving customer", work, done)
 
         ttk.Button(add_window, text="Save", command=save_customer).grid(row=4, column=1, padx=5, pady=5)
 
@@ -289,48 +433,59 @@ class MRPERPApp:
         customer_entry = ttk.Entry(sale_window)
         customer_entry.grid(row=0, column=1, padx=5, pady=5)
 
-        ttk.Label(sale_window, text="Item Number:").grid(row=1, column=0, padx=5, pady=5)
-        item_entry = ttk.Entry(sale_window)
-        item_entry.grid(row=1, column=1, padx=5, pady=5)
-
-        ttk.Label(sale_window, text="Quantity:").grid(row=2, column=0, padx=5, pady=5)
-        quantity_entry = ttk.Entry(sale_window)
-        quantity_entry.grid(row=2, column=1, padx=5, pady=5)
-
-        ttk.Label(sale_window, text="Due Date:").grid(row=3, column=0, padx=5, pady=5)
+        ttk.Label(sale_window, text="Due Date:").grid(row=1, column=0, padx=5, pady=5)
         due_date_entry = ttk.Entry(sale_window)
-        due_date_entry.grid(row=3, column=1, padx=5, pady=5)
+        due_date_entry.grid(row=1, column=1, padx=5, pady=5)
+
+        # One line per row: item number, quantity and optionally a unit price
+        ttk.Label(sale_window, text="Lines (item quantity [price]):").grid(row=2, column=0, padx=5, pady=5, sticky=tk.N)
+        lines_text = tk.Text(sale_window, width=40, height=10)
+        lines_text.grid(row=2, column=1, padx=5, pady=5)
 
         def save_sale():
-            new_sale = SalesOrder(
-                bp_code=customer_entry.get(),
-                status_code='Open',
-                posting_date=datetime.date.today(),
-                due_date=datetime.datetime.strptime(due_date_entry.get(), '%Y-%m-%d').date(),
-                currency='USD',
-                document_total=0  # This should be calculated based on the item price and quantity
-            )
-            session.add(new_sale)
-            session.commit()
-
-            # Add sales order item
-            item = session.query(ItemInventory).filter_by(item_number=item_entry.get()).first()
-            if item:
-                new_sale_item = SalesOrderItem(
-                    sales_order_number=new_sale.sales_order_number,
-                    item_number=item.item_number,
-                    quantity=float(quantity_entry.get()),
-                    unit_price=item.last_purchase_price,
-                    total_price=float(quantity_entry.get()) * item.last_purchase_price
-                )
-                session.add(new_sale_item)
+            try:
+                lines = parse_lines(lines_text.get("1.0", tk.END))
+                due_date = datetime.datetime.strptime(due_date_entry.get(), '%Y-%m-%d').date()
+            except (OrderEntryError, ValueError) as error:
+                messagebox.showerror("Error", str(error))
+                return
+            bp_code = customer_entry.get()
+
+            def work(session, task):
+                order_number = create_sales_order(session.connection(), bp_code, lines, due_date=due_date)
                 session.commit()
+                return order_number
 
-            messagebox.showinfo("Success", "New sale created successfully!")
-            sale_window.destroy()
-            self.refresh_sales()
+            def done(order_number):
+                messagebox.showinfo("Success", f"Sales order {order_number} created with {len(lines)} lines.")
+                sale_window.destroy()
+                self.refresh_sales()
+            self.tasks.submit("Saving sale", work, done)
 
-        ttk.Button(sale_window, text="Save", command=save_sale).grid(row=4, column=1, padx=5, pady=5)
+        ttk.Button(sale_window, text="Save", command=save_sale).grid(row=3, column=1, padx=5, pady=5)
+
+    def view_sales_order(self):
+        selected_item = self.sales_tree.selection()
+        if not selected_item:
+            messagebox.showwarning("No Selection", "Please select a sales order to view.")
+            return
+
+        order_number = self.sales_tree.item(selected_item[0])['values'][0]
+
+        def work(session, task):
+            return sales_order_details(session, order_number)
+
+        def done(details):
+            if details is None:
+                messagebox.showerror("Error", "Selected order not found.")
+                return
+            order_window = tk.Toplevel(self.master)
+            order_window.title(f"Sales Order {order_number}")
+            text_widget = tk.Text(order_window)
+            text_widget.pack(fill=tk.BOTH, expand=True)
+            text_widget.insert(tk.END, details)
+
+        self.tasks.submit("Loading sales order", work, done)
 
     def create_new_purchase_order(self):
         # Create a new window for creating a purchase order
@@ -342,60 +497,94 @@ class MRPERPApp:
         supplier_entry = ttk.Entry(po_window)
         supplier_entry.grid(row=0, column=1, padx=5, pady=5)
 
-        ttk.Label(po_window, text="Item Number:").grid(row=1, column=0, padx=5, pady=5)
-        item_entry = ttk.Entry(po_window)
-        item_entry.grid(row=1, column=1, padx=5, pady=5)
-
-        ttk.Label(po_window, text="Quantity:").grid(row=2, column=0, padx=5, pady=5)
-        quantity_entry = ttk.Entry(po_window)
-        quantity_entry.grid(row=2, column=1, padx=5, pady=5)
+        ttk.Label(po_window, text="Lines (item quantity [price]):").grid(row=1, column=0, padx=5, pady=5, sticky=tk.N)
+        lines_text = tk.Text(po_window, width=40, height=10)
+        lines_text.grid(row=1, column=1, padx=5, pady=5)
 
         def save_po():
-            new_po = PurchaseOrder(
-                supplier=supplier_entry.get(),
-                status='Open',
-                total=0,  # This should be calculated based on the item price and quantity
-                order_date=datetime.date.today()
-            )
-            session.add(new_po)
-            session.commit()
-
-            # Add purchase order item
-            item = session.query(ItemInventory).filter_by(item_number=item_entry.get()).first()
-            if item:
-                new_po_item = PurchaseOrderItem(
-                    purchase_order_number=new_po.purchase_order_number,
-                    item_number=item.item_number,
-                    quantity=float(quantity_entry.get()),
-                    unit_price=item.last_purchase_price,
-                    total_price=float(quantity_entry.get()) * item.last_purchase_price
-                )
-                session.add(new_po_item)
+            try:
+                lines = parse_lines(lines_text.get("1.0", tk.END))
+            except OrderEntryError as error:
+                messagebox.showerror("Error", str(error))
+                return
+            supplier = supplier_entry.get()
+
+            def work(session, task):
+                order_number = create_purchase_order(session.connection(), supplier, lines)
                 session.commit()
+                return order_number
 
-            messagebox.showinfo("Success", "New purchase order created successfully!")
-            po_window.destroy()
+            def done(order_number):
+                messagebox.showinfo("Success", f"Purchase order {order_number} created with {len(lines)} lines.")
+                po_window.destroy()
+                self.refresh_purchasing()
+            self.tasks.submit("Saving purchase order", work, done)
+
+        ttk.Button(po_window, text="Save", command=save_po).grid(row=2, column=1, padx=5, pady=5)
+
+    def release_purchase_orders(self):
+        # The selected drafts, or every draft when nothing is selected
+        selected_items = self.purchase_tree.selection()
+        order_numbers = [self.purchase_tree.item(selected)['values'][0] for selected in selected_items] or None
+        if order_numbers is None and not messagebox.askyesno("Release Drafts", "Release every draft purchase order?"):
+            return
+
+        def work(session, task):
+            from receipts import release_purchase_orders
+            return release_purchase_orders(order_numbers)
+
+        def done(result):
+            message = (f"{len(result['orders'])} draft purchase orders released "
+                       f"({result['items']} items now on order).")
+            if result['skipped']:
+                message += f"\nNot released (not a draft): {', '.join(map(str, result['skipped']))}"
+            messagebox.showinfo("Drafts Released", message)
             self.refresh_purchasing()
+            if self.inventory_tab in self.built_tabs:
+                self.refresh_inventory()
 
-        ttk.Button(po_window, text="Save", command=save_po).grid(row=3, column=1, padx=5, pady=5)
+        self.tasks.submit("Releasing purchase orders", work, done)
 
     def confirm_purchase_receipt(self):
-        selected_item = self.purchase_tree.selection()
-        if not selected_item:
-            messagebox.showwarning("No Selection", "Please select a purchase order to confirm receipt.")
+        selected_items = self.purchase_tree.selection()
+        if not selected_items:
+            messagebox.showwarning("No Selection", "Please select the purchase orders to confirm receipt.")
             return
 
-        order_number = self.purchase_tree.item(selected_item[0])['values'][0]
-        order = session.query(PurchaseOrder).filter_by(purchase_order_number=order_number).first()
-        
-        if order:
-            order.status = 'Received'
-            order.receipt_date = datetime.date.today()
-            session.commit()
-            messagebox.showinfo("Success", f"Purchase Order {order_number} marked as received.")
+        order_numbers = [self.purchase_tree.item(selected)['values'][0] for selected in selected_items]
+
+        def work(session, task):
+            from receipts import receive_purchase_orders
+            return receive_purchase_orders(order_numbers)
+
+        def done(result):
+            message = (f"{len(result['orders'])} purchase orders marked as received "
+                       f"({result['lines']} lines, {result['items']} items restocked).")
+            if result['skipped']:
+                message += (f"\nNot received (drafts must be released first, or already received): "
+                            f"{', '.join(map(str, result['skipped']))}")
+            messagebox.showinfo("Receipt Posted", message)
             self.refresh_purchasing()
-        else:
-            messagebox.showerror("Error", "Selected order not found.")
+            if self.inventory_tab in self.built_tabs:
+                self.refresh_inventory()
+
+        self.tasks.submit("Posting receipts", work, done)
+
+    def plan_purchases(self):
+        if not messagebox.askyesno("Plan Purchases", "Replace the draft purchase orders with a new MRP plan?"):
+            return
+
+        def work(session, task):
+            from mrp import run_mrp
+            plan = run_mrp(emit=True)
+            return len(plan['item_number'])
+
+        def done(count):
+            messagebox.showinfo("Plan Purchases", f"{count:,} items need ordering. Draft purchase orders have been created; "
+                                                  "release them to place the orders.")
+            self.refresh_purchasing()
+
+        self.tasks.submit("Planning purchases", work, done)
 
     def export_purchase_order_pdf(self):
         selected_item = self.purchase_tree.selection()
@@ -404,88 +593,133 @@ class MRPERPApp:
             return
 
         order_number = self.purchase_tree.item(selected_item[0])['values'][0]
-        order = session.query(PurchaseOrder).filter_by(purchase_order_number=order_number).first()
-        
-        if order:
-            filename = filedialog.asksaveasfilename(defaultextension=".pdf")
-            if filename:
+        filename = filedialog.asksaveasfilename(defaultextension=".pdf")
+        if not filename:
+            return
+
+        def work(session, task):
+            from pdf_generator import generate_pdf, purchase_order_query
+            order = session.scalars(purchase_order_query(order_number, order_number)).first()
+            if order:
                 generate_pdf(order, filename)
+            return order is not None
+
+        def done(found):
+            if found:
                 messagebox.showinfo("Success", f"Purchase Order exported to {filename}")
-        else:
-            messagebox.showerror("Error", "Selected order not found.")
+            else:
+                messagebox.showerror("Error", "Selected order not found.")
+
+        self.tasks.submit("Exporting purchase order", work, done)
+
+    def export_purchase_order_pdfs(self):
+        output_dir = filedialog.askdirectory(title="Export purchase orders to")
+        if not output_dir:
+            return
+
+        def work(session, task):
+            from pdf_generator import export_purchase_orders
+            return export_purchase_orders(session, output_dir, cancel_event=task.cancel_event)
+
+        def done(result):
+            if result['cancelled']:
+                messagebox.showinfo("Export Cancelled", f"Export cancelled after {result['orders']} purchase orders; "
+                                                        f"their files are in {output_dir}")
+                return
+            messagebox.showinfo("Export Complete", f"Exported {result['orders']} purchase orders "
+                                                   f"({result['pages']} pages) to {output_dir}")
+
+        self.tasks.submit("Exporting purchase orders", work, done)
+
+    def export_selected_report(self):
+        title = self.export_report_var.get()
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet"), ("PDF", "*.pdf")]
+        )
+        if not filename:
+            return
+
+        def work(session, task):
+            return export_report(self.export_titles[title], filename, cancel_event=task.cancel_event)
+
+        def done(result):
+            messagebox.showinfo("Export Complete", f"Exported {result['rows']} rows of {title} to:\n"
+                                                   + "\n".join(result['files']))
+
+        self.tasks.submit(f"Exporting {title}", work, done)
 
     def generate_inventory_report(self):
-        inventory_data = session.query(ItemInventory).all()
-        df = pd.DataFrame([(item.item_number, item.in_stock) for item in inventory_data], columns=['Item Number', 'In Stock'])
-        
-        fig, ax = plt.subplots(figsize=(10, 6))
-        df.plot(kind='bar', x='Item Number', y='In Stock', ax=ax)
-        ax.set_title('Inventory Levels')
-        ax.set_xlabel('Item Number')
-        ax.set_ylabel('In Stock')
-        plt.xticks(rotation=45)
-        
-        self.show_plot(fig)
+        def work(session, task):
+            _pyplot()
+            return reports.inventory_levels(session)
+
+        def done(df):
+            plt = _pyplot()
+            fig, ax = plt.subplots(figsize=(10, 6))
+            df.plot(kind='bar', x='Item Number', y='In Stock', ax=ax)
+            ax.set_title('Inventory Levels')
+            ax.set_xlabel('Item Number')
+            ax.set_ylabel('In Stock')
+            plt.xticks(rotation=45)
+
+            self.show_plot(fig)
+
+        self.tasks.submit("Inventory report", work, done)
 
     def generate_sales_report(self):
-        sales_data = session.query(SalesOrder).all()
-        df = pd.DataFrame([(order.sales_order_number, order.document_total, order.posting_date) for order in sales_data], 
-                          columns=['Order Number', 'Total', 'Date'])
-        df['Date'] = pd.to_datetime(df['Date'])
-        df = df.sort_values('Date')
-        
-        fig, ax = plt.subplots(figsize=(10, 6))
-        df.plot(kind='line', x='Date', y='Total', ax=ax)
-        ax.set_title('Sales Over Time')
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Total Sales')
-        
-        self.show_plot(fig)
+        def work(session, task):
+            _pyplot()
+            return reports.sales_over_time(session)
+
+        def done(df):
+            plt = _pyplot()
+            fig, ax = plt.subplots(figsize=(10, 6))
+            df.plot(kind='line', x='Date', y='Total', ax=ax)
+            ax.set_title('Sales Over Time')
+            ax.set_xlabel('Date')
+            ax.set_ylabel('Total Sales')
+
+            self.show_plot(fig)
+
+        self.tasks.submit("Sales report", work, done)
 
     def generate_reorder_report(self):
-        inventory_data = session.query(ItemInventory).all()
-        df = pd.DataFrame([(item.item_number, item.in_stock, item.qty_ordered_by_customers) for item in inventory_data], 
-                          columns=['Item Number', 'In Stock', 'Ordered by Customers'])
-        
-        df['Needs Reorder'] = df['In Stock'] < df['Ordered by Customers']
-        reorder_items = df[df['Needs Reorder']]
-        
-        fig, ax = plt.subplots(figsize=(10, 6))
-        reorder_items.plot(kind='bar', x='Item Number', y=['In Stock', 'Ordered by Customers'], ax=ax)
-        ax.set_title('Items Needing Reorder')
-        ax.set_xlabel('Item Number')
-        ax.set_ylabel('Quantity')
-        plt.xticks(rotation=45)
-        
-        self.show_plot(fig)
+        def work(session, task):
+            _pyplot()
+            return reports.reorder_items(session)
+
+        def done(reorder_items):
+            plt = _pyplot()
+            fig, ax = plt.subplots(figsize=(10, 6))
+            reorder_items.plot(kind='bar', x='Item Number', y=['In Stock', 'Ordered by Customers'], ax=ax)
+            ax.set_title('Items Needing Reorder')
+            ax.set_xlabel('Item Number')
+            ax.set_ylabel('Quantity')
+            plt.xticks(rotation=45)
+
+            self.show_plot(fig)
+
+        self.tasks.submit("Reorder report", work, done)
 
     def view_low_stock_items(self):
-        inventory_data = session.query(ItemInventory).filter(ItemInventory.in_stock < 10).all()
-        df = pd.DataFrame([(item.item_number, item.description, item.in_stock) for item in inventory_data], 
-                          columns=['Item Number', 'Description', 'In Stock'])
-        self.show_dataframe(df, "Low Stock Items")
+        self.tasks.submit("Low stock items", lambda session, task: reports.low_stock_items(session),
+                          lambda df: self.show_dataframe(df, "Low Stock Items"))
 
     def view_top_customers(self):
-        sales_data = session.query(SalesOrder).all()
-        df = pd.DataFrame([(order.bp_code, order.document_total) for order in sales_data], 
-                          columns=['Customer', 'Total'])
-        df = df.groupby('Customer').sum().sort_values('Total', ascending=False).head(10)
-        self.show_dataframe(df, "Top 10 Customers by Sales")
+        self.tasks.submit("Top 10 customers", lambda session, task: reports.top_customers(session),
+                          lambda df: self.show_dataframe(df, "Top 10 Customers by Sales"))
 
     def view_monthly_sales(self):
-        sales_data = session.query(SalesOrder).all()
-        df = pd.DataFrame([(order.posting_date, order.document_total) for order in sales_data], 
-                          columns=['Date', 'Total'])
-        df['Date'] = pd.to_datetime(df['Date'])
-        df = df.set_index('Date')
-        monthly_sales = df.resample('M').sum()
-        self.show_dataframe(monthly_sales, "Monthly Sales Report")
+        self.tasks.submit("Monthly sales", lambda session, task: reports.monthly_sales(session),
+                          lambda df: self.show_dataframe(df, "Monthly Sales Report"))
 
     def show_plot(self, fig):
         for widget in self.reports_tab.winfo_children():
             if isinstance(widget, tk.Canvas):
                 widget.destroy()
 
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         canvas = FigureCanvasTkAgg(fig, master=self.reports_tab)
         canvas_widget = canvas.get_tk_widget()
         canvas_widget.pack()
@@ -500,26 +734,112 @@ class MRPERPApp:
 
     def execute_query(self):
         query = self.query_input.get("1.0", tk.END).strip()
-        try:
-            result = session.execute(query)
-            self.display_query_results(result)
-        except Exception as e:
-            messagebox.showerror("Query Error", str(e))
+        if not query:
+            return
+
+        # Only one query runs at a time; pages from an earlier one are dropped when they arrive
+        self.cancel_query()
+        self.query_generation += 1
+        generation = self.query_generation
+        self.query_tree.reset([])
+        self.query_status.configure(text="Running...")
+
+        def show_page(columns, rows, count, elapsed):
+            if generation != self.query_generation:
+                return
+            if count == len(rows):
+                self.query_tree.reset(columns)
+            self.query_tree.append_rows(rows)
+            self.query_status.configure(text=self.query_progress(count, elapsed))
+
+        profiling = self.query_profile.get()
+        if profiling:
+            self.show_profile("Profiling...")
+
+        def work(session, task):
+            on_page = lambda *page: task.call_in_ui(show_page, *page)
+            if profiling:
+                return profile_query(session, query, task, on_page)
+            return run_logged_query(session, query, task, on_page)
+
+        def done(summary):
+            if generation != self.query_generation:
+                return
+            if profiling:
+                self.show_profile(format_profile(summary))
+            if summary['affected'] is not None:
+                self.query_status.configure(text=f"{summary['affected']} rows affected in {summary['elapsed']:.2f}s")
+                return
+            message = self.query_progress(summary['rows'], summary['elapsed'])
+            if summary['truncated']:
+                message += f" - stopped at the {QUERY_MAX_ROWS:,} row limit"
+            if summary['cached']:
+                message += " - from the query cache"
+            self.query_status.configure(text=message)
+
+        def failed(error):
+            if generation == self.query_generation:
+                self.query_status.configure(text="Failed.")
+                if profiling:
+                    self.show_profile("")
+            messagebox.showerror("Query Error", str(error))
+
+        self.query_task = self.tasks.submit("Running query", work, done, failed)
+
+    def cancel_query(self):
+        if self.query_task is not None and not self.query_task.cancelled:
+            self.query_task.cancel()
+            self.query_status.configure(text="Cancelled.")
+
+    def toggle_profile_panel(self):
+        if self.query_profile.get():
+            self.profile_panel.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        else:
+            self.profile_panel.pack_forget()
 
-    def display_query_results(self, result):
-        for i in self.query_tree.get_children():
-            self.query_tree.delete(i)
+    def show_profile(self, report):
+        self.profile_text.delete("1.0", tk.END)
+        self.profile_text.insert(tk.END, report)
 
-        columns = result.keys()
-        self.query_tree["columns"] = columns
-        for col in columns:
-            self.query_tree.heading(col, text=col)
-            self.query_tree.column(col, width=100)
+    def show_slow_queries(self):
+        def work(session, task):
+            return format_slow_queries(top_slow_queries(session))
 
-        for row in result:
-            self.query_tree.insert("", "end", values=tuple(row))
+        def done(report):
+            log_window = tk.Toplevel(self.master)
+            log_window.title("Slow Query Log")
+            text_widget = tk.Text(log_window, wrap=tk.NONE)
+            text_widget.pack(fill=tk.BOTH, expand=True)
+            text_widget.insert(tk.END, report)
+            ttk.Button(log_window, text="Clear Log", command=lambda: self.clear_slow_query_log(log_window)).pack(pady=5)
+
+        self.tasks.submit("Loading slow query log", work, done)
+
+    def clear_slow_query_log(self, log_window):
+        self.tasks.submit("Clearing slow query log", lambda session, task: clear_slow_queries(session),
+                          lambda result: log_window.destroy())
+
+    def query_progress(self, count, elapsed):
+        rate = count / elapsed if elapsed else 0
+        return f"{count:,} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)"
 
 if __name__ == "__main__":
+    init_db()
     root = tk.Tk()
     app = MRPERPApp(root)
-    root.mainloop()
\ No newline at end of file
+
+    # First paint: the window is mapped and the redraws queued while building it have run
+    root.wait_visibility()
+    root.update_idletasks()
+    first_paint_ms = (time.perf_counter() - STARTED) * 1000
+    if UI_STARTUP_PROBE or first_paint_ms > UI_FIRST_PAINT_TARGET_MS:
+        print(f"First paint after {first_paint_ms:.0f} ms (target {UI_FIRST_PAINT_TARGET_MS} ms)")
+    if UI_STARTUP_PROBE:
+        app.tasks.shutdown()
+        root.destroy()
+        sys.exit(0 if first_paint_ms <= UI_FIRST_PAINT_TARGET_MS else 1)
+
+    root.mainloop()
+    app.tasks.shutdown()
+    if app.stall_monitor is not None:
+        print(f"Max UI stall: {app.stall_monitor.max_stall_ms:.0f} ms")
\ No newline at end of file
@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Float, Date, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship, scoped_session, sessionmaker, joinedload, selectinload
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 import os
 import sys
@@ -9,20 +10,64 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
-from config.config import DATABASE_URI
+from config.config import DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW, SQLITE_BUSY_TIMEOUT, SQLITE_PRAGMAS
 
 Base = declarative_base()
 
+class Manufacturer(Base):
+    __tablename__ = 'manufacturer'
+
+    manufacturer_code = Column(String, primary_key=True)
+    manufacturer_name = Column(String)
+    telephone = Column(String)
+    discount_percent = Column(Float)
+    federal_tax_id = Column(String)
+    currency = Column(String)
+
 class ItemInventory(Base):
     __tablename__ = 'item_inventory'
     
     item_number = Column(String, primary_key=True)
     description = Column(String)
-    manufacturer = Column(String)
-    in_stock = Column(Float)
+    manufacturer = Column(String, ForeignKey('manufacturer.manufacturer_code'), index=True)
+    in_stock = Column(Float, index=True)
     qty_ordered_by_customers = Column(Float)
     qty_ordered_from_vendors = Column(Float)
     last_purchase_price = Column(Float)
+    # MRP planning parameters; NULL falls back to the MRP_* defaults in config.py
+    safety_stock = Column(Float)
+    lead_time_days = Column(Float)
+    min_order_qty = Column(Float)
+    order_multiple = Column(Float)
+
+class BusinessPartner(Base):
+    __tablename__ = 'business_partner'
+
+    bp_code = Column(String, primary_key=True)
+    bp_name = Column(String)
+    bp_type = Column(String)
+    telephone = Column(String)
+    account_balance = Column(Float)
+    credit_limit = Column(Float)
+    discount_percent = Column(Float)
+    federal_tax_id = Column(String)
+    currency = Column(String)
+
+    addresses = relationship("BPAddress", back_populates="business_partner")
+
+class BPAddress(Base):
+    __tablename__ = 'bp_address'
+
+    bp_code = Column(String, ForeignKey('business_partner.bp_code'), primary_key=True)
+    address_type = Column(String, primary_key=True)
+    street = Column(String)
+    city = Column(String)
+    state = Column(String)
+    zip_code = Column(String)
+    country = Column(String)
+    tax_code = Column(String)
+
+    business_partner = relationship("BusinessPartner", back_populates="addresses")
 
 class CustomerContact(Base):
     __tablename__ = 'customer_contact'
@@ -34,13 +79,23 @@ class CustomerContact(Base):
     telephone = Column(String)
     email = Column(String)
 
+class SalesOrderStatus(Base):
+    __tablename__ = 'sales_order_status'
+
+    status_code = Column(String, primary_key=True)
+    description = Column(String)
+
 class SalesOrder(Base):
     __tablename__ = 'sales_order'
+    __table_args__ = (
+        # Per-customer reports over a date range; also serves plain bp_code lookups
+        Index('ix_sales_order_customer_date', 'bp_code', 'posting_date'),
+    )
     
     sales_order_number = Column(Integer, primary_key=True)
-    bp_code = Column(String, ForeignKey('customer_contact.bp_code'))
+    bp_code = Column(String, ForeignKey('business_partner.bp_code'))
     status_code = Column(String)
-    posting_date = Column(Date)
+    posting_date = Column(Date, index=True)
     due_date = Column(Date)
     promise_date = Column(Date)
     currency = Column(String)
@@ -52,22 +107,32 @@ class SalesOrder(Base):
     paid_to_date = Column(Float)
     remarks = Column(String)
 
-    customer = relationship("CustomerContact")
+    customer = relationship("CustomerContact", primaryjoin="foreign(SalesOrder.bp_code) == CustomerContact.bp_code", viewonly=True)
     items = relationship("SalesOrderItem", back_populates="sales_order")
 
 class SalesOrderItem(Base):
     __tablename__ = 'sales_order_item'
+    __table_args__ = (
+        Index('ix_sales_order_item_order_line', 'sales_order_number', 'line_number', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     sales_order_number = Column(Integer, ForeignKey('sales_order.sales_order_number'))
-    item_number = Column(String, ForeignKey('item_inventory.item_number'))
+    line_number = Column(Integer)
+    item_number = Column(String, ForeignKey('item_inventory.item_number'), index=True)
     quantity = Column(Float)
     unit_price = Column(Float)
+    discount_percent = Column(Float)
     total_price = Column(Float)
 
     sales_order = relationship("SalesOrder", back_populates="items")
     item = relationship("ItemInventory")
 
+# Purchase order statuses the application itself sets
+DRAFT_STATUS = 'Draft'
+OPEN_STATUS = 'Open'
+RECEIVED_STATUS = 'Received'
+
 class PurchaseOrder(Base):
     __tablename__ = 'purchase_order'
     
@@ -77,6 +142,8 @@ class PurchaseOrder(Base):
     total = Column(Float)
     order_date = Column(Date)
     receipt_date = Column(Date)
+    # When the supplier should deliver; receipt_date stays empty until the goods arrive
+    expected_date = Column(Date)
 
     items = relationship("PurchaseOrderItem", back_populates="purchase_order")
 
@@ -84,8 +151,8 @@ class PurchaseOrderItem(Base):
     __tablename__ = 'purchase_order_item'
     
     id = Column(Integer, primary_key=True)
-    purchase_order_number = Column(Integer, ForeignKey('purchase_order.purchase_order_number'))
-    item_number = Column(String, ForeignKey('item_inventory.item_number'))
+    purchase_order_number = Column(Integer, ForeignKey('purchase_order.purchase_order_number'), index=True)
+    item_number = Column(String, ForeignKey('item_inventory.item_number'), index=True)
     quantity = Column(Float)
     unit_price = Column(Float)
     total_price = Column(Float)
@@ -93,8 +160,183 @@ class PurchaseOrderItem(Base):
     purchase_order = relationship("PurchaseOrder", back_populates="items")
     item = relationship("ItemInventory")
 
+class SalesByCustomer(Base):
+    __tablename__ = 'sales_by_customer'
+
+    bp_code = Column(String, primary_key=True)
+    order_count = Column(Integer)
+    total = Column(Float)
+
+class SalesByMonth(Base):
+    __tablename__ = 'sales_by_month'
+
+    month = Column(String, primary_key=True)
+    order_count = Column(Integer)
+    total = Column(Float)
+
+class SalesByStatus(Base):
+    __tablename__ = 'sales_by_status'
+
+    status_code = Column(String, primary_key=True)
+    order_count = Column(Integer)
+    total = Column(Float)
+
+class SalesByItem(Base):
+    __tablename__ = 'sales_by_item'
+
+    item_number = Column(String, primary_key=True)
+    line_count = Column(Integer)
+    quantity = Column(Float)
+    total = Column(Float)
+
+class ImportFile(Base):
+    __tablename__ = 'import_file'
+
+    file_path = Column(String, primary_key=True)
+    size = Column(Integer)
+    modified_time = Column(Float)
+    content_hash = Column(String)
+    imported_at = Column(DateTime)
+
+class ImportRowHash(Base):
+    __tablename__ = 'import_row_hash'
+
+    table_name = Column(String, primary_key=True)
+    row_key = Column(String, primary_key=True)
+    row_hash = Column(String)
+
+class StockMovement(Base):
+    # Append-only ledger of stock changes; rows are inserted, never updated or deleted
+    __tablename__ = 'stock_movement'
+
+    id = Column(Integer, primary_key=True)
+    item_number = Column(String, ForeignKey('item_inventory.item_number'), index=True)
+    quantity = Column(Float)
+    movement_type = Column(String)
+    purchase_order_number = Column(Integer, index=True)
+    posted_at = Column(DateTime)
+
+class SlowQuery(Base):
+    # One row per distinct statement run from the Query tab that went over SLOW_QUERY_MS, failed or not
+    __tablename__ = 'slow_query_log'
+
+    sql_hash = Column(String, primary_key=True)
+    sql = Column(String)
+    calls = Column(Integer)
+    total_ms = Column(Float)
+    max_ms = Column(Float)
+    last_ms = Column(Float)
+    last_rows = Column(Integer)
+    last_run = Column(DateTime)
+    plan = Column(String)
+    # Set when the last run failed, timed out or was cancelled
+    last_error = Column(String)
+
+# Loader options for code that renders whole orders. Lines come back in one extra SELECT
+# with their items joined in, so the query count does not grow with the number of lines.
+PURCHASE_ORDER_DETAIL = (
+    selectinload(PurchaseOrder.items).joinedload(PurchaseOrderItem.item),
+)
+SALES_ORDER_DETAIL = (
+    joinedload(SalesOrder.customer),
+    selectinload(SalesOrder.items).joinedload(SalesOrderItem.item),
+)
+
+# (columns, key column) of the paged list on each tab; the benchmarks page through the same queries
+TAB_QUERIES = {
+    'inventory': ((ItemInventory.item_number, ItemInventory.description, ItemInventory.in_stock,
+                   ItemInventory.last_purchase_price), ItemInventory.item_number),
+    'customers': ((CustomerContact.bp_code, CustomerContact.contact_name, CustomerContact.title,
+                   CustomerContact.telephone), CustomerContact.bp_code),
+    'sales': ((SalesOrder.sales_order_number, SalesOrder.bp_code, SalesOrder.status_code, SalesOrder.document_total,
+               SalesOrder.posting_date, SalesOrder.due_date), SalesOrder.sales_order_number),
+    'purchasing': ((PurchaseOrder.purchase_order_number, PurchaseOrder.supplier, PurchaseOrder.status,
+                    PurchaseOrder.total, PurchaseOrder.order_date), PurchaseOrder.purchase_order_number)
+}
+
+def migrate_schema(engine):
+    # create_all() only creates missing tables, so add new columns and indexes to existing ones
+    inspector = inspect(engine)
+    created_indexes = False
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    created_indexes = True
+
+        # Refresh the planner statistics so the new indexes are actually picked
+        if created_indexes and engine.dialect.name == 'sqlite':
+            conn.execute(text("ANALYZE"))
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def create_db_engine(uri=DATABASE_URI, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW):
+    if not uri.startswith('sqlite'):
+        return create_engine(uri, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+
+    # WAL lets the UI and reports keep reading while an import is writing. Pooled connections
+    # are handed between threads, and the busy timeout makes writers queue instead of failing.
+    db_engine = create_engine(
+        uri,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        connect_args={'timeout': SQLITE_BUSY_TIMEOUT, 'check_same_thread': False}
+    )
+    event.listen(db_engine, 'connect', _apply_sqlite_pragmas)
+    return db_engine
+
 # Create database engine
-engine = create_engine(DATABASE_URI)
+engine = create_db_engine()
+
+# Sessions are scoped per thread; call Session.remove() when a thread is done with its session
+Session = scoped_session(sessionmaker(bind=engine))
+
+class QueryCounter:
+    # Records every statement sent to the engine while active, from any thread:
+    #     with QueryCounter() as counter:
+    #         ...
+    #     counter.selects
+    def __init__(self, bind=None):
+        self.bind = bind if bind is not None else engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.bind, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.bind, 'before_cursor_execute', self._record)
+
+    @property
+    def selects(self):
+        return sum(1 for statement in self.statements if statement.lstrip().upper().startswith(('SELECT', 'WITH')))
+
+def init_db(bind=None):
+    # Entry points call this once at startup; importing the models never touches the database
+    bind = bind if bind is not None else engine
+    Base.metadata.create_all(bind)
+    migrate_schema(bind)
 
-# Create all tables
-Base.metadata.create_all(engine)
\ No newline at end of file
+    # Full-text search indexes live in search.py, which builds on these models
+    from search import create_search_indexes
+    with bind.begin() as conn:
+        create_search_indexes(conn)
\ No newline at end of file
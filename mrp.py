@@ -0,0 +1,174 @@
+from sqlalchemy import select, func, insert, delete
+import argparse
+import csv
+import datetime
+import numpy as np
+import os
+import sys
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import (engine, init_db, ItemInventory, SalesOrder, SalesOrderItem, PurchaseOrder, PurchaseOrderItem,
+                    DRAFT_STATUS)
+from order_entry import next_number
+from config.config import MRP_DEMAND_DAYS, MRP_LEAD_TIME_DAYS, MRP_SAFETY_DAYS, MRP_ORDER_COVER_DAYS
+
+# MRP netting over the whole item master. The item master and the recent sales per item are read
+# with one query into NumPy arrays, and every item is planned at once:
+#     available      = in stock + on order from vendors - committed to customers
+#     daily demand   = quantity sold over the last MRP_DEMAND_DAYS / MRP_DEMAND_DAYS
+#     safety stock   = the item's safety_stock, or MRP_SAFETY_DAYS of demand
+#     reorder point  = demand over the lead time + safety stock
+#     order quantity = enough to bring available up to the reorder point plus MRP_ORDER_COVER_DAYS
+#                      of demand, rounded up to the order multiple and at least the minimum order
+# Items whose available quantity is below the reorder point get a draft purchase order line.
+# Lines are grouped into one draft purchase order per manufacturer, replacing the previous drafts.
+# Drafts are not on order yet; receipts.release_drafts (erp.py release) makes them Open orders.
+#     python mrp.py [--emit] [--output plan.csv]
+
+MRP_FETCH_SIZE = 100000
+TEXT_COLUMNS = ('item_number', 'manufacturer')
+NUMBER_COLUMNS = ('in_stock', 'committed', 'on_order', 'unit_price', 'safety_stock', 'lead_time_days',
+                  'min_order_qty', 'order_multiple', 'demand')
+PLAN_COLUMNS = ('item_number', 'manufacturer', 'available', 'daily_demand', 'safety_stock', 'reorder_point',
+                'net_requirement', 'order_quantity', 'unit_price', 'lead_time_days')
+
+def planning_query(since):
+    demand = (
+        select(SalesOrderItem.item_number, func.sum(SalesOrderItem.quantity).label('quantity'))
+        .join(SalesOrder, SalesOrder.sales_order_number == SalesOrderItem.sales_order_number)
+        .where(SalesOrder.posting_date >= since)
+        .group_by(SalesOrderItem.item_number)
+        .subquery()
+    )
+    return (
+        select(
+            ItemInventory.item_number, ItemInventory.manufacturer, ItemInventory.in_stock,
+            ItemInventory.qty_ordered_by_customers, ItemInventory.qty_ordered_from_vendors,
+            ItemInventory.last_purchase_price, ItemInventory.safety_stock, ItemInventory.lead_time_days,
+            ItemInventory.min_order_qty, ItemInventory.order_multiple, demand.c.quantity
+        )
+        .outerjoin(demand, demand.c.item_number == ItemInventory.item_number)
+    )
+
+def load_planning_data(conn, as_of=None, demand_days=MRP_DEMAND_DAYS):
+    as_of = as_of or datetime.date.today()
+    stmt = planning_query(as_of - datetime.timedelta(days=demand_days))
+
+    # Rows come straight from the driver cursor, a batch at a time; building SQLAlchemy Row objects
+    # for every item costs more than the netting itself
+    cursor = conn.connection.cursor()
+    cursor.execute(str(stmt.compile(conn, compile_kwargs={'literal_binds': True})))
+    item_numbers, manufacturers, numbers = [], [], []
+    while True:
+        rows = cursor.fetchmany(MRP_FETCH_SIZE)
+        if not rows:
+            break
+        item_numbers.extend(row[0] for row in rows)
+        manufacturers.extend(row[1] or '' for row in rows)
+        # NULL becomes NaN, so missing parameters can be told apart from zero
+        numbers.append(np.array([row[len(TEXT_COLUMNS):] for row in rows], dtype=float))
+    cursor.close()
+
+    numbers = np.concatenate(numbers) if numbers else np.empty((0, len(NUMBER_COLUMNS)))
+    data = {'item_number': np.array(item_numbers, dtype=object), 'manufacturer': np.array(manufacturers, dtype=object)}
+    for index, name in enumerate(NUMBER_COLUMNS):
+        data[name] = numbers[:, index]
+    return data
+
+def plan_requirements(data, demand_days=MRP_DEMAND_DAYS, lead_time_days=MRP_LEAD_TIME_DAYS,
+                      safety_days=MRP_SAFETY_DAYS, cover_days=MRP_ORDER_COVER_DAYS):
+    quantity = lambda name: np.nan_to_num(data[name])
+    with_default = lambda name, default: np.where(np.isnan(data[name]), default, data[name])
+
+    available = quantity('in_stock') + quantity('on_order') - quantity('committed')
+    daily_demand = quantity('demand') / demand_days
+    lead_time = with_default('lead_time_days', lead_time_days)
+    safety_stock = with_default('safety_stock', np.ceil(daily_demand * safety_days))
+    reorder_point = daily_demand * lead_time + safety_stock
+
+    net_requirement = np.maximum(reorder_point + daily_demand * cover_days - available, 0)
+    multiple = with_default('order_multiple', 1)
+    multiple = np.where(multiple > 0, multiple, 1)
+    order_quantity = np.maximum(np.ceil(net_requirement / multiple) * multiple, quantity('min_order_qty'))
+
+    reorder = (available < reorder_point) & (net_requirement > 0)
+    plan = {
+        'item_number': data['item_number'], 'manufacturer': data['manufacturer'], 'available': available,
+        'daily_demand': daily_demand, 'safety_stock': safety_stock, 'reorder_point': reorder_point,
+        'net_requirement': net_requirement, 'order_quantity': order_quantity,
+        'unit_price': data['unit_price'], 'lead_time_days': lead_time
+    }
+    return {name: values[reorder] for name, values in plan.items()}
+
+def create_draft_purchase_orders(conn, plan, order_date=None):
+    order_date = order_date or datetime.date.today()
+
+    # Drafts from the previous run are replaced, so planning twice does not order twice
+    drafts = select(PurchaseOrder.purchase_order_number).where(PurchaseOrder.status == DRAFT_STATUS)
+    conn.execute(delete(PurchaseOrderItem).where(PurchaseOrderItem.purchase_order_number.in_(drafts)))
+    conn.execute(delete(PurchaseOrder).where(PurchaseOrder.status == DRAFT_STATUS))
+    if not len(plan['item_number']):
+        return 0, 0
+
+    suppliers, supplier_index = np.unique(plan['manufacturer'].astype(str), return_inverse=True)
+    first_number = next_number(conn, PurchaseOrder.purchase_order_number)
+    order_numbers = supplier_index + first_number
+
+    line_totals = plan['order_quantity'] * np.nan_to_num(plan['unit_price'])
+    order_totals = np.bincount(supplier_index, weights=line_totals, minlength=len(suppliers))
+    lead_times = np.zeros(len(suppliers))
+    np.maximum.at(lead_times, supplier_index, plan['lead_time_days'])
+
+    orders = [
+        {'purchase_order_number': first_number + index, 'supplier': supplier or None, 'status': DRAFT_STATUS,
+         'total': total, 'order_date': order_date, 'expected_date': order_date + datetime.timedelta(days=days)}
+        for index, (supplier, total, days) in enumerate(zip(suppliers.tolist(), order_totals.tolist(), lead_times.tolist()))
+    ]
+    lines = [
+        {'purchase_order_number': number, 'item_number': item_number, 'quantity': quantity,
+         'unit_price': None if price != price else price, 'total_price': total}
+        for number, item_number, quantity, price, total in zip(
+            order_numbers.tolist(), plan['item_number'].tolist(), plan['order_quantity'].tolist(),
+            plan['unit_price'].tolist(), line_totals.tolist())
+    ]
+    conn.execute(insert(PurchaseOrder.__table__), orders)
+    conn.execute(insert(PurchaseOrderItem.__table__), lines)
+    return len(orders), len(lines)
+
+def write_plan_csv(plan, filename):
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(PLAN_COLUMNS)
+        writer.writerows(zip(*(plan[name].tolist() for name in PLAN_COLUMNS)))
+
+def run_mrp(emit=False, output=None, as_of=None):
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        data = load_planning_data(conn, as_of)
+        loaded = time.perf_counter()
+        plan = plan_requirements(data)
+        planned = time.perf_counter()
+        orders, lines = create_draft_purchase_orders(conn, plan, as_of) if emit else (0, 0)
+
+    if output:
+        write_plan_csv(plan, output)
+    elapsed = time.perf_counter() - started
+    print(f"Planned {len(data['item_number']):,} items in {elapsed:.2f}s "
+          f"(load {loaded - started:.2f}s, netting {planned - loaded:.3f}s): {len(plan['item_number']):,} to reorder.")
+    if emit:
+        print(f"Created {orders:,} draft purchase orders with {lines:,} lines.")
+    return plan
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan purchases for every item and optionally create draft purchase orders.")
+    parser.add_argument('--emit', action='store_true', help="replace the draft purchase orders with this plan")
+    parser.add_argument('--output', help="write the planned order lines to a CSV file")
+    args = parser.parse_args()
+
+    init_db()
+    run_mrp(args.emit, args.output)
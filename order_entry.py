@@ -0,0 +1,203 @@
+from sqlalchemy import select, func, insert, update, bindparam, false, text
+import argparse
+import csv
+import datetime
+import os
+import sys
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import (engine, init_db, ItemInventory, BusinessPartner, CustomerContact, SalesOrder, SalesOrderItem,
+                    PurchaseOrder, PurchaseOrderItem, OPEN_STATUS)
+from summaries import refresh_order_summaries
+from config.config import SALES_TAX_PERCENT
+
+# Creates sales and purchase orders with any number of lines in one transaction. Lines are
+# (item_number, quantity) or (item_number, quantity, unit_price). All catalog prices are read
+# with one IN (...) query, totals are computed in a single pass over the lines, and the header,
+# the lines and the ordered quantities on the items are written with one statement each.
+#     python order_entry.py sales C0001 lines.csv --due 2026-11-30
+#     python order_entry.py purchase M0001 lines.csv
+
+# Keeps each IN (...) list under SQLite's limit on bound parameters
+PRICE_LOOKUP_BATCH = 10000
+
+class OrderEntryError(Exception):
+    pass
+
+def _item_prices(conn, item_numbers):
+    item_numbers = list(dict.fromkeys(item_numbers))
+    prices = {}
+    for start in range(0, len(item_numbers), PRICE_LOOKUP_BATCH):
+        batch = item_numbers[start:start + PRICE_LOOKUP_BATCH]
+        prices.update(conn.execute(
+            select(ItemInventory.item_number, ItemInventory.last_purchase_price)
+            .where(ItemInventory.item_number.in_(batch))
+        ).all())
+    return prices
+
+def price_lines(conn, lines):
+    # -> [(item_number, quantity, unit_price, total_price, unit_cost)], subtotal, cost
+    lines = [tuple(line) for line in lines]
+    if not lines:
+        raise OrderEntryError("An order needs at least one line.")
+    prices = _item_prices(conn, [line[0] for line in lines])
+    unknown = sorted({line[0] for line in lines} - prices.keys())
+    if unknown:
+        raise OrderEntryError(f"Unknown items: {', '.join(unknown)}")
+
+    priced = []
+    subtotal = cost = 0.0
+    for line in lines:
+        item_number = line[0]
+        try:
+            quantity = float(line[1])
+            unit_price = float(line[2]) if len(line) > 2 and line[2] not in (None, '') else None
+        except ValueError:
+            raise OrderEntryError(f"Could not read the quantity or price for {item_number}.")
+        if quantity <= 0:
+            raise OrderEntryError(f"Quantity for {item_number} must be positive.")
+        unit_cost = prices[item_number] or 0.0
+        unit_price = unit_cost if unit_price is None else unit_price
+        total_price = round(quantity * unit_price, 2)
+        priced.append((item_number, quantity, unit_price, total_price, unit_cost))
+        subtotal += total_price
+        cost += quantity * unit_cost
+    return priced, round(subtotal, 2), round(cost, 2)
+
+def _add_ordered_quantities(conn, column, priced):
+    quantities = {}
+    for item_number, quantity, unit_price, total_price, unit_cost in priced:
+        quantities[item_number] = quantities.get(item_number, 0) + quantity
+    conn.execute(
+        update(ItemInventory)
+        .where(ItemInventory.item_number == bindparam('item'))
+        .values({column: func.coalesce(column, 0) + bindparam('quantity')}),
+        [{'item': item_number, 'quantity': quantity} for item_number, quantity in quantities.items()]
+    )
+
+def lock_numbers(conn, table):
+    # Order numbers are max() + 1, so two writers reading max() at the same time would take the
+    # same number. The lock is held by the caller's transaction until the order is committed.
+    if conn.dialect.name == 'postgresql':
+        # Conflicts with itself and with other writers to the table, but not with readers
+        conn.execute(text(f"LOCK TABLE {table.name} IN SHARE ROW EXCLUSIVE MODE"))
+    else:
+        # A write that matches no rows still takes SQLite's write lock; other writers queue on the busy timeout
+        conn.execute(update(table).where(false()).values({table.primary_key.columns[0]: table.primary_key.columns[0]}))
+
+def next_number(conn, column):
+    lock_numbers(conn, column.table)
+    return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+def create_customer(conn, bp_code, contact_name, title=None, telephone=None, currency='USD'):
+    # Sales orders reference business_partner, so a new customer gets a partner row next to its contact
+    if not bp_code:
+        raise OrderEntryError("A customer needs a BP code.")
+    if conn.execute(select(CustomerContact.bp_code).where(CustomerContact.bp_code == bp_code)).first() is not None:
+        raise OrderEntryError(f"Customer {bp_code} already exists.")
+    if conn.execute(select(BusinessPartner.bp_code).where(BusinessPartner.bp_code == bp_code)).first() is None:
+        conn.execute(insert(BusinessPartner.__table__), {
+            'bp_code': bp_code, 'bp_name': contact_name, 'bp_type': 'C', 'telephone': telephone,
+            'account_balance': 0, 'currency': currency
+        })
+    conn.execute(insert(CustomerContact.__table__), {
+        'bp_code': bp_code, 'contact_name': contact_name, 'title': title, 'telephone': telephone
+    })
+
+def create_sales_order(conn, bp_code, lines, due_date=None, posting_date=None, discount_percent=None,
+                       tax_percent=SALES_TAX_PERCENT, currency='USD', status_code='O', remarks=None):
+    posting_date = posting_date or datetime.date.today()
+    priced, subtotal, cost = price_lines(conn, lines)
+    partner = conn.execute(
+        select(BusinessPartner.bp_code, BusinessPartner.discount_percent).where(BusinessPartner.bp_code == bp_code)
+    ).first()
+    if partner is None:
+        raise OrderEntryError(f"Unknown customer {bp_code}.")
+    if discount_percent is None:
+        # The customer's standing discount, if they have one
+        discount_percent = partner.discount_percent or 0
+
+    total_discount = round(subtotal * discount_percent / 100, 2)
+    total_tax = round((subtotal - total_discount) * tax_percent / 100, 2)
+    order_number = next_number(conn, SalesOrder.sales_order_number)
+    conn.execute(insert(SalesOrder.__table__), {
+        'sales_order_number': order_number, 'bp_code': bp_code, 'status_code': status_code,
+        'posting_date': posting_date, 'due_date': due_date, 'currency': currency,
+        'document_total': round(subtotal - total_discount + total_tax, 2), 'total_tax': total_tax,
+        'discount_percent': discount_percent, 'total_discount': total_discount,
+        'gross_profit': round(subtotal - total_discount - cost, 2), 'paid_to_date': 0, 'remarks': remarks
+    })
+    conn.execute(insert(SalesOrderItem.__table__), [
+        {'sales_order_number': order_number, 'line_number': line_number, 'item_number': item_number,
+         'quantity': quantity, 'unit_price': unit_price, 'discount_percent': discount_percent,
+         'total_price': total_price}
+        for line_number, (item_number, quantity, unit_price, total_price, unit_cost) in enumerate(priced, 1)
+    ])
+    _add_ordered_quantities(conn, ItemInventory.qty_ordered_by_customers, priced)
+    refresh_order_summaries(conn, [order_number])
+    return order_number
+
+def create_purchase_order(conn, supplier, lines, order_date=None, status=OPEN_STATUS):
+    priced, subtotal, cost = price_lines(conn, lines)
+    order_number = next_number(conn, PurchaseOrder.purchase_order_number)
+    conn.execute(insert(PurchaseOrder.__table__), {
+        'purchase_order_number': order_number, 'supplier': supplier, 'status': status, 'total': subtotal,
+        'order_date': order_date or datetime.date.today()
+    })
+    conn.execute(insert(PurchaseOrderItem.__table__), [
+        {'purchase_order_number': order_number, 'item_number': item_number, 'quantity': quantity,
+         'unit_price': unit_price, 'total_price': total_price}
+        for item_number, quantity, unit_price, total_price, unit_cost in priced
+    ])
+    _add_ordered_quantities(conn, ItemInventory.qty_ordered_from_vendors, priced)
+    return order_number
+
+def parse_lines(text):
+    # One line per row: item number and quantity, optionally a unit price, separated by commas or spaces
+    lines = []
+    for row in text.splitlines():
+        fields = row.replace(',', ' ').split()
+        if not fields:
+            continue
+        if len(fields) < 2:
+            raise OrderEntryError(f"Missing quantity for {fields[0]}.")
+        try:
+            lines.append((fields[0], float(fields[1])) + tuple(float(field) for field in fields[2:3]))
+        except ValueError:
+            raise OrderEntryError(f"Could not read the line '{row.strip()}'.")
+    return lines
+
+def read_lines(filename):
+    with open(filename, newline='', encoding='utf-8') as f:
+        return [row for row in csv.reader(f) if row and row[0] != 'item_number']
+
+def create_order_from_file(kind, party, filename, due_date=None):
+    lines = read_lines(filename)
+    started = time.perf_counter()
+    try:
+        with engine.begin() as conn:
+            if kind == 'sales':
+                number = create_sales_order(conn, party, lines, due_date=due_date)
+            else:
+                number = create_purchase_order(conn, party, lines)
+    except OrderEntryError as error:
+        print(f"Order not created: {error}")
+        return None
+    print(f"Created {kind} order {number} with {len(lines)} lines in {time.perf_counter() - started:.2f}s.")
+    return number
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create a sales or purchase order from a CSV of lines.")
+    parser.add_argument('kind', choices=('sales', 'purchase'))
+    parser.add_argument('party', help="customer code for sales orders, supplier for purchase orders")
+    parser.add_argument('lines', help="CSV with item_number,quantity[,unit_price] per row")
+    parser.add_argument('--due', type=datetime.date.fromisoformat, help="due date of a sales order (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    init_db()
+    sys.exit(0 if create_order_from_file(args.kind, args.party, args.lines, args.due) else 1)
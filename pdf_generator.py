@@ -1,69 +1,285 @@
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
+from reportlab.lib.pagesizes import letter, landscape
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from sqlalchemy import select
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import argparse
+import itertools
+import os
+import sys
+import time
 
-def generate_pdf(order, filename):
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import engine, init_db, Session, PurchaseOrder, PURCHASE_ORDER_DETAIL
+from config.config import PDF_EXPORT_WORKERS, PDF_EXPORT_BATCH_SIZE
+
+# Styles are built once per process; forked export workers inherit them
+STYLES = getSampleStyleSheet()
+TITLE_STYLE = STYLES['Heading1']
+SUBTITLE_STYLE = STYLES['Heading2']
+NORMAL_STYLE = STYLES['Normal']
+
+ITEM_COLUMN_WIDTHS = [1.5*inch, 2*inch, 1*inch, 1*inch, 1*inch]
+ITEM_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('TOPPADDING', (0, 1), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+REPORT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+])
+REPORT_ROW_HEIGHT = 12
+
+class _FlowableStream(list):
+    # doc.build() consumes flowables from the front of its list and only asks for the length
+    # to see whether it is done, so the list is refilled from the generator one table at a time
+    def __init__(self, flowables):
+        super().__init__()
+        self.source = iter(flowables)
+
+    def __len__(self):
+        if not list.__len__(self):
+            flowable = next(self.source, None)
+            if flowable is not None:
+                self.append(flowable)
+        return list.__len__(self)
+
+def _format_cell(value, width):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        value = f"{value:,.2f}"
+    text = str(value)
+    return text if len(text) <= width else text[:width - 1] + '\u2026'
+
+def _report_table(header, rows, cell_width, column_widths):
+    data = [header]
+    data.extend([_format_cell(value, cell_width) for value in row] for row in rows)
+    table = Table(data, colWidths=column_widths, rowHeights=REPORT_ROW_HEIGHT, repeatRows=1)
+    table.setStyle(REPORT_TABLE_STYLE)
+    return table
+
+def _report_flowables(title, columns, row_chunks, cell_width, column_widths, first_table_rows, rows_per_table):
+    yield Paragraph(title, TITLE_STYLE)
+    yield Spacer(1, 12)
+    header = list(columns)
+    capacity = first_table_rows
+    pending = []
+    for rows in row_chunks:
+        # Rows left over from the previous chunk are carried into the next page
+        pending.extend(rows)
+        start = 0
+        while len(pending) - start >= capacity:
+            yield _report_table(header, pending[start:start + capacity], cell_width, column_widths)
+            start += capacity
+            capacity = rows_per_table
+        pending = pending[start:]
+    if pending:
+        yield _report_table(header, pending, cell_width, column_widths)
+
+def render_report_pdf(title, columns, row_chunks, filename):
+    # Tables are created page by page as rows arrive, so the rows themselves are not all held; the
+    # finished pages are, until build() saves the file, so callers bound the rows per file
+    pagesize = landscape(letter) if len(columns) > 4 else letter
+    doc = SimpleDocTemplate(filename, pagesize=pagesize, title=title)
+    column_width = doc.width / len(columns)
+    cell_width = max(int(column_width / 4.5), 4)
+
+    # Each table fills exactly one page (less the frame's 6pt padding), so none of them are split
+    frame_height = doc.height - 12
+    rows_per_table = max(int(frame_height // REPORT_ROW_HEIGHT) - 1, 1)
+    title_height = Paragraph(title, TITLE_STYLE).wrap(doc.width, frame_height)[1] + TITLE_STYLE.spaceAfter + 12
+    first_table_rows = max(int((frame_height - title_height) // REPORT_ROW_HEIGHT) - 1, 1)
+
+    doc.build(_FlowableStream(_report_flowables(
+        title, columns, row_chunks, cell_width, [column_width] * len(columns), first_table_rows, rows_per_table
+    )))
+    return doc.page
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d') if value else 'N/A'
+
+def order_document(order):
+    # Plain data only, so it can be sent to worker processes without the session
+    return {
+        'purchase_order_number': order.purchase_order_number,
+        'supplier': order.supplier,
+        'status': order.status,
+        'order_date': order.order_date,
+        'expected_date': order.expected_date,
+        'receipt_date': order.receipt_date,
+        'items': [
+            (item.item_number, item.item.description if item.item else '', item.quantity or 0, item.unit_price or 0)
+            for item in order.items
+        ]
+    }
+
+def render_pdf(document, filename):
     doc = SimpleDocTemplate(filename, pagesize=letter)
     elements = []
 
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = styles['Heading1']
-    subtitle_style = styles['Heading2']
-    normal_style = styles['Normal']
-
     # Title
-    elements.append(Paragraph("Purchase Order", title_style))
+    elements.append(Paragraph("Purchase Order", TITLE_STYLE))
     elements.append(Spacer(1, 12))
 
     # Order details
-    elements.append(Paragraph(f"Order Number: {order.purchase_order_number}", subtitle_style))
-    elements.append(Paragraph(f"Supplier: {order.supplier}", normal_style))
-    elements.append(Paragraph(f"Status: {order.status}", normal_style))
-    elements.append(Paragraph(f"Order Date: {order.order_date.strftime('%Y-%m-%d')}", normal_style))
-    elements.append(Paragraph(f"Receipt Date: {order.receipt_date.strftime('%Y-%m-%d') if order.receipt_date else 'N/A'}", normal_style))
+    elements.append(Paragraph(f"Order Number: {document['purchase_order_number']}", SUBTITLE_STYLE))
+    elements.append(Paragraph(f"Supplier: {document['supplier']}", NORMAL_STYLE))
+    elements.append(Paragraph(f"Status: {document['status']}", NORMAL_STYLE))
+    elements.append(Paragraph(f"Order Date: {_format_date(document['order_date'])}", NORMAL_STYLE))
+    elements.append(Paragraph(f"Expected Date: {_format_date(document['expected_date'])}", NORMAL_STYLE))
+    elements.append(Paragraph(f"Receipt Date: {_format_date(document['receipt_date'])}", NORMAL_STYLE))
     elements.append(Spacer(1, 12))
 
     # Order items
     data = [['Item', 'Description', 'Quantity', 'Unit Price', 'Total']]
-    
+
     total_price = 0
-    for item in order.items:
-        item_total = item.quantity * item.unit_price
+    for item_number, description, quantity, unit_price in document['items']:
+        item_total = quantity * unit_price
         total_price += item_total
         data.append([
-            item.item.item_number,
-            item.item.description,
-            str(item.quantity),
-            f"${item.unit_price:.2f}",
+            item_number,
+            description,
+            str(quantity),
+            f"${unit_price:.2f}",
             f"${item_total:.2f}"
         ])
 
-    table = Table(data, colWidths=[1.5*inch, 2*inch, 1*inch, 1*inch, 1*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('TOPPADDING', (0, 1), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    table = Table(data, colWidths=ITEM_COLUMN_WIDTHS)
+    table.setStyle(ITEM_TABLE_STYLE)
 
     elements.append(table)
     elements.append(Spacer(1, 12))
 
     # Total
-    elements.append(Paragraph(f"Total: ${total_price:.2f}", subtitle_style))
+    elements.append(Paragraph(f"Total: ${total_price:.2f}", SUBTITLE_STYLE))
 
     # Build the PDF
-    doc.build(elements)
\ No newline at end of file
+    doc.build(elements)
+    return doc.page
+
+def generate_pdf(order, filename):
+    return render_pdf(order_document(order), filename)
+
+def purchase_order_query(first=None, last=None, status=None):
+    stmt = select(PurchaseOrder).options(*PURCHASE_ORDER_DETAIL).order_by(PurchaseOrder.purchase_order_number)
+    if first is not None:
+        stmt = stmt.where(PurchaseOrder.purchase_order_number >= first)
+    if last is not None:
+        stmt = stmt.where(PurchaseOrder.purchase_order_number <= last)
+    if status is not None:
+        stmt = stmt.where(PurchaseOrder.status == status)
+    return stmt
+
+def _init_export_worker():
+    # Pooled connections inherited from the parent process must not be reused here
+    engine.dispose(close=False)
+
+def _render_batch(jobs):
+    return len(jobs), sum(render_pdf(document, filename) for document, filename in jobs)
+
+def _order_batches(session, output_dir, first, last, status, batch_size):
+    # Keyset pages of batch_size orders, so only the batches being rendered are ever loaded
+    after = None
+    while True:
+        stmt = purchase_order_query(first, last, status).limit(batch_size)
+        if after is not None:
+            stmt = stmt.where(PurchaseOrder.purchase_order_number > after)
+        orders = session.scalars(stmt).all()
+        if not orders:
+            return
+        yield [
+            (order_document(order), os.path.join(output_dir, f"PO_{order.purchase_order_number}.pdf"))
+            for order in orders
+        ]
+        after = orders[-1].purchase_order_number
+
+def export_purchase_orders(session, output_dir, first=None, last=None, status=None,
+                           workers=PDF_EXPORT_WORKERS, batch_size=PDF_EXPORT_BATCH_SIZE, cancel_event=None):
+    # Returns {'orders', 'pages', 'cancelled'}; after a cancel the counts cover the batches that finished
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    result = {'orders': 0, 'pages': 0, 'cancelled': False}
+
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def add(counts):
+        result['orders'] += counts[0]
+        result['pages'] += counts[1]
+
+    batches = _order_batches(session, output_dir, first, last, status, batch_size)
+    first_batch = next(batches, [])
+    batches = itertools.chain([first_batch], batches)
+    if workers > 1 and len(first_batch) == batch_size:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_export_worker) as pool:
+            # A couple of batches per worker keeps them busy without loading the whole export
+            in_flight = set()
+            for batch in batches:
+                if cancelled():
+                    break
+                in_flight.add(pool.submit(_render_batch, batch))
+                if len(in_flight) >= 2 * workers:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        add(future.result())
+            if cancelled():
+                for future in in_flight:
+                    future.cancel()
+            for future in in_flight:
+                if not future.cancelled():
+                    add(future.result())
+    else:
+        for batch in batches:
+            if cancelled():
+                break
+            add(_render_batch(batch))
+
+    result['cancelled'] = cancelled()
+    if not result['cancelled']:
+        elapsed = time.perf_counter() - started
+        print(f"Exported {result['orders']} purchase orders ({result['pages']} pages) in {elapsed:.2f}s, "
+              f"{result['pages'] / elapsed if elapsed else 0:,.0f} pages/sec.")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export purchase orders to PDF files.")
+    parser.add_argument('output_dir')
+    parser.add_argument('--from', dest='first', type=int, help="first purchase order number")
+    parser.add_argument('--to', dest='last', type=int, help="last purchase order number")
+    parser.add_argument('--status', help="only export orders with this status")
+    parser.add_argument('--workers', type=int, default=PDF_EXPORT_WORKERS)
+    args = parser.parse_args()
+
+    init_db()
+    session = Session()
+    try:
+        export_purchase_orders(session, args.output_dir, args.first, args.last, args.status, args.workers)
+    finally:
+        Session.remove()
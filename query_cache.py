@@ -0,0 +1,182 @@
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import os
+import re
+import sys
+import threading
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import Base
+from config.config import QUERY_CACHE_ENABLED, QUERY_CACHE_MAX_BYTES
+
+TABLE_NAMES = set(Base.metadata.tables)
+READ_PATTERN = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+WRITE_PATTERN = re.compile(r'^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+WRITE_TARGET_PATTERN = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)',
+    re.IGNORECASE
+)
+SOURCE_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+["`\[]?(\w+)', re.IGNORECASE)
+TEMP_TABLE_PATTERN = re.compile(r'^\s*CREATE\s+(?:GLOBAL\s+|LOCAL\s+)?TEMP(?:ORARY)?\s+TABLE\b', re.IGNORECASE)
+WORD_PATTERN = re.compile(r'\w+')
+
+def _normalize_sql(sql):
+    return ' '.join(sql.split()).rstrip(';')
+
+def _referenced_tables(sql):
+    return {word for word in WORD_PATTERN.findall(sql.lower()) if word in TABLE_NAMES}
+
+def source_tables(sql):
+    # The tables an ad-hoc statement reads, or None when one of them is not a models.py table
+    # (a view, a temporary table or a table function), whose writes the cache could not see
+    tables = {name.lower() for name in SOURCE_TABLE_PATTERN.findall(sql)}
+    return tables if tables and tables <= TABLE_NAMES else None
+
+def _estimate_size(keys, rows):
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(key) for key in keys)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+class QueryCache:
+    # LRU cache of query results keyed on normalized SQL and bound parameters.
+    # Entries are dropped whenever one of the tables they read from is written.
+    # Every invalidation bumps a generation counter per table (or for all tables), and a result
+    # is only stored if none of its tables changed while the query ran, so a reader that raced
+    # a writer never caches the rows the writer just replaced.
+    def __init__(self, max_bytes=QUERY_CACHE_MAX_BYTES, enabled=QUERY_CACHE_ENABLED):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.generations = {}
+        self.full_generation = 0
+
+    def fetch(self, session, stmt):
+        compiled = stmt.compile(dialect=session.get_bind().dialect)
+        cached, token = self.lookup(str(compiled), repr(sorted(compiled.params.items())))
+        if cached is not None:
+            return cached
+
+        result = session.connection().execute(stmt)
+        if not result.returns_rows:
+            return [], []
+
+        keys = list(result.keys())
+        rows = [tuple(row) for row in result]
+        self.store(token, keys, rows)
+        return keys, rows
+
+    def lookup(self, sql, params='', tables=None):
+        # ((keys, rows), None) on a hit. On a miss (None, token): run the statement and hand the
+        # token to store(); the token is None when the statement must not be cached.
+        sql = _normalize_sql(sql)
+        if not self.enabled or not READ_PATTERN.match(sql):
+            return None, None
+        key = (sql, params)
+        tables = _referenced_tables(sql) if tables is None else tables
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return (entry[0], entry[1]), None
+            self.misses += 1
+            return None, (key, tables, self._generation(tables))
+
+    def store(self, token, keys, rows):
+        if token is not None:
+            key, tables, generation = token
+            self._store(key, keys, rows, tables, generation)
+
+    def _generation(self, tables):
+        return self.full_generation, tuple(self.generations.get(table, 0) for table in sorted(tables))
+
+    def _store(self, key, keys, rows, tables, generation):
+        size = _estimate_size(keys, rows)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if self._generation(tables) != generation:
+                # A table was written while the query ran; these rows may already be stale
+                return
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[3]
+            self.entries[key] = (keys, rows, tables, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted[3]
+                self.evictions += 1
+
+    def invalidate(self, tables=None):
+        with self.lock:
+            if tables is None:
+                self.full_generation += 1
+            else:
+                for table in tables:
+                    self.generations[table] = self.generations.get(table, 0) + 1
+            for key in list(self.entries):
+                if tables is None or self.entries[key][2] & tables:
+                    self.size -= self.entries.pop(key)[3]
+                    self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'size_bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+query_cache = QueryCache()
+
+def _written_tables(statement):
+    # Temporary tables are private to their connection, so creating one cannot affect cached results
+    if not WRITE_PATTERN.match(statement) or TEMP_TABLE_PATTERN.match(statement):
+        return set()
+    target = WRITE_TARGET_PATTERN.match(statement)
+    if target is None:
+        # DDL or a statement we cannot attribute to one table
+        return None
+    return {target.group(1).lower()}
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _track_writes(conn, cursor, statement, parameters, context, executemany):
+    tables = _written_tables(statement)
+    if tables is None:
+        query_cache.invalidate()
+        conn.info['written_tables'] = None
+    elif tables:
+        query_cache.invalidate(tables)
+        if conn.info.get('written_tables', set()) is not None:
+            conn.info.setdefault('written_tables', set()).update(tables)
+
+@event.listens_for(Engine, 'commit')
+def _invalidate_on_commit(conn):
+    # Other connections may have cached the old rows between the write and the commit
+    if 'written_tables' in conn.info:
+        query_cache.invalidate(conn.info.pop('written_tables'))
+
+@event.listens_for(Engine, 'rollback')
+def _invalidate_on_rollback(conn):
+    # Reads inside the transaction may have cached its own uncommitted writes
+    if 'written_tables' in conn.info:
+        query_cache.invalidate(conn.info.pop('written_tables'))
@@ -0,0 +1,120 @@
+from sqlalchemy.exc import DBAPIError
+import os
+import re
+import sys
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from task_runner import TaskCancelled
+from query_cache import query_cache, source_tables
+from config.config import QUERY_MAX_ROWS, QUERY_TIMEOUT_SECONDS, QUERY_FETCH_SIZE
+
+# Runs ad-hoc SQL from the Query tab on a task worker thread. Rows are fetched from a streaming
+# cursor a page at a time and handed to on_page as they arrive, up to max_rows. The statement is
+# aborted when the task is cancelled or the timeout passes, including while the database is still
+# working on the first row. A SELECT that finishes under max_rows is kept in the query cache and
+# replayed from it until one of its tables is written; only statements on models.py tables are cached.
+
+# SQLite calls the progress handler every this many virtual machine instructions
+SQLITE_PROGRESS_STEPS = 10000
+
+# psycopg2 streams through a server-side (named) cursor, which only accepts a plain query: a
+# SELECT, VALUES or TABLE, or a WITH whose parts only read. Anything else runs on a normal cursor.
+STREAMABLE_PATTERN = re.compile(r'^(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/|\()*(SELECT|VALUES|TABLE|WITH)\b', re.I | re.S)
+NOT_STREAMABLE_PATTERN = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|INTO)\b', re.I)
+
+def is_streamable(sql):
+    return STREAMABLE_PATTERN.match(sql) is not None and NOT_STREAMABLE_PATTERN.search(sql) is None
+
+class QueryTimeout(Exception):
+    pass
+
+def _replay(columns, rows, on_page, fetch_size, started):
+    for start in range(0, len(rows), fetch_size):
+        on_page(columns, rows[start:start + fetch_size], min(start + fetch_size, len(rows)),
+                time.perf_counter() - started)
+    return {'columns': columns, 'rows': len(rows), 'affected': None, 'truncated': False,
+            'elapsed': time.perf_counter() - started, 'cached': True}
+
+def run_query(session, sql, task, on_page, max_rows=QUERY_MAX_ROWS, timeout=QUERY_TIMEOUT_SECONDS,
+              fetch_size=QUERY_FETCH_SIZE, use_cache=True):
+    started = time.perf_counter()
+    cached, cache_token = None, None
+    tables = source_tables(sql) if use_cache else None
+    if tables is not None:
+        # The row cap is part of the key: a result cut short at another cap is a different result
+        cached, cache_token = query_cache.lookup(sql, f"max_rows={max_rows}", tables)
+        if cached is not None:
+            return _replay(*cached, on_page, fetch_size, started)
+    deadline = started + timeout if timeout else None
+    conn = session.connection()
+    dbapi_connection = conn.connection.dbapi_connection
+    dialect_name = conn.dialect.name
+
+    def timed_out():
+        return deadline is not None and time.perf_counter() > deadline
+
+    def should_stop():
+        return task.cancelled or timed_out()
+
+    cancel_callback = None
+    if dialect_name == 'sqlite':
+        # A non-zero return aborts the running statement; interrupt() does the same from the UI thread
+        dbapi_connection.set_progress_handler(lambda: 1 if should_stop() else 0, SQLITE_PROGRESS_STEPS)
+        cancel_callback = dbapi_connection.interrupt
+    elif dialect_name == 'postgresql':
+        if timeout:
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+        cancel_callback = getattr(dbapi_connection, 'cancel', None)
+    if cancel_callback is not None:
+        task.add_cancel_callback(cancel_callback)
+
+    try:
+        # exec_driver_sql sends the text as typed, without treating ":name" as a bind parameter
+        result = conn.execution_options(stream_results=is_streamable(sql)).exec_driver_sql(sql)
+        if not result.returns_rows:
+            affected = result.rowcount
+            session.commit()
+            return {'columns': [], 'rows': 0, 'affected': affected, 'truncated': False,
+                    'elapsed': time.perf_counter() - started, 'cached': False}
+
+        columns = list(result.keys())
+        count = 0
+        truncated = False
+        kept = [] if cache_token is not None else None
+        while True:
+            rows = result.fetchmany(min(fetch_size, max_rows - count))
+            if not rows:
+                break
+            count += len(rows)
+            rows = [tuple(row) for row in rows]
+            if kept is not None:
+                kept.extend(rows)
+            on_page(columns, rows, count, time.perf_counter() - started)
+            task.check_cancelled()
+            if timed_out():
+                raise QueryTimeout(f"Query stopped after {timeout}s.")
+            if count >= max_rows:
+                truncated = result.fetchone() is not None
+                break
+        result.close()
+        session.commit()
+        if kept is not None and not truncated:
+            query_cache.store(cache_token, columns, kept)
+        return {'columns': columns, 'rows': count, 'affected': None, 'truncated': truncated,
+                'elapsed': time.perf_counter() - started, 'cached': False}
+    except DBAPIError:
+        if task.cancelled:
+            raise TaskCancelled(f"{task.name} was cancelled.")
+        if timed_out():
+            raise QueryTimeout(f"Query stopped after {timeout}s.")
+        raise
+    finally:
+        if cancel_callback is not None:
+            task.remove_cancel_callback(cancel_callback)
+        if dialect_name == 'sqlite':
+            dbapi_connection.set_progress_handler(None, 0)
@@ -0,0 +1,308 @@
+from sqlalchemy import select, inspect, delete, text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+import argparse
+import datetime
+import hashlib
+import os
+import re
+import sys
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import Base, Session, SlowQuery, init_db
+from query_engine import run_query, QueryTimeout
+from config.config import SLOW_QUERY_MS, SLOW_QUERY_TOP, PROFILER_SCAN_MIN_ROWS
+
+# Profiles ad-hoc SQL from the Query tab: the plan the database picked, wall and CPU time, how
+# many rows the full scans read against how many came back, and which indexes were used.
+# Statements over SLOW_QUERY_MS are kept in the slow_query_log table, with their error when they
+# failed, timed out or were cancelled. When a large models.py table is scanned in full although
+# the query filters or joins on its columns, an index is suggested. Table sizes are the planner's
+# statistics, so profiling never reads a table before the query itself runs.
+#     python query_profiler.py "SELECT ..."
+#     python query_profiler.py --slow-log
+
+# SQLite: "SCAN i", "SCAN i USING COVERING INDEX ix", "SEARCH j USING INDEX ix (x=?)",
+# "SEARCH t USING AUTOMATIC COVERING INDEX (x=?)"
+SQLITE_ACCESS_PATTERN = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$')
+SQLITE_INDEX_PATTERN = re.compile(r'USING (?:COVERING |PARTIAL )*INDEX (\w+)')
+# PostgreSQL: "Seq Scan on sales_order so", "Index Scan using ix on sales_order", "Bitmap Heap Scan on t"
+POSTGRES_ACCESS_PATTERN = re.compile(
+    r'(Seq Scan|Parallel Seq Scan|Index Scan|Index Scan Backward|Index Only Scan|Bitmap Heap Scan)'
+    r'(?: using (\w+))? on (\w+)'
+)
+POSTGRES_BITMAP_INDEX_PATTERN = re.compile(r'Bitmap Index Scan on (\w+)')
+
+TABLE_ALIAS_PATTERN = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.I)
+COMPARISON = r'(?:=|<>|!=|<=|>=|<|>|\bIN\b|\bLIKE\b|\bBETWEEN\b|\bIS\b)'
+LEFT_OPERAND_PATTERN = re.compile(r'(?:\b(\w+)\.)?\b(\w+)\s*' + COMPARISON, re.I)
+RIGHT_OPERAND_PATTERN = re.compile(COMPARISON + r'\s*(?:(\w+)\.)?(\w+)\b', re.I)
+NOT_ALIASES = {'WHERE', 'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'CROSS', 'OUTER', 'NATURAL', 'ON', 'USING',
+               'GROUP', 'ORDER', 'LIMIT', 'HAVING', 'UNION', 'SET', 'VALUES', 'SELECT', 'WINDOW'}
+
+def normalize_sql(sql):
+    return ' '.join(sql.split()).rstrip(';')
+
+def sql_hash(sql):
+    return hashlib.sha1(normalize_sql(sql).encode('utf-8')).hexdigest()
+
+def table_aliases(sql):
+    # {name used in the statement: table name}, every table also maps to itself
+    aliases = {}
+    for table, alias in TABLE_ALIAS_PATTERN.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+def filter_columns(sql, table_name, aliases):
+    # Columns of table_name that appear next to a comparison, i.e. in WHERE and ON conditions
+    table = Base.metadata.tables[table_name]
+    found = []
+    for qualifier, column in LEFT_OPERAND_PATTERN.findall(sql) + RIGHT_OPERAND_PATTERN.findall(sql):
+        if qualifier and aliases.get(qualifier) != table_name:
+            continue
+        if column in table.columns and column not in found:
+            found.append(column)
+    return found
+
+def _sqlite_plan(conn, sql, aliases):
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql).all()
+    depths = {0: -1}
+    lines, accesses, indexes = [], [], []
+    for node_id, parent_id, unused, detail in rows:
+        depths[node_id] = depths.get(parent_id, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+        used = SQLITE_INDEX_PATTERN.findall(detail)
+        indexes.extend(used)
+        match = SQLITE_ACCESS_PATTERN.match(detail)
+        if match:
+            kind, name, alias, rest = match.groups()
+            # "SCAN t USING [COVERING] INDEX ix" still walks every entry of the index, and an
+            # automatic index is built by reading the whole table on every run
+            full_scan = kind == 'SCAN' or 'AUTOMATIC' in rest
+            accesses.append((aliases.get(name, name), full_scan, used[0] if kind == 'SCAN' and used else None))
+    return lines, accesses, indexes
+
+def _postgres_plan(conn, sql, aliases):
+    # Plain EXPLAIN only plans the statement, it does not run it
+    lines = [row[0] for row in conn.exec_driver_sql("EXPLAIN " + sql).all()]
+    accesses, indexes = [], []
+    for line in lines:
+        indexes.extend(POSTGRES_BITMAP_INDEX_PATTERN.findall(line))
+        for kind, index, table in POSTGRES_ACCESS_PATTERN.findall(line):
+            if index:
+                indexes.append(index)
+            accesses.append((table, kind.endswith('Seq Scan'), None))
+    return lines, accesses, indexes
+
+def explain(conn, sql):
+    aliases = table_aliases(sql)
+    if conn.dialect.name == 'sqlite':
+        lines, accesses, indexes = _sqlite_plan(conn, sql, aliases)
+    elif conn.dialect.name == 'postgresql':
+        # A statement EXPLAIN rejects must not abort the transaction the query itself runs in
+        with conn.begin_nested():
+            lines, accesses, indexes = _postgres_plan(conn, sql, aliases)
+    else:
+        lines, accesses, indexes = [f"(no plan support for {conn.dialect.name})"], [], []
+    return {
+        'plan': lines,
+        'aliases': aliases,
+        'full_scans': list(dict.fromkeys(table for table, full_scan, scan_index in accesses if full_scan)),
+        # {table: index} for the full scans that walk an index rather than the table
+        'scan_indexes': {table: scan_index for table, full_scan, scan_index in accesses if scan_index},
+        'indexes': list(dict.fromkeys(indexes))
+    }
+
+def estimated_rows(conn, table_name):
+    # From the planner statistics: a count(*) would read the whole table before the profiled
+    # query even starts, outside its timeout and cancel
+    if table_name not in Base.metadata.tables:
+        return None
+    if conn.dialect.name == 'sqlite':
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first() is not None:
+            # The first number of each stat is the number of rows in the table or index
+            stats = conn.execute(text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table"), {'table': table_name}).scalars()
+            counts = [int(stat.split()[0]) for stat in stats]
+            if counts:
+                return max(counts)
+        # Not analyzed yet: the largest rowid is read from the end of the table's b-tree
+        return conn.exec_driver_sql(f'SELECT max(rowid) FROM "{table_name}"').scalar() or 0
+    if conn.dialect.name == 'postgresql':
+        # reltuples is -1 until the table is first vacuumed or analyzed
+        estimate = conn.execute(text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+                                {'table': table_name}).scalar()
+        return int(estimate) if estimate is not None and estimate >= 0 else None
+    return None
+
+def _indexed_columns(conn, table_name):
+    # Columns that already lead an index, so an index on them could have been used
+    inspector = inspect(conn)
+    leading = set(inspector.get_pk_constraint(table_name)['constrained_columns'][:1])
+    for index in inspector.get_indexes(table_name) + inspector.get_unique_constraints(table_name):
+        leading.update(index['column_names'][:1])
+    return leading
+
+def _mapped_class_name(table_name):
+    for mapper in Base.registry.mappers:
+        if mapper.local_table.name == table_name:
+            return mapper.class_.__name__
+    return table_name
+
+def suggest_indexes(conn, sql, plan, row_counts):
+    suggestions = []
+    for table_name in plan['full_scans']:
+        if table_name not in Base.metadata.tables or (row_counts.get(table_name) or 0) < PROFILER_SCAN_MIN_ROWS:
+            continue
+        indexed = _indexed_columns(conn, table_name)
+        columns = [column for column in filter_columns(sql, table_name, plan['aliases']) if column not in indexed][:3]
+        if not columns:
+            continue
+        name = f"ix_{table_name}_{'_'.join(columns)}"
+        suggestions.append({
+            'table': table_name,
+            'columns': columns,
+            'sql': f"CREATE INDEX {name} ON {table_name} ({', '.join(columns)})",
+            'model': f"{_mapped_class_name(table_name)}.__table_args__: Index('{name}', "
+                     f"{', '.join(repr(column) for column in columns)})"
+        })
+    return suggestions
+
+def error_message(error):
+    # The driver's message without SQLAlchemy's copy of the statement and its background link
+    if isinstance(error, DBAPIError) and error.orig is not None:
+        error = error.orig
+    return str(error).strip().splitlines()[0] if str(error).strip() else type(error).__name__
+
+def run_logged_query(session, sql, task, on_page, plan=None, **limits):
+    # run_query, then the statement goes to the slow query log if it took over SLOW_QUERY_MS,
+    # also when it failed, timed out or was cancelled on the way
+    started = time.perf_counter()
+    try:
+        summary = run_query(session, sql, task, on_page, **limits)
+    except Exception as error:
+        session.rollback()
+        log_slow_query(session, sql, {'elapsed': time.perf_counter() - started, 'rows': None, 'affected': None,
+                                      'plan': plan, 'error': error_message(error)})
+        raise
+    log_slow_query(session, sql, dict(summary, plan=plan))
+    return summary
+
+def profile_query(session, sql, task, on_page, **limits):
+    conn = session.connection()
+    plan = explain(conn, sql)
+    row_counts = {table_name: estimated_rows(conn, table_name) for table_name in plan['full_scans']}
+
+    # thread_time() covers the driver and, for SQLite, the database engine itself, which run on this thread
+    cpu_started = time.thread_time()
+    # A cached result would say nothing about the plan, so the profiled statement always runs
+    summary = run_logged_query(session, sql, task, on_page, plan=plan['plan'], use_cache=False, **limits)
+    summary['cpu'] = time.thread_time() - cpu_started
+
+    summary['plan'] = plan['plan']
+    summary['indexes'] = plan['indexes']
+    summary['full_scans'] = plan['full_scans']
+    summary['scan_indexes'] = plan['scan_indexes']
+    summary['scanned_rows'] = sum(count for count in row_counts.values() if count)
+    summary['returned_rows'] = summary['rows'] if summary['affected'] is None else summary['affected']
+    summary['suggestions'] = suggest_indexes(session.connection(), sql, plan, row_counts)
+    session.commit()
+    return summary
+
+def log_slow_query(session, sql, summary, threshold_ms=SLOW_QUERY_MS):
+    elapsed_ms = summary['elapsed'] * 1000
+    if elapsed_ms < threshold_ms:
+        return
+    key = sql_hash(sql)
+    entry = session.get(SlowQuery, key)
+    if entry is None:
+        entry = SlowQuery(sql_hash=key, sql=normalize_sql(sql), calls=0, total_ms=0, max_ms=0)
+        session.add(entry)
+    entry.calls += 1
+    entry.total_ms += elapsed_ms
+    entry.max_ms = max(entry.max_ms, elapsed_ms)
+    entry.last_ms = elapsed_ms
+    entry.last_rows = summary['rows'] if summary['affected'] is None else summary['affected']
+    entry.last_run = datetime.datetime.now()
+    entry.last_error = summary.get('error')
+    if summary.get('plan'):
+        entry.plan = '\n'.join(summary['plan'])
+    session.commit()
+
+def top_slow_queries(session, limit=SLOW_QUERY_TOP):
+    return session.scalars(select(SlowQuery).order_by(SlowQuery.total_ms.desc()).limit(limit)).all()
+
+def clear_slow_queries(session):
+    session.execute(delete(SlowQuery))
+    session.commit()
+
+def format_profile(summary):
+    returned = summary['returned_rows']
+    scans = [table + (f" (whole index {summary['scan_indexes'][table]})" if table in summary['scan_indexes'] else "")
+             for table in summary['full_scans']]
+    lines = [
+        f"Wall time: {summary['elapsed'] * 1000:,.1f} ms    CPU time: {summary['cpu'] * 1000:,.1f} ms",
+        f"Rows returned: {returned:,}    Rows read by full scans (estimated): {summary['scanned_rows']:,}"
+        + (f" ({summary['scanned_rows'] / returned:,.0f} per row returned)" if returned and summary['scanned_rows'] else ""),
+        f"Indexes used: {', '.join(summary['indexes']) or 'none'}",
+        f"Full table scans: {', '.join(scans) or 'none'}",
+        "",
+        "Plan:"
+    ]
+    lines.extend('  ' + line for line in summary['plan'])
+    if summary['suggestions']:
+        lines.extend(["", "Suggested indexes:"])
+        for suggestion in summary['suggestions']:
+            lines.append(f"  {suggestion['sql']}")
+            lines.append(f"    models.py: {suggestion['model']}")
+    return '\n'.join(lines)
+
+def format_slow_queries(entries):
+    if not entries:
+        return f"No queries over {SLOW_QUERY_MS:.0f} ms have been logged."
+    lines = [f"{'Total ms':>10} {'Calls':>6} {'Avg ms':>9} {'Max ms':>9}  Statement"]
+    for entry in entries:
+        lines.append(f"{entry.total_ms:>10,.0f} {entry.calls:>6} {entry.total_ms / entry.calls:>9,.0f} "
+                     f"{entry.max_ms:>9,.0f}  {entry.sql}" + (f"  [last run failed: {entry.last_error}]" if entry.last_error else ""))
+    return '\n'.join(lines)
+
+class _ConsoleTask:
+    # Stands in for a task_runner Task when profiling from the command line
+    name = "Profiling query"
+    cancelled = False
+
+    def check_cancelled(self):
+        pass
+
+    def add_cancel_callback(self, callback):
+        pass
+
+    def remove_cancel_callback(self, callback):
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile an SQL statement or list the slowest logged queries.")
+    parser.add_argument('sql', nargs='?')
+    parser.add_argument('--slow-log', action='store_true', help="list the top offenders from the slow query log")
+    parser.add_argument('--clear', action='store_true', help="empty the slow query log")
+    args = parser.parse_args()
+
+    init_db()
+    session = Session()
+    try:
+        if args.clear:
+            clear_slow_queries(session)
+        if args.sql:
+            print(format_profile(profile_query(session, args.sql, _ConsoleTask(), lambda *page: None)))
+        if args.slow_log or not args.sql:
+            print(format_slow_queries(top_slow_queries(session)))
+    except (SQLAlchemyError, QueryTimeout) as error:
+        print(f"Query failed: {error_message(error)}")
+        sys.exit(1)
+    finally:
+        Session.remove()
@@ -0,0 +1,148 @@
+from sqlalchemy import select, update, insert, func, case, literal, DateTime
+import argparse
+import datetime
+import os
+import sys
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import (engine, init_db, ItemInventory, PurchaseOrder, PurchaseOrderItem, StockMovement,
+                    DRAFT_STATUS, OPEN_STATUS, RECEIVED_STATUS)
+
+# Releases draft purchase orders and posts goods receipts for many purchase orders in one
+# transaction each. A release marks MRP's drafts Open and adds their quantities to
+# qty_ordered_from_vendors, with one statement each. A receipt takes a fixed number of
+# statements however many orders and lines there are:
+#   1. the orders are marked received; RETURNING gives the ones this call actually claimed, so an
+#      order that is already received (or posted concurrently) is never booked twice
+#   2. one stock_movement row per order line is appended with INSERT ... SELECT
+#   3. in_stock and qty_ordered_from_vendors get the quantity per item, summed in SQL, in one UPDATE
+#     python receipts.py 1001 1002 1003
+#     python receipts.py --release 1001 1002 (or --release --all)
+
+RECEIPT_MOVEMENT = 'receipt'
+
+def _ordered_quantities(order_numbers):
+    return (
+        select(PurchaseOrderItem.item_number, func.sum(func.coalesce(PurchaseOrderItem.quantity, 0)).label('quantity'))
+        .where(PurchaseOrderItem.purchase_order_number.in_(order_numbers))
+        .group_by(PurchaseOrderItem.item_number)
+        .subquery()
+    )
+
+def release_drafts(conn, order_numbers=None):
+    # Only drafts are released, so releasing twice never orders twice; None releases every draft
+    requested = None if order_numbers is None else sorted(set(order_numbers))
+    if requested == []:
+        return {'orders': [], 'skipped': [], 'items': 0}
+
+    stmt = update(PurchaseOrder).where(PurchaseOrder.status == DRAFT_STATUS)
+    if requested is not None:
+        stmt = stmt.where(PurchaseOrder.purchase_order_number.in_(requested))
+    released = conn.execute(
+        stmt.values(status=OPEN_STATUS).returning(PurchaseOrder.purchase_order_number)
+    ).scalars().all()
+    skipped = [] if requested is None else sorted(set(requested) - set(released))
+    if not released:
+        return {'orders': [], 'skipped': skipped, 'items': 0}
+
+    ordered = _ordered_quantities(released)
+    items = conn.execute(
+        update(ItemInventory)
+        .where(ItemInventory.item_number == ordered.c.item_number)
+        .values(qty_ordered_from_vendors=func.coalesce(ItemInventory.qty_ordered_from_vendors, 0) + ordered.c.quantity)
+    )
+    return {'orders': sorted(released), 'skipped': skipped, 'items': items.rowcount}
+
+def post_receipts(conn, order_numbers, received_on=None):
+    received_on = received_on or datetime.date.today()
+    requested = sorted(set(order_numbers))
+    if not requested:
+        return {'orders': [], 'skipped': [], 'lines': 0, 'items': 0}
+
+    claimed = conn.execute(
+        update(PurchaseOrder)
+        .where(PurchaseOrder.purchase_order_number.in_(requested))
+        .where(func.coalesce(PurchaseOrder.status, '').not_in((RECEIVED_STATUS, DRAFT_STATUS)))
+        .values(status=RECEIVED_STATUS, receipt_date=received_on)
+        .returning(PurchaseOrder.purchase_order_number)
+    ).scalars().all()
+    if not claimed:
+        return {'orders': [], 'skipped': requested, 'lines': 0, 'items': 0}
+
+    lines = select(PurchaseOrderItem).where(PurchaseOrderItem.purchase_order_number.in_(claimed)).subquery()
+    quantity = func.coalesce(lines.c.quantity, 0)
+    ledger = conn.execute(
+        insert(StockMovement).from_select(
+            ['item_number', 'quantity', 'movement_type', 'purchase_order_number', 'posted_at'],
+            select(lines.c.item_number, quantity, literal(RECEIPT_MOVEMENT),
+                   lines.c.purchase_order_number, literal(datetime.datetime.now(), DateTime))
+        )
+    )
+
+    received = (
+        select(lines.c.item_number, func.sum(quantity).label('quantity'))
+        .group_by(lines.c.item_number)
+        .subquery()
+    )
+    on_order = func.coalesce(ItemInventory.qty_ordered_from_vendors, 0)
+    items = conn.execute(
+        update(ItemInventory)
+        .where(ItemInventory.item_number == received.c.item_number)
+        .values(
+            in_stock=func.coalesce(ItemInventory.in_stock, 0) + received.c.quantity,
+            qty_ordered_from_vendors=case((on_order > received.c.quantity, on_order - received.c.quantity), else_=0)
+        )
+    )
+
+    claimed_set = set(claimed)
+    return {
+        'orders': sorted(claimed),
+        'skipped': [number for number in requested if number not in claimed_set],
+        'lines': ledger.rowcount,
+        'items': items.rowcount
+    }
+
+def release_purchase_orders(order_numbers=None):
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        result = release_drafts(conn, order_numbers)
+
+    elapsed = time.perf_counter() - started
+    print(f"Released {len(result['orders'])} draft purchase orders ({result['items']} items on order) "
+          f"in {elapsed:.2f}s.")
+    if result['skipped']:
+        print(f"Skipped (not found or not a draft): {', '.join(map(str, result['skipped']))}")
+    return result
+
+def receive_purchase_orders(order_numbers, received_on=None):
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        result = post_receipts(conn, order_numbers, received_on)
+
+    elapsed = time.perf_counter() - started
+    print(f"Received {len(result['orders'])} purchase orders ({result['lines']} lines, {result['items']} items) "
+          f"in {elapsed:.2f}s.")
+    if result['skipped']:
+        print(f"Skipped (not found, draft or already received; release drafts first): "
+              f"{', '.join(map(str, result['skipped']))}")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post goods receipts for purchase orders in one transaction.")
+    parser.add_argument('order_numbers', nargs='*', type=int)
+    parser.add_argument('--release', action='store_true', help="release draft purchase orders instead of receiving them")
+    parser.add_argument('--all', action='store_true', help="with --release, release every draft purchase order")
+    args = parser.parse_args()
+    if not args.order_numbers and not (args.release and args.all):
+        parser.error("give the purchase order numbers (or --release --all)")
+
+    init_db()
+    if args.release:
+        release_purchase_orders(None if args.all else args.order_numbers)
+    else:
+        receive_purchase_orders(args.order_numbers)
@@ -0,0 +1,154 @@
+from sqlalchemy import Date, DateTime, Float, Integer
+import argparse
+import csv
+import gc
+import os
+import sys
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import engine, init_db
+from reports import EXPORTABLE_REPORTS
+from summaries import ensure_sales_summaries
+from config.config import REPORT_EXPORT_CHUNK_SIZE, REPORT_PDF_MAX_ROWS
+
+# Reports are exported straight from a streaming cursor, bypassing the query cache and pandas.
+# CSV and Parquet hold one chunk of rows at a time, whatever the size of the report. PDF cannot:
+# reportlab holds every finished page until the file is saved, so a PDF longer than
+# REPORT_PDF_MAX_ROWS rows is written as report_part1.pdf, report_part2.pdf, ... instead.
+# pyarrow and reportlab are imported by the writers that need them, so a CSV export loads neither.
+
+EXPORT_FORMATS = ('csv', 'parquet', 'pdf')
+
+def stream_rows(conn, stmt, chunk_size=REPORT_EXPORT_CHUNK_SIZE):
+    # stream_results uses a server-side cursor where the driver has one (psycopg2 named cursors);
+    # pysqlite already steps through the result lazily
+    result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+    for rows in result.partitions(chunk_size):
+        yield [tuple(row) for row in rows]
+
+def _write_csv(filename, title, columns, stmt, chunks):
+    count = 0
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count, [filename]
+
+def _arrow_type(pa, column_type):
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+def _write_parquet(filename, title, columns, stmt, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires the pyarrow package.")
+
+    # The schema comes from the statement, so every row group gets the same types even if a chunk is all NULL
+    schema = pa.schema([
+        pa.field(name, _arrow_type(pa, column.type)) for name, column in zip(columns, stmt.selected_columns)
+    ])
+    count = 0
+    with pq.ParquetWriter(filename, schema) as writer:
+        for rows in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count, [filename]
+
+def _part_filename(filename, part):
+    base, extension = os.path.splitext(filename)
+    return f"{base}_part{part}{extension}"
+
+def _write_pdf(filename, title, columns, stmt, chunks):
+    from pdf_generator import render_report_pdf
+    chunks = iter(chunks)
+    max_rows = REPORT_PDF_MAX_ROWS
+    pending = next(chunks, [])
+    count = 0
+
+    def part_rows():
+        # Up to max_rows rows of this part; rows past the limit are kept for the next part
+        nonlocal pending, count
+        sent = 0
+        while pending and sent < max_rows:
+            rows, pending = pending[:max_rows - sent], pending[max_rows - sent:]
+            sent += len(rows)
+            count += len(rows)
+            yield rows
+            if not pending:
+                pending = next(chunks, [])
+
+    render_report_pdf(title, columns, part_rows(), filename)
+    if not pending:
+        return count, [filename]
+
+    # The report did not fit in one file: the first one becomes part 1
+    filenames = [_part_filename(filename, 1)]
+    os.replace(filename, filenames[0])
+    while pending:
+        # A built document is a web of reference cycles; free it before the next part is laid out
+        gc.collect()
+        filenames.append(_part_filename(filename, len(filenames) + 1))
+        render_report_pdf(f"{title} (part {len(filenames)})", columns, part_rows(), filenames[-1])
+    print(f"PDF export split into {len(filenames)} files of at most {max_rows} rows.")
+    return count, filenames
+
+WRITERS = {'csv': _write_csv, 'parquet': _write_parquet, 'pdf': _write_pdf}
+
+def format_for(filename):
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    return extension if extension in EXPORT_FORMATS else 'csv'
+
+def export_report(name, filename, export_format=None, chunk_size=REPORT_EXPORT_CHUNK_SIZE, cancel_event=None):
+    title, query, columns = EXPORTABLE_REPORTS[name]
+    export_format = export_format or format_for(filename)
+    stmt = query()
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        ensure_sales_summaries(conn)
+
+    with engine.connect() as conn:
+        chunks = stream_rows(conn, stmt, chunk_size)
+        if cancel_event is not None:
+            chunks = _until_cancelled(chunks, cancel_event)
+        count, filenames = WRITERS[export_format](filename, title, columns, stmt, chunks)
+
+    elapsed = time.perf_counter() - started
+    print(f"Exported {count} rows of '{title}' to {', '.join(filenames)} in {elapsed:.2f}s.")
+    # A long PDF is split, so the chosen file may have become name_part1.pdf, name_part2.pdf, ...
+    return {'rows': count, 'files': filenames}
+
+def _until_cancelled(chunks, cancel_event):
+    for rows in chunks:
+        if cancel_event.is_set():
+            print("Report export cancelled.")
+            return
+        yield rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a report to CSV, Parquet or PDF.")
+    parser.add_argument('report', choices=sorted(EXPORTABLE_REPORTS))
+    parser.add_argument('output')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, help="defaults to the output file extension")
+    parser.add_argument('--chunk-size', type=int, default=REPORT_EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    export_report(args.report, args.output, args.format, args.chunk_size)
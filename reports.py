@@ -0,0 +1,113 @@
+from sqlalchemy import select
+import os
+import sys
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import engine, ItemInventory, SalesOrder, SalesByCustomer, SalesByMonth
+from summaries import ensure_sales_summaries
+from query_cache import query_cache
+
+# Every report pushes its filtering and aggregation into SQL and selects only the columns it shows,
+# so the work done scales with the size of the result rather than the size of the table.
+# Sales KPIs are read from the rollup tables maintained by summaries.py.
+# pandas is only imported by the functions that build DataFrames, so file exports can skip it.
+
+def _ensure_summaries():
+    # Built and committed in a transaction of their own; the report's session is never committed,
+    # so building them there would roll back and be redone, holding the write lock, on every run
+    with engine.begin() as conn:
+        ensure_sales_summaries(conn)
+
+def _frame(session, stmt, columns):
+    import pandas as pd
+    keys, rows = query_cache.fetch(session, stmt)
+    return pd.DataFrame(rows, columns=columns)
+
+def inventory_levels_query():
+    return select(ItemInventory.item_number, ItemInventory.in_stock).order_by(ItemInventory.item_number)
+
+def inventory_listing_query():
+    return select(
+        ItemInventory.item_number, ItemInventory.description, ItemInventory.manufacturer, ItemInventory.in_stock,
+        ItemInventory.qty_ordered_by_customers, ItemInventory.qty_ordered_from_vendors, ItemInventory.last_purchase_price
+    ).order_by(ItemInventory.item_number)
+
+def sales_over_time_query():
+    return (
+        select(SalesOrder.sales_order_number, SalesOrder.document_total, SalesOrder.posting_date)
+        .order_by(SalesOrder.posting_date)
+    )
+
+def reorder_items_query():
+    return (
+        select(ItemInventory.item_number, ItemInventory.in_stock, ItemInventory.qty_ordered_by_customers)
+        .where(ItemInventory.in_stock < ItemInventory.qty_ordered_by_customers)
+        .order_by(ItemInventory.item_number)
+    )
+
+def low_stock_items_query(threshold=10):
+    return (
+        select(ItemInventory.item_number, ItemInventory.description, ItemInventory.in_stock)
+        .where(ItemInventory.in_stock < threshold)
+        .order_by(ItemInventory.item_number)
+    )
+
+def top_customers_query(limit=10):
+    return (
+        select(SalesByCustomer.bp_code, SalesByCustomer.total)
+        .order_by(SalesByCustomer.total.desc())
+        .limit(limit)
+    )
+
+def monthly_sales_query():
+    return select(SalesByMonth.month, SalesByMonth.total).order_by(SalesByMonth.month)
+
+def inventory_levels(session):
+    return _frame(session, inventory_levels_query(), ['Item Number', 'In Stock'])
+
+def sales_over_time(session):
+    import pandas as pd
+    df = _frame(session, sales_over_time_query(), ['Order Number', 'Total', 'Date'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+def reorder_items(session):
+    return _frame(session, reorder_items_query(), ['Item Number', 'In Stock', 'Ordered by Customers'])
+
+def low_stock_items(session, threshold=10):
+    return _frame(session, low_stock_items_query(threshold), ['Item Number', 'Description', 'In Stock'])
+
+def top_customers(session, limit=10):
+    _ensure_summaries()
+    return _frame(session, top_customers_query(limit), ['Customer', 'Total']).set_index('Customer')
+
+def monthly_sales(session):
+    import pandas as pd
+    _ensure_summaries()
+    df = _frame(session, monthly_sales_query(), ['Date', 'Total'])
+
+    # Month-end labels with empty months filled in, matching the old resample('M') output.
+    # This only touches one row per month.
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m') + pd.offsets.MonthEnd(0)
+    df = df.set_index('Date')
+    if df.empty:
+        return df
+    months = pd.date_range(df.index.min(), df.index.max(), freq=pd.offsets.MonthEnd(), name='Date')
+    return df.reindex(months, fill_value=0)
+
+# Reports that can be exported to a file: name -> (title, query builder, column labels)
+EXPORTABLE_REPORTS = {
+    'inventory': ("Inventory", inventory_listing_query,
+                  ['Item Number', 'Description', 'Manufacturer', 'In Stock', 'Ordered by Customers',
+                   'Ordered from Vendors', 'Last Purchase Price']),
+    'inventory-levels': ("Inventory Levels", inventory_levels_query, ['Item Number', 'In Stock']),
+    'sales': ("Sales Over Time", sales_over_time_query, ['Order Number', 'Total', 'Date']),
+    'reorder': ("Items to Reorder", reorder_items_query, ['Item Number', 'In Stock', 'Ordered by Customers']),
+    'low-stock': ("Low Stock Items", low_stock_items_query, ['Item Number', 'Description', 'In Stock']),
+    'top-customers': ("Top 10 Customers by Sales", top_customers_query, ['Customer', 'Total']),
+    'monthly-sales': ("Monthly Sales", monthly_sales_query, ['Month', 'Total'])
+}
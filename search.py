@@ -0,0 +1,184 @@
+from sqlalchemy import select, text, or_
+import argparse
+import os
+import re
+import sys
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import engine, init_db, Session, ItemInventory, CustomerContact, SalesOrder
+from config.config import SEARCH_LIMIT, SEARCH_RANK_CANDIDATES
+
+# Full-text search over items, customers and sales order remarks. Every word typed is matched as
+# a prefix and results come back best match first.
+# SQLite: an FTS5 table per source that indexes the source table in place (external content, so
+# the text is not stored twice). Triggers on the source table keep it current, so imports,
+# the add/save dialogs, order entry and statements from the Query tab all update it.
+# PostgreSQL: a GIN index on the same words as a tsvector expression, maintained by the database.
+#     python search.py items "blue wid"
+#     python search.py --rebuild
+
+# scope -> (model, key column, indexed columns)
+SEARCH_SOURCES = {
+    'items': (ItemInventory, 'item_number', ('item_number', 'description')),
+    'customers': (CustomerContact, 'bp_code', ('bp_code', 'contact_name', 'email')),
+    'sales_orders': (SalesOrder, 'sales_order_number', ('bp_code', 'remarks'))
+}
+WORD_PATTERN = re.compile(r'\w+')
+
+def _index_name(table_name):
+    return f"{table_name}_search"
+
+def _tsvector(columns):
+    return "to_tsvector('simple', " + " || ' ' || ".join(f"coalesce({column}, '')" for column in columns) + ")"
+
+def _sqlite_search_table(table_name, columns):
+    # prefix='2 3' keeps extra index entries for short prefixes, the ones that match the most rows
+    return (f"CREATE VIRTUAL TABLE IF NOT EXISTS {_index_name(table_name)} USING fts5({', '.join(columns)}, "
+            f"content='{table_name}', prefix='2 3', tokenize='unicode61 remove_diacritics 2')")
+
+def _sqlite_triggers(table_name, columns):
+    index = _index_name(table_name)
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f"new.{column}" for column in columns)
+    old_values = ', '.join(f"old.{column}" for column in columns)
+    delete_old = f"INSERT INTO {index}({index}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values});"
+    insert_new = f"INSERT INTO {index}(rowid, {column_list}) VALUES (new.rowid, {new_values});"
+    return {
+        f"{index}_insert": f"AFTER INSERT ON {table_name} BEGIN {insert_new} END",
+        f"{index}_delete": f"AFTER DELETE ON {table_name} BEGIN {delete_old} END",
+        f"{index}_update": f"AFTER UPDATE OF {column_list} ON {table_name} BEGIN {delete_old} {insert_new} END"
+    }
+
+def _search_source(table_name):
+    for model, key, columns in SEARCH_SOURCES.values():
+        if model.__tablename__ == table_name:
+            return columns
+    return None
+
+def _sqlite_objects(conn, object_type):
+    return set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = :type"), {'type': object_type}).scalars())
+
+def resume_search_sync(conn, table_name):
+    # Creates whatever is missing of the search table and its triggers, and re-indexes the
+    # source table if anything was missing, e.g. after a bulk load or an interrupted one
+    columns = _search_source(table_name)
+    if columns is None or conn.dialect.name != 'sqlite':
+        return
+    tables, triggers = _sqlite_objects(conn, 'table'), _sqlite_objects(conn, 'trigger')
+    missing = {name: body for name, body in _sqlite_triggers(table_name, columns).items() if name not in triggers}
+    if _index_name(table_name) in tables and not missing:
+        return
+    conn.exec_driver_sql(_sqlite_search_table(table_name, columns))
+    for name, body in missing.items():
+        conn.exec_driver_sql(f"CREATE TRIGGER {name} {body}")
+    index = _index_name(table_name)
+    conn.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+def suspend_search_sync(conn, table_name):
+    # Bulk loads drop the per-row triggers, which would make them several times slower, and call
+    # resume_search_sync() once the rows are in. Returns whether there was anything to suspend.
+    columns = _search_source(table_name)
+    if columns is None or conn.dialect.name != 'sqlite':
+        return False
+    for name in _sqlite_triggers(table_name, columns):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    return True
+
+def create_search_indexes(conn):
+    for model, key, columns in SEARCH_SOURCES.values():
+        table_name = model.__tablename__
+        if conn.dialect.name == 'sqlite':
+            resume_search_sync(conn, table_name)
+        elif conn.dialect.name == 'postgresql':
+            conn.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{_index_name(table_name)} ON {table_name} USING gin ({_tsvector(columns)})"
+            )
+
+def rebuild_search_indexes(conn):
+    # Only needed on SQLite, e.g. after a VACUUM has renumbered the rows of the source tables
+    if conn.dialect.name == 'sqlite':
+        for model, key, columns in SEARCH_SOURCES.values():
+            index = _index_name(model.__tablename__)
+            conn.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+def search_terms(query):
+    return WORD_PATTERN.findall(query)
+
+def search(conn, scope, query, limit=SEARCH_LIMIT):
+    # Keys of the matching rows, best match first
+    model, key, columns = SEARCH_SOURCES[scope]
+    table_name = model.__tablename__
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if conn.dialect.name == 'sqlite':
+        index = _index_name(table_name)
+        # Every word is quoted, so FTS5 operators typed by the user are searched for as text
+        match = ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+        # Only the first SEARCH_RANK_CANDIDATES matches are ranked. A short prefix can match most of
+        # the table, and scoring every one of those rows would take seconds on millions of rows.
+        statement = text(
+            f"SELECT {table_name}.{key} FROM ("
+            f"SELECT rowid, rank FROM {index} WHERE {index} MATCH :match LIMIT :candidates"
+            f") AS hits JOIN {table_name} ON {table_name}.rowid = hits.rowid ORDER BY hits.rank LIMIT :limit"
+        )
+        return conn.execute(
+            statement, {'match': match, 'candidates': max(SEARCH_RANK_CANDIDATES, limit), 'limit': limit}
+        ).scalars().all()
+
+    if conn.dialect.name == 'postgresql':
+        tsquery = ' & '.join(f"{term.lower()}:*" for term in terms)
+        statement = text(
+            f"SELECT {key} FROM {table_name} WHERE {_tsvector(columns)} @@ to_tsquery('simple', :query) "
+            f"ORDER BY ts_rank({_tsvector(columns)}, to_tsquery('simple', :query)) DESC LIMIT :limit"
+        )
+        return conn.execute(statement, {'query': tsquery, 'limit': limit}).scalars().all()
+
+    # Other databases: unranked substring match on each word
+    stmt = select(getattr(model, key)).limit(limit)
+    for term in terms:
+        stmt = stmt.where(or_(*(getattr(model, column).contains(term) for column in columns)))
+    return conn.execute(stmt).scalars().all()
+
+def search_rows(session, scope, query, query_columns, limit=SEARCH_LIMIT):
+    # The given columns of the matching rows, in ranked order, for display in a tab's tree
+    model, key, columns = SEARCH_SOURCES[scope]
+    keys = search(session.connection(), scope, query, limit)
+    if not keys:
+        return []
+    rank = {value: position for position, value in enumerate(keys)}
+    key_index = [column.key for column in query_columns].index(key)
+    rows = session.execute(select(*query_columns).where(getattr(model, key).in_(keys))).all()
+    return sorted(rows, key=lambda row: rank[row[key_index]])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search items, customers or sales orders.")
+    parser.add_argument('scope', nargs='?', choices=sorted(SEARCH_SOURCES))
+    parser.add_argument('query', nargs='?')
+    parser.add_argument('--limit', type=int, default=SEARCH_LIMIT)
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the SQLite search indexes from the tables")
+    args = parser.parse_args()
+
+    init_db()
+    if args.rebuild:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            rebuild_search_indexes(conn)
+        print(f"Rebuilt the search indexes in {time.perf_counter() - started:.2f}s.")
+    if args.scope and args.query:
+        session = Session()
+        try:
+            started = time.perf_counter()
+            keys = search(session.connection(), args.scope, args.query, args.limit)
+            elapsed = time.perf_counter() - started
+            for key in keys:
+                print(key)
+            print(f"{len(keys)} matches in {elapsed * 1000:.1f} ms.")
+        finally:
+            Session.remove()
@@ -0,0 +1,125 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+# Guards the entry points against start-up regressions. Each case starts a fresh interpreter
+# and loads what the entry point loads before it does any work. A case fails if it is over
+# budget, if a headless case pulls in a GUI module, or if anything touches the database while
+# importing (the database path points into a directory that does not exist).
+# When a display is available the GUI is also started once per run with UI_STARTUP_PROBE=1,
+# which reports the time to first paint against UI_FIRST_PAINT_TARGET_MS.
+#     python startup_benchmark.py [--repeat 5] [--scale 1.0] [--profile 15]
+
+# (label, interpreter arguments, budget in seconds, headless). Most of the import budgets are
+# pandas, SQLAlchemy and reportlab themselves, which the commands need for their actual work.
+CASES = [
+    ("erp --help", ['erp.py', '--help'], 0.25, True),
+    ("erp import", ['-c', "import erp, data_import"], 1.5, True),
+    ("erp report (csv)", ['-c', "import erp, reports, report_export"], 1.0, True),
+    ("erp export-po", ['-c', "import erp, pdf_generator"], 1.0, True),
+    ("erp mrp", ['-c', "import erp, mrp"], 1.0, True),
+    ("gui (import main)", ['-c', "import main"], 1.0, False),
+]
+FORBIDDEN_MODULES = {'tkinter', '_tkinter', 'matplotlib'}
+DEFERRED_GUI_MODULES = {'matplotlib', 'pandas', 'reportlab', 'numpy'}
+FIRST_PAINT_PATTERN = re.compile(r'First paint after (\d+) ms \(target (\d+) ms\)')
+
+def _parse_importtime(importtime_output):
+    # -X importtime lines look like "import time:  self [us] | cumulative | name"; nesting is shown by indent
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or line.rstrip().endswith('imported package'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        yield name[1:], int(self_us) / 1000, int(cumulative_us) / 1000
+
+def _top_level_imports(importtime_output):
+    return {
+        name.strip(): cumulative_ms
+        for name, self_ms, cumulative_ms in _parse_importtime(importtime_output) if not name.startswith(' ')
+    }
+
+def _import_profile(importtime_output, limit):
+    modules = [(self_ms, name.strip()) for name, self_ms, cumulative_ms in _parse_importtime(importtime_output)]
+    return sorted(modules, reverse=True)[:limit]
+
+def run_case(args, repeat, env, headless=True):
+    command = [sys.executable, '-X', 'importtime'] + args
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=current_dir, env=env, capture_output=True, text=True)
+        timings.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+
+    all_imports = {name.strip() for name, self_ms, cumulative_ms in _parse_importtime(result.stderr)}
+    not_allowed = FORBIDDEN_MODULES if headless else DEFERRED_GUI_MODULES
+    forbidden = sorted(name for name in all_imports if name.split('.')[0] in not_allowed)
+    return statistics.median(timings), result.stderr, forbidden
+
+def has_display():
+    return not sys.platform.startswith('linux') or bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+def run_first_paint(repeat, workdir):
+    env = dict(os.environ, UI_STARTUP_PROBE='1', DATABASE_URI='sqlite:///' + os.path.join(workdir, 'first_paint.db'))
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, 'main.py'], cwd=current_dir, env=env, capture_output=True, text=True)
+        match = FIRST_PAINT_PATTERN.search(result.stdout)
+        if match is None:
+            raise RuntimeError(f"main.py did not report its first paint:\n{result.stderr}")
+        timings.append(int(match.group(1)))
+    return statistics.median(timings), int(match.group(2))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure start-up time of the headless entry points.")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per case; the median is reported")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplier for the budgets on slower machines")
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help="Also list the N modules with the highest self import time for each case")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, DATABASE_URI='sqlite:///' + os.path.join(workdir, 'missing', 'startup.db'))
+        results = [
+            (label, budget * args.scale) + run_case(case_args, args.repeat, env, headless)
+            for label, case_args, budget, headless in CASES
+        ]
+        first_paint = run_first_paint(args.repeat, workdir) if has_display() else None
+
+    for label, budget, elapsed, importtime_output, forbidden in results:
+        over_budget = elapsed > budget
+        failed = failed or over_budget or bool(forbidden)
+
+        status = 'OK' if not over_budget and not forbidden else 'FAIL'
+        print(f"{label}: {elapsed:.3f}s (budget {budget:.3f}s) {status}")
+        heaviest = sorted(_top_level_imports(importtime_output).items(), key=lambda item: item[1], reverse=True)[:5]
+        print(f"  heaviest imports: {', '.join(f'{name} {ms:.0f} ms' for name, ms in heaviest)}")
+        if forbidden:
+            print(f"  imports modules it should defer: {', '.join(forbidden)}")
+        for self_ms, name in _import_profile(importtime_output, args.profile):
+            print(f"    {self_ms:8.1f} ms  {name}")
+
+    if first_paint is None:
+        print("gui first paint: skipped (no display)")
+    else:
+        first_paint_ms, target_ms = first_paint
+        over_target = first_paint_ms > target_ms * args.scale
+        failed = failed or over_target
+        print(f"gui first paint: {first_paint_ms} ms (target {target_ms * args.scale:.0f} ms) {'FAIL' if over_target else 'OK'}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from sqlalchemy import select, delete, insert, func, and_, or_
+import argparse
+import datetime
+import os
+import sys
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import engine, init_db, SalesOrder, SalesOrderItem, SalesByCustomer, SalesByMonth, SalesByStatus, SalesByItem
+
+# Rollup tables for the sales KPIs. Writers call refresh_order_summaries() for the orders they touched,
+# which recomputes only the customer, month, status and item groups those orders belong to.
+
+BATCH_SIZE = 500
+
+def month_bucket(column, dialect_name):
+    if dialect_name == 'postgresql':
+        return func.to_char(func.date_trunc('month', column), 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+def _summary_specs(dialect_name):
+    order_totals = [func.count(), func.sum(SalesOrder.document_total)]
+    return {
+        'customer': (SalesByCustomer.__table__, SalesOrder.bp_code, order_totals),
+        'month': (SalesByMonth.__table__, month_bucket(SalesOrder.posting_date, dialect_name), order_totals),
+        'status': (SalesByStatus.__table__, SalesOrder.status_code, order_totals),
+        'item': (SalesByItem.__table__, SalesOrderItem.item_number,
+                 [func.count(), func.sum(SalesOrderItem.quantity), func.sum(SalesOrderItem.total_price)])
+    }
+
+def _batches(values):
+    values = sorted(values)
+    for start in range(0, len(values), BATCH_SIZE):
+        yield values[start:start + BATCH_SIZE]
+
+def _group_filter(name, group, keys):
+    if name != 'month':
+        return group.in_(keys)
+
+    # Match months with a date range so the posting_date index can be used
+    ranges = []
+    for month in keys:
+        start = datetime.datetime.strptime(month, '%Y-%m').date()
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+        ranges.append(and_(SalesOrder.posting_date >= start, SalesOrder.posting_date < end))
+    return or_(*ranges)
+
+def _aggregate(name, spec, keys=None):
+    summary, group, aggregates = spec
+    stmt = select(group, *aggregates).where(group.isnot(None)).group_by(group)
+    if keys is not None:
+        stmt = stmt.where(_group_filter(name, group, keys))
+    return stmt
+
+def sales_summary_groups(conn, order_numbers):
+    specs = _summary_specs(conn.dialect.name)
+    groups = {name: set() for name in specs}
+    for batch in _batches(order_numbers):
+        rows = conn.execute(
+            select(specs['customer'][1], specs['month'][1], specs['status'][1])
+            .where(SalesOrder.sales_order_number.in_(batch))
+        ).all()
+        for bp_code, month, status_code in rows:
+            groups['customer'].add(bp_code)
+            groups['month'].add(month)
+            groups['status'].add(status_code)
+
+        groups['item'].update(conn.execute(
+            select(SalesOrderItem.item_number).where(SalesOrderItem.sales_order_number.in_(batch)).distinct()
+        ).scalars())
+
+    for keys in groups.values():
+        keys.discard(None)
+    return groups
+
+def refresh_sales_summaries(conn, groups):
+    for name, spec in _summary_specs(conn.dialect.name).items():
+        summary = spec[0]
+        key_column = summary.primary_key.columns[0]
+        for batch in _batches(groups.get(name, ())):
+            conn.execute(delete(summary).where(key_column.in_(batch)))
+            conn.execute(insert(summary).from_select([column.name for column in summary.columns], _aggregate(name, spec, batch)))
+
+def refresh_order_summaries(conn, order_numbers, previous_groups=None):
+    # previous_groups holds the groups the orders belonged to before they were rewritten,
+    # so totals move out of a customer or month an order no longer belongs to
+    groups = sales_summary_groups(conn, order_numbers)
+    if previous_groups is not None:
+        for name, keys in previous_groups.items():
+            groups[name] |= keys
+    refresh_sales_summaries(conn, groups)
+
+def rebuild_sales_summaries(conn):
+    for name, spec in _summary_specs(conn.dialect.name).items():
+        summary = spec[0]
+        conn.execute(delete(summary))
+        conn.execute(insert(summary).from_select([column.name for column in summary.columns], _aggregate(name, spec)))
+
+def ensure_sales_summaries(conn):
+    # Databases created before the rollups existed get them built on first use
+    summarized = conn.execute(select(SalesByCustomer.bp_code).limit(1)).first()
+    if summarized is None and conn.execute(select(SalesOrder.sales_order_number).limit(1)).first() is not None:
+        rebuild_sales_summaries(conn)
+
+def check_sales_summaries(conn):
+    mismatches = {}
+    for name, spec in _summary_specs(conn.dialect.name).items():
+        summary = spec[0]
+        expected = {row[0]: tuple(round(value or 0, 2) for value in row[1:]) for row in conn.execute(_aggregate(name, spec))}
+        stored = {row[0]: tuple(round(value or 0, 2) for value in row[1:]) for row in conn.execute(select(summary))}
+        mismatches[summary.name] = sum(
+            1 for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key)
+        )
+    return mismatches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the sales summary tables.")
+    parser.add_argument('command', choices=['rebuild', 'check'])
+    args = parser.parse_args()
+    init_db()
+
+    if args.command == 'rebuild':
+        with engine.begin() as conn:
+            rebuild_sales_summaries(conn)
+        print("Sales summaries rebuilt.")
+    else:
+        with engine.connect() as conn:
+            mismatches = check_sales_summaries(conn)
+        for table_name, count in mismatches.items():
+            print(f"{table_name}: {'OK' if count == 0 else f'{count} mismatched groups'}")
+        sys.exit(1 if any(mismatches.values()) else 0)
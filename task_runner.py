@@ -0,0 +1,172 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from concurrent.futures import ThreadPoolExecutor
+import os
+import queue
+import sys
+import threading
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from models import Session
+from config.config import TASK_WORKERS, TASK_POLL_INTERVAL_MS
+
+class TaskCancelled(Exception):
+    pass
+
+class Task:
+    def __init__(self, runner, name, work, on_success, on_error):
+        self.runner = runner
+        self.name = name
+        self.work = work
+        self.on_success = on_success
+        self.on_error = on_error
+        self.cancel_event = threading.Event()
+        self.cancel_callbacks = []
+        self.started = time.perf_counter()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+        # Lets work that is blocked inside a driver call (e.g. a long SQL statement) be interrupted
+        for callback in list(self.cancel_callbacks):
+            callback()
+
+    def add_cancel_callback(self, callback):
+        self.cancel_callbacks.append(callback)
+
+    def remove_cancel_callback(self, callback):
+        self.cancel_callbacks.remove(callback)
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled(f"{self.name} was cancelled.")
+
+    def report_progress(self, message):
+        # Safe to call from the worker thread; the UI picks it up on its next poll
+        self.runner.results.put((self, 'progress', message))
+
+    def call_in_ui(self, callback, *args):
+        # Runs callback on the UI thread at its next poll, e.g. to show partial results
+        self.runner.results.put((self, 'call', (callback, args)))
+
+class TaskRunner:
+    # Runs database and report work on a thread pool so the Tk mainloop never blocks.
+    # Results come back through a queue that the UI thread drains with after().
+    def __init__(self, master, status_bar=None, max_workers=TASK_WORKERS, poll_interval=TASK_POLL_INTERVAL_MS):
+        self.master = master
+        self.status_bar = status_bar
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='erp-task')
+        self.results = queue.Queue()
+        self.active = []
+        self.master.after(self.poll_interval, self._poll)
+
+    def submit(self, name, work, on_success=None, on_error=None):
+        task = Task(self, name, work, on_success, on_error)
+        self.active.append(task)
+        self._update_status(f"{name}...")
+        self.executor.submit(self._run, task)
+        return task
+
+    def cancel_all(self):
+        for task in self.active:
+            task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
+
+    def _run(self, task):
+        # One session per worker thread; a session is never shared between threads
+        session = Session()
+        try:
+            task.check_cancelled()
+            result = task.work(session, task)
+            self.results.put((task, 'success', result))
+        except Exception as e:
+            session.rollback()
+            self.results.put((task, 'error', e))
+        finally:
+            Session.remove()
+
+    def _poll(self):
+        try:
+            while True:
+                task, kind, payload = self.results.get_nowait()
+                if kind == 'progress':
+                    self._update_status(f"{task.name}: {payload}")
+                    continue
+                if kind == 'call':
+                    callback, args = payload
+                    callback(*args)
+                    continue
+
+                self.active.remove(task)
+                elapsed = time.perf_counter() - task.started
+                if task.cancelled:
+                    self._update_status(f"{task.name} cancelled.")
+                elif kind == 'success':
+                    self._update_status(f"{task.name} finished in {elapsed:.2f}s.")
+                    if task.on_success is not None:
+                        task.on_success(payload)
+                else:
+                    self._update_status(f"{task.name} failed.")
+                    if task.on_error is not None:
+                        task.on_error(payload)
+                    else:
+                        messagebox.showerror("Error", f"{task.name} failed: {payload}")
+        except queue.Empty:
+            pass
+        finally:
+            self.master.after(self.poll_interval, self._poll)
+
+    def _update_status(self, message):
+        if self.status_bar is not None:
+            self.status_bar.update_status(message, busy=bool(self.active))
+
+class TaskStatusBar(ttk.Frame):
+    def __init__(self, master):
+        super().__init__(master)
+        self.label = ttk.Label(self, text="Ready")
+        self.label.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(self, text="Cancel", state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.progress = ttk.Progressbar(self, mode='indeterminate', length=150)
+        self.progress.pack(side=tk.RIGHT, padx=5)
+
+    def bind_runner(self, runner):
+        self.cancel_button.configure(command=runner.cancel_all)
+
+    def update_status(self, message, busy):
+        self.label.configure(text=message)
+        if busy:
+            self.progress.start(10)
+            self.cancel_button.configure(state=tk.NORMAL)
+        else:
+            self.progress.stop()
+            self.cancel_button.configure(state=tk.DISABLED)
+
+class StallMonitor:
+    # Measures how late the Tk event loop services a fixed-interval timer.
+    # max_stall_ms is the longest time the UI was unable to process events.
+    def __init__(self, master, interval_ms=50):
+        self.master = master
+        self.interval_ms = interval_ms
+        self.max_stall_ms = 0.0
+        self.expected = time.perf_counter() + interval_ms / 1000
+        self.master.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        stall_ms = (now - self.expected) * 1000
+        self.max_stall_ms = max(self.max_stall_ms, stall_ms)
+        self.expected = now + self.interval_ms / 1000
+        self.master.after(self.interval_ms, self._tick)
@@ -0,0 +1,43 @@
+import os
+import shutil
+import pytest
+import tempfile
+
+from tests.support import backend_uris, fresh_engine, scratch_environment, use_checkout_config
+
+WORKDIR = tempfile.mkdtemp(prefix='mrp_erp_tests_')
+
+os.environ.update(scratch_environment(WORKDIR))
+os.makedirs(os.environ['DATA_FOLDER'], exist_ok=True)
+use_checkout_config()
+
+from models import engine, init_db, Base
+
+@pytest.fixture
+def empty_db():
+    # Every table dropped and created again, so each test starts from an empty database
+    Base.metadata.drop_all(engine)
+    init_db()
+    yield engine
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def backend_engine(request):
+    # A fresh schema per backend, separate from the models.engine the other tests use.
+    # PostgreSQL only runs when TEST_POSTGRES_URI names a throwaway database.
+    uris = dict(backend_uris(WORKDIR))
+    if request.param not in uris:
+        pytest.skip("TEST_POSTGRES_URI is not set")
+    db_engine = fresh_engine(uris[request.param])
+    yield db_engine
+    db_engine.dispose()
+
+@pytest.fixture
+def data_folder():
+    folder = os.environ['DATA_FOLDER']
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    return folder
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    shutil.rmtree(WORKDIR, ignore_errors=True)
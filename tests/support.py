@@ -0,0 +1,63 @@
+import os
+import sys
+
+# Shared set-up for the tests and for the child processes they start. The application reads
+# config/config.py from the directory above its sources; in a checkout config.py sits next to the
+# modules instead, so it is registered under the name the modules import it by.
+# Everything points at a scratch directory, set before config is first imported.
+# Tests that compare backends also run on PostgreSQL when TEST_POSTGRES_URI names a throwaway
+# database (its tables are dropped), e.g. postgresql+psycopg2://postgres@localhost/mrp_erp_test
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POSTGRES_URI = os.environ.get('TEST_POSTGRES_URI')
+
+def use_checkout_config():
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    try:
+        import config.config
+    except ImportError:
+        import config
+        sys.modules['config.config'] = config
+
+def scratch_environment(workdir, database_uri=None):
+    return {
+        'DATABASE_URI': database_uri or 'sqlite:///' + os.path.join(workdir, 'test.db'),
+        'DATA_FOLDER': os.path.join(workdir, 'data'),
+        'BENCHMARK_HISTORY_FILE': os.path.join(workdir, 'benchmark_history.jsonl'),
+        'QUERY_CACHE_ENABLED': '0',
+        'IMPORT_WORKERS': '1'
+    }
+
+def backend_uris(workdir):
+    # (backend, database URI) for SQLite and, when one is configured, PostgreSQL
+    uris = [('sqlite', 'sqlite:///' + os.path.join(workdir, 'backend.db'))]
+    if POSTGRES_URI:
+        uris.append(('postgresql', POSTGRES_URI))
+    return uris
+
+def fresh_engine(uri):
+    # An engine on the given database with every table dropped and created again
+    from models import Base, create_db_engine, init_db
+    db_engine = create_db_engine(uri)
+    Base.metadata.drop_all(db_engine)
+    init_db(db_engine)
+    return db_engine
+
+def child_command(code):
+    # python -c CODE with the same config set-up, for work that needs its own DATABASE_URI
+    return [sys.executable, '-c', f"from tests.support import use_checkout_config; use_checkout_config()\n{code}"]
+
+class QuietTask:
+    # Stands in for a task_runner Task when query_engine.run_query is driven from a test
+    name = "Running query"
+    cancelled = False
+
+    def check_cancelled(self):
+        pass
+
+    def add_cancel_callback(self, callback):
+        pass
+
+    def remove_cancel_callback(self, callback):
+        pass
@@ -0,0 +1,146 @@
+import os
+import re
+import subprocess
+import time
+import pandas as pd
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import sessionmaker
+
+from data_generator import generate_data
+from data_import import bulk_upsert
+from query_engine import run_query
+from models import (create_db_engine, ItemInventory, BusinessPartner, BPAddress, CustomerContact, Manufacturer, SalesOrder, SalesOrderItem,
+                    SalesOrderStatus, PurchaseOrder, SalesByCustomer, SalesByMonth, SalesByStatus, SalesByItem)
+from summaries import check_sales_summaries
+from tests.support import REPO_DIR, QuietTask, backend_uris, child_command, fresh_engine, scratch_environment
+
+# The same loads on SQLite (executemany batches) and PostgreSQL (COPY into a staging table) must
+# leave identical data behind. PostgreSQL is only compared when TEST_POSTGRES_URI is set; SQLite
+# is always checked against the expected values. Load throughput per backend is printed at the end.
+PARITY_SCALE = 20000
+BULK_ROWS = 50000
+IMPORTED_TABLES = [Manufacturer, BusinessPartner, CustomerContact, BPAddress, SalesOrderStatus, ItemInventory,
+                   SalesOrder, PurchaseOrder, SalesOrderItem]
+ROLLUPS = [SalesByCustomer, SalesByMonth, SalesByStatus, SalesByItem]
+IMPORT_TIME_PATTERN = re.compile(r'All data imported successfully in ([\d.]+)s')
+
+def item_frame(first, count, price):
+    numbers = range(first, first + count)
+    return pd.DataFrame({
+        'item_number': [f"B{number:07d}" for number in numbers],
+        'description': [f"Bulk item {number}" for number in numbers],
+        'in_stock': [float(number % 100) for number in numbers],
+        'last_purchase_price': [price + number % 7 for number in numbers]
+    })
+
+def item_totals(conn):
+    return tuple(round(value, 2) for value in conn.execute(
+        select(func.count(), func.sum(ItemInventory.in_stock), func.sum(ItemInventory.last_purchase_price))
+    ).one())
+
+def database_totals(conn):
+    counts = {model.__tablename__: conn.execute(select(func.count()).select_from(model)).scalar()
+              for model in IMPORTED_TABLES}
+    rollups = {model.__tablename__: tuple(round(value or 0, 2) for value in conn.execute(
+        select(func.count(), func.sum(model.total))).one()) for model in ROLLUPS}
+    return counts, rollups
+
+def report_throughput(record, operation, backend, rows, elapsed):
+    # Written to the test suite properties of the --junitxml report instead of being printed
+    record(f"{operation} on {backend} (rows/s)", round(rows / elapsed))
+
+def test_bulk_upsert_gives_the_same_rows_on_every_backend(tmp_path, record_testsuite_property):
+    first = item_frame(0, BULK_ROWS, 10.0)
+    # Half of the second load updates existing items, and it repeats keys; the last row wins
+    second = pd.concat([item_frame(BULK_ROWS // 2, BULK_ROWS, 20.0), item_frame(BULK_ROWS, 10, 30.0)])
+    expected_frame = pd.concat([first, second]).drop_duplicates('item_number', keep='last')
+    expected = (len(expected_frame), round(expected_frame['in_stock'].sum(), 2),
+                round(expected_frame['last_purchase_price'].sum(), 2))
+
+    results = {}
+    for backend, uri in backend_uris(str(tmp_path)):
+        db_engine = fresh_engine(uri)
+        try:
+            started = time.perf_counter()
+            with db_engine.begin() as conn:
+                bulk_upsert(ItemInventory.__table__, first, conn=conn)
+            report_throughput(record_testsuite_property, "bulk_upsert (insert)", backend, len(first), time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with db_engine.begin() as conn:
+                bulk_upsert(ItemInventory.__table__, second, conn=conn)
+            report_throughput(record_testsuite_property, "bulk_upsert (upsert)", backend, len(second), time.perf_counter() - started)
+
+            with db_engine.connect() as conn:
+                results[backend] = item_totals(conn)
+        finally:
+            db_engine.dispose()
+
+    assert results['sqlite'] == expected
+    assert all(totals == results['sqlite'] for totals in results.values())
+
+def test_import_all_data_gives_the_same_tables_and_rollups_on_every_backend(tmp_path, record_testsuite_property):
+    data_dir = str(tmp_path / 'data')
+    sizes = generate_data(data_dir, PARITY_SCALE, seed=7)
+    file_rows = sum(1 for name in os.listdir(data_dir) for _ in open(os.path.join(data_dir, name), encoding='utf-8'))
+
+    results = {}
+    for backend, uri in backend_uris(str(tmp_path)):
+        fresh_engine(uri).dispose()
+        env = dict(os.environ, **scratch_environment(str(tmp_path), uri))
+        env['DATA_FOLDER'] = data_dir
+        result = subprocess.run(
+            child_command("from data_import import import_all_data\nimport_all_data(incremental=False)"),
+            cwd=REPO_DIR, env=env, capture_output=True, text=True
+        )
+        assert result.returncode == 0, result.stderr
+        assert "Error importing" not in result.stdout, result.stdout
+        report_throughput(record_testsuite_property, "import_all_data", backend, file_rows,
+                          float(IMPORT_TIME_PATTERN.search(result.stdout).group(1)))
+
+        db_engine = create_db_engine(uri)
+        try:
+            with db_engine.connect() as conn:
+                assert all(count == 0 for count in check_sales_summaries(conn).values())
+                results[backend] = database_totals(conn)
+        finally:
+            db_engine.dispose()
+
+    counts, rollups = results['sqlite']
+    assert counts['sales_order_item'] == sizes['sales_order_lines']
+    assert counts['sales_order'] == sizes['sales_orders']
+    assert counts['item_inventory'] == sizes['items']
+    assert counts['bp_address'] == 2 * sizes['customers']
+    assert rollups['sales_by_customer'][1] == rollups['sales_by_month'][1] == rollups['sales_by_status'][1]
+    assert all(totals == results['sqlite'] for totals in results.values())
+
+def test_query_tab_runs_statements_that_return_no_rows(backend_engine):
+    # Only row-returning queries may go through psycopg2's server-side cursor
+    statements = [
+        ("INSERT INTO manufacturer (manufacturer_code, manufacturer_name) "
+         "VALUES ('M1', 'Acme'), ('M2', 'Apex'), ('M3', 'Atlas')", 3),
+        ("UPDATE manufacturer SET discount_percent = 5 WHERE manufacturer_code = 'M1'", 1),
+        ("DELETE FROM manufacturer WHERE manufacturer_code = 'M2'", 1),
+        ("CREATE TEMPORARY TABLE scratch (code VARCHAR)", None)
+    ]
+    if backend_engine.dialect.name == 'postgresql':
+        statements.append(("SET work_mem = '8MB'", None))
+        statements.append(("WITH gone AS (DELETE FROM manufacturer WHERE manufacturer_code = 'M3' "
+                           "RETURNING manufacturer_code) SELECT count(*) FROM gone", None))
+    else:
+        statements.append(("DELETE FROM manufacturer WHERE manufacturer_code = 'M3'", 1))
+
+    session = sessionmaker(bind=backend_engine)()
+    try:
+        for sql, affected in statements:
+            summary = run_query(session, sql, QuietTask(), lambda *page: None)
+            if affected is not None:
+                assert summary['affected'] == affected, sql
+        pages = []
+        summary = run_query(session, "SELECT manufacturer_code, discount_percent FROM manufacturer", QuietTask(),
+                            lambda columns, rows, count, elapsed: pages.append(rows))
+    finally:
+        session.close()
+
+    assert summary['rows'] == 1 and pages == [[('M1', 5.0)]]
@@ -0,0 +1,23 @@
+import pytest
+
+import data_import
+from erp import main as erp_main
+
+def test_a_failed_stage_stops_the_import(empty_db, data_folder, monkeypatch):
+    # No source files at all, so every importer in the first stage fails
+    imported = []
+    monkeypatch.setattr(data_import, 'IMPORT_STAGES', [
+        data_import.IMPORT_STAGES[0],
+        [lambda incremental: imported.append(incremental)]
+    ])
+
+    with pytest.raises(data_import.ImportFailed, match="stage 1 failed.*import_manufacturers"):
+        data_import.import_all_data(workers=1)
+    assert imported == []
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_erp_import_exits_non_zero_when_a_file_fails(empty_db, data_folder, workers, capsys):
+    assert erp_main(['import', '--workers', workers]) == 1
+    output = capsys.readouterr().out
+    assert "Error importing manufacturer data" in output
+    assert "All data imported successfully" not in output
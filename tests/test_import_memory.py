@@ -0,0 +1,42 @@
+import os
+import tracemalloc
+
+from sqlalchemy import select, func
+
+import data_import
+from models import ItemInventory
+from config.config import IMPORT_CHUNK_SIZE, IMPORT_PREFETCH_CHUNKS
+
+# The streaming import keeps at most the chunks waiting in the prefetch queue, the one being parsed
+# and the one being written in memory, so its peak is set by IMPORT_CHUNK_SIZE, not by the file size.
+CHUNKS_IN_FLIGHT = IMPORT_PREFETCH_CHUNKS + 2
+BYTES_PER_ROW = 4096
+# Enough chunks to fill the prefetch queue, so the smaller file already reaches the steady-state peak
+BASE_CHUNKS = 2 * CHUNKS_IN_FLIGHT
+
+def write_item_master(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for number in range(1, rows + 1):
+            f.write(f"A{number:07d}\tTest Item {number} Compact Printer\t{number % 50:02d}\t{number % 900}.00\t"
+                    f"{number % 40}.00\t{number % 30}.00\t{(number % 500) + 10}.25\r\n")
+
+def import_peak(data_folder, rows):
+    write_item_master(os.path.join(data_folder, os.path.basename(data_import.ITEM_MASTER_FILE)), rows)
+    tracemalloc.start()
+    try:
+        data_import.import_item_inventory(incremental=False)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    with data_import.engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(ItemInventory)).scalar() == rows
+    return peak
+
+def test_import_peak_memory_is_bounded_by_chunk_size(empty_db, data_folder):
+    peak = import_peak(data_folder, BASE_CHUNKS * IMPORT_CHUNK_SIZE)
+    assert peak < CHUNKS_IN_FLIGHT * IMPORT_CHUNK_SIZE * BYTES_PER_ROW
+
+def test_import_peak_memory_does_not_grow_with_file_size(empty_db, data_folder):
+    small = import_peak(data_folder, BASE_CHUNKS * IMPORT_CHUNK_SIZE)
+    large = import_peak(data_folder, 4 * BASE_CHUNKS * IMPORT_CHUNK_SIZE)
+    assert large < small * 1.25
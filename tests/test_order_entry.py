@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from sqlalchemy import select, insert
+
+from models import ItemInventory, BusinessPartner, CustomerContact, SalesOrder
+import order_entry
+from order_entry import OrderEntryError, create_customer, create_sales_order
+
+# "Add Customer" followed by "New Sale" in the GUI; on PostgreSQL the sales order's foreign key
+# to business_partner is enforced, so the new customer must have a partner row
+def test_a_new_customer_can_place_a_sales_order(backend_engine):
+    with backend_engine.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), {'item_number': 'A1', 'last_purchase_price': 10.0})
+        create_customer(conn, 'C9', "Pat Doe", "Buyer", "555-0100")
+        order_number = create_sales_order(conn, 'C9', [('A1', 3)])
+
+    with backend_engine.connect() as conn:
+        assert conn.execute(select(SalesOrder.bp_code).filter_by(sales_order_number=order_number)).scalar() == 'C9'
+        assert conn.execute(select(BusinessPartner.bp_name).filter_by(bp_code='C9')).scalar() == "Pat Doe"
+        assert conn.execute(select(CustomerContact.telephone).filter_by(bp_code='C9')).scalar() == "555-0100"
+
+def test_orders_for_unknown_or_duplicate_customers_are_refused(backend_engine):
+    with backend_engine.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), {'item_number': 'A1', 'last_purchase_price': 10.0})
+        create_customer(conn, 'C9', "Pat Doe")
+        with pytest.raises(OrderEntryError):
+            create_customer(conn, 'C9', "Someone Else")
+        with pytest.raises(OrderEntryError):
+            create_sales_order(conn, 'C404', [('A1', 1)])
+
+def test_concurrent_sales_orders_get_different_numbers(backend_engine, monkeypatch):
+    with backend_engine.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), {'item_number': 'A1', 'last_purchase_price': 10.0})
+        create_customer(conn, 'C9', "Pat Doe")
+
+    # Both orders are priced before either takes a number, and each holds its number a moment
+    # before writing it, so two writers reading the same max() would collide
+    priced = threading.Barrier(2, timeout=10)
+    price_lines, next_number = order_entry.price_lines, order_entry.next_number
+
+    def price_together(conn, lines):
+        result = price_lines(conn, lines)
+        priced.wait()
+        return result
+
+    def slow_next_number(conn, column):
+        number = next_number(conn, column)
+        time.sleep(0.2)
+        return number
+
+    monkeypatch.setattr(order_entry, 'price_lines', price_together)
+    monkeypatch.setattr(order_entry, 'next_number', slow_next_number)
+    numbers, errors = [], []
+
+    def place_order():
+        try:
+            with backend_engine.begin() as conn:
+                numbers.append(create_sales_order(conn, 'C9', [('A1', 1)]))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=place_order) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(numbers) == [1, 2]
+    with backend_engine.connect() as conn:
+        assert sorted(conn.execute(select(SalesOrder.sales_order_number)).scalars()) == [1, 2]
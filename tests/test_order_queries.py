@@ -0,0 +1,60 @@
+from sqlalchemy import insert
+
+from models import QueryCounter, Session, ItemInventory, BusinessPartner, CustomerContact
+from order_entry import create_sales_order, create_purchase_order
+from pdf_generator import generate_pdf, purchase_order_query
+from main import sales_order_details
+
+# Rendering an order must cost the same number of SELECTs whether it has one line or sixty;
+# a lazy load per line would show up as one extra query for each of them
+LINE_COUNTS = (1, 60)
+
+def create_orders(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), [
+            {'item_number': f"A{number:03d}", 'description': f"Item {number}", 'last_purchase_price': 5.0 + number}
+            for number in range(max(LINE_COUNTS))
+        ])
+        conn.execute(insert(BusinessPartner.__table__), {'bp_code': 'C1'})
+        conn.execute(insert(CustomerContact.__table__), {'bp_code': 'C1', 'contact_name': "Pat Doe"})
+        sales, purchases = {}, {}
+        for count in LINE_COUNTS:
+            lines = [(f"A{number:03d}", number + 1) for number in range(count)]
+            sales[count] = create_sales_order(conn, 'C1', lines)
+            purchases[count] = create_purchase_order(conn, 'M1', lines)
+    return sales, purchases
+
+def counted_selects(db_engine, render):
+    session = Session()
+    try:
+        with QueryCounter(db_engine) as counter:
+            render(session)
+    finally:
+        Session.remove()
+    return counter.selects
+
+def test_purchase_order_pdf_queries_do_not_grow_with_lines(empty_db, tmp_path):
+    purchases = create_orders(empty_db)[1]
+
+    def render(count):
+        def run(session):
+            number = purchases[count]
+            order = session.scalars(purchase_order_query(number, number)).first()
+            assert len(order.items) == count
+            generate_pdf(order, str(tmp_path / f"PO_{number}.pdf"))
+        return run
+
+    selects = {count: counted_selects(empty_db, render(count)) for count in LINE_COUNTS}
+    assert selects[1] == selects[60]
+
+def test_sales_order_view_queries_do_not_grow_with_lines(empty_db):
+    sales = create_orders(empty_db)[0]
+
+    def render(count):
+        def run(session):
+            details = sales_order_details(session, sales[count])
+            assert "Pat Doe" in details and f"A{count - 1:03d}" in details
+        return run
+
+    selects = {count: counted_selects(empty_db, render(count)) for count in LINE_COUNTS}
+    assert selects[1] == selects[60]
@@ -0,0 +1,59 @@
+import os
+import threading
+
+from sqlalchemy import insert
+
+import pdf_generator
+from models import QueryCounter, Session, ItemInventory, PurchaseOrder, PurchaseOrderItem
+
+ORDERS = 25
+BATCH_SIZE = 10
+
+def create_purchase_orders(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), {'item_number': 'A1', 'description': "Item"})
+        conn.execute(insert(PurchaseOrder.__table__), [
+            {'purchase_order_number': number, 'supplier': 'M1', 'status': 'Open'} for number in range(1, ORDERS + 1)
+        ])
+        conn.execute(insert(PurchaseOrderItem.__table__), [
+            {'purchase_order_number': number, 'item_number': 'A1', 'quantity': 2, 'unit_price': 3.0}
+            for number in range(1, ORDERS + 1)
+        ])
+
+def export(output_dir, **options):
+    session = Session()
+    try:
+        return pdf_generator.export_purchase_orders(session, str(output_dir), batch_size=BATCH_SIZE, **options)
+    finally:
+        Session.remove()
+
+def test_orders_are_loaded_one_batch_at_a_time(empty_db, tmp_path):
+    create_purchase_orders(empty_db)
+    with QueryCounter(empty_db) as counter:
+        result = export(tmp_path, workers=1)
+
+    assert result == {'orders': ORDERS, 'pages': ORDERS, 'cancelled': False}
+    assert len(os.listdir(tmp_path)) == ORDERS
+    # Three pages of orders and the empty one that ends the export, each with its lines
+    order_pages = [statement for statement in counter.statements if 'FROM purchase_order ' in statement + ' ']
+    assert len(order_pages) == 4 and all('LIMIT' in statement for statement in order_pages)
+
+def test_export_with_worker_processes(empty_db, tmp_path):
+    create_purchase_orders(empty_db)
+    assert export(tmp_path, workers=2) == {'orders': ORDERS, 'pages': ORDERS, 'cancelled': False}
+    assert sorted(os.listdir(tmp_path)) == sorted(f"PO_{number}.pdf" for number in range(1, ORDERS + 1))
+
+def test_a_cancelled_export_reports_what_it_finished(empty_db, tmp_path, monkeypatch):
+    create_purchase_orders(empty_db)
+    cancel_event = threading.Event()
+    render_batch = pdf_generator._render_batch
+
+    def cancel_after_the_first_batch(jobs):
+        cancel_event.set()
+        return render_batch(jobs)
+
+    monkeypatch.setattr(pdf_generator, '_render_batch', cancel_after_the_first_batch)
+    result = export(tmp_path, workers=1, cancel_event=cancel_event)
+
+    assert result == {'orders': BATCH_SIZE, 'pages': BATCH_SIZE, 'cancelled': True}
+    assert len(os.listdir(tmp_path)) == BATCH_SIZE
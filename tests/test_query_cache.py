@@ -0,0 +1,95 @@
+import pytest
+
+from sqlalchemy import select, func, insert, event
+
+from models import Session, ItemInventory
+from query_cache import QueryCache, query_cache, source_tables
+from query_engine import run_query
+from tests.support import QuietTask
+
+ITEM_COUNT = select(func.count()).select_from(ItemInventory)
+
+@pytest.fixture
+def cache(monkeypatch):
+    # The tests run with QUERY_CACHE_ENABLED=0; the write hooks always use the shared instance
+    monkeypatch.setattr(query_cache, 'enabled', True)
+    query_cache.invalidate()
+    yield query_cache
+    query_cache.invalidate()
+
+def test_rows_read_while_a_writer_invalidates_are_not_stored(empty_db):
+    cache = QueryCache(enabled=True)
+
+    def writer_commits_mid_query(conn, cursor, statement, parameters, context, executemany):
+        cache.invalidate({'item_inventory'})
+
+    session = Session()
+    try:
+        event.listen(empty_db, 'before_cursor_execute', writer_commits_mid_query)
+        try:
+            cache.fetch(session, ITEM_COUNT)
+        finally:
+            event.remove(empty_db, 'before_cursor_execute', writer_commits_mid_query)
+        assert cache.stats()['entries'] == 0
+
+        cache.fetch(session, ITEM_COUNT)
+        assert cache.stats()['entries'] == 1
+    finally:
+        Session.remove()
+
+def test_rollback_drops_results_that_saw_uncommitted_writes(empty_db, cache):
+    session = Session()
+    try:
+        session.execute(insert(ItemInventory.__table__), [{'item_number': 'A1'}])
+        keys, rows = cache.fetch(session, ITEM_COUNT)
+        assert rows == [(1,)]
+        session.rollback()
+
+        keys, rows = cache.fetch(session, ITEM_COUNT)
+        assert rows == [(0,)]
+    finally:
+        Session.remove()
+
+def test_commit_by_another_session_invalidates(empty_db, cache):
+    reader, writer = Session.session_factory(), Session.session_factory()
+    try:
+        assert cache.fetch(reader, ITEM_COUNT)[1] == [(0,)]
+        reader.rollback()
+        writer.execute(insert(ItemInventory.__table__), [{'item_number': 'A1'}])
+        writer.commit()
+        assert cache.fetch(reader, ITEM_COUNT)[1] == [(1,)]
+    finally:
+        reader.close()
+        writer.close()
+
+def query_tab(sql, **limits):
+    pages = []
+    session = Session()
+    try:
+        summary = run_query(session, sql, QuietTask(), lambda columns, rows, count, elapsed: pages.extend(rows), **limits)
+    finally:
+        Session.remove()
+    return summary, pages
+
+def test_query_tab_selects_are_cached_until_their_table_is_written(empty_db, cache):
+    sql = "SELECT item_number FROM item_inventory ORDER BY item_number"
+    query_tab("INSERT INTO item_inventory (item_number) VALUES ('A1'), ('A2')")
+
+    first, first_rows = query_tab(sql)
+    second, second_rows = query_tab(sql)
+    assert (first['cached'], second['cached']) == (False, True)
+    assert first_rows == second_rows == [('A1',), ('A2',)]
+
+    query_tab("DELETE FROM item_inventory WHERE item_number = 'A2'")
+    third, third_rows = query_tab(sql)
+    assert not third['cached'] and third_rows == [('A1',)]
+
+def test_query_tab_does_not_cache_truncated_results_or_unknown_tables(empty_db, cache):
+    query_tab("INSERT INTO item_inventory (item_number) VALUES ('A1'), ('A2')")
+    query_tab("SELECT item_number FROM item_inventory", max_rows=1)
+    assert not query_tab("SELECT item_number FROM item_inventory", max_rows=1)[0]['cached']
+
+    # Writes to temporary tables, views or anything else outside models.py are not tracked
+    assert source_tables("SELECT * FROM item_inventory i JOIN scratch s ON s.item_number = i.item_number") is None
+    assert source_tables("SELECT name FROM sqlite_master") is None
+    assert source_tables("SELECT 1") is None
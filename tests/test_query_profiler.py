@@ -0,0 +1,65 @@
+import os
+import subprocess
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from models import QueryCounter, Session, SalesOrder, SalesOrderItem, SlowQuery
+from query_engine import QueryTimeout
+from query_profiler import profile_query, run_logged_query, format_profile
+from tests.support import REPO_DIR, QuietTask, child_command, scratch_environment
+
+LINES = 5001
+
+def no_pages(*page):
+    pass
+
+def test_a_scan_through_a_covering_index_is_a_full_scan(empty_db):
+    with empty_db.begin() as conn:
+        conn.execute(insert(SalesOrder.__table__), [{'sales_order_number': number} for number in range(1, 101)])
+        conn.execute(insert(SalesOrderItem.__table__), [
+            {'sales_order_number': number % 100 + 1, 'line_number': number, 'item_number': 'A1'}
+            for number in range(1, LINES + 1)
+        ])
+
+    sql = "SELECT sales_order_number, line_number FROM sales_order_item WHERE line_number = 3"
+    session = Session()
+    try:
+        with QueryCounter(empty_db) as counter:
+            summary = profile_query(session, sql, QuietTask(), no_pages)
+    finally:
+        Session.remove()
+
+    assert summary['full_scans'] == ['sales_order_item']
+    assert summary['scan_indexes'] == {'sales_order_item': 'ix_sales_order_item_order_line'}
+    assert summary['scanned_rows'] == LINES
+    assert [suggestion['columns'] for suggestion in summary['suggestions']] == [['line_number']]
+    assert "Full table scans: sales_order_item (whole index ix_sales_order_item_order_line)" in format_profile(summary)
+    # Table sizes come from the statistics; nothing reads the table but the profiled query
+    assert [statement for statement in counter.statements if 'count(' in statement.lower()] == []
+
+def test_timed_out_statements_are_logged(backend_engine):
+    sql = ("SELECT pg_sleep(5)" if backend_engine.dialect.name == 'postgresql' else
+           "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT max(i) FROM n")
+    session = sessionmaker(bind=backend_engine)()
+    try:
+        with pytest.raises(QueryTimeout):
+            run_logged_query(session, sql, QuietTask(), no_pages, timeout=0.6)
+        entry = session.scalars(select(SlowQuery)).one()
+    finally:
+        session.close()
+
+    assert entry.sql == sql and entry.calls == 1 and entry.max_ms >= 600
+    assert entry.last_error == "Query stopped after 0.6s."
+
+def test_the_command_line_prints_database_errors(tmp_path):
+    env = dict(os.environ, **scratch_environment(str(tmp_path)))
+    code = ("import runpy, sys\n"
+            "sys.argv = ['query_profiler.py', 'SELECT * FROM no_such_table']\n"
+            "runpy.run_path('query_profiler.py', run_name='__main__')")
+    result = subprocess.run(child_command(code), cwd=REPO_DIR, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 1
+    assert "Query failed: no such table: no_such_table" in result.stdout
+    assert "Traceback" not in result.stderr
@@ -0,0 +1,69 @@
+import datetime
+
+import numpy as np
+from sqlalchemy import select, insert
+
+from erp import main as erp_main
+from models import ItemInventory, PurchaseOrder, PurchaseOrderItem, StockMovement, DRAFT_STATUS, OPEN_STATUS, RECEIVED_STATUS
+from mrp import create_draft_purchase_orders
+from receipts import release_drafts, post_receipts
+
+# MRP only creates drafts, and drafts cannot be received; releasing them is what places the order
+def add_drafts(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), [
+            {'item_number': 'A1', 'in_stock': 5, 'qty_ordered_from_vendors': 2},
+            {'item_number': 'A2', 'in_stock': 0, 'qty_ordered_from_vendors': None}
+        ])
+        conn.execute(insert(PurchaseOrder.__table__), [
+            {'purchase_order_number': number, 'supplier': 'M1', 'status': DRAFT_STATUS,
+             'order_date': datetime.date(2026, 10, 1)} for number in (1, 2)
+        ])
+        conn.execute(insert(PurchaseOrderItem.__table__), [
+            {'purchase_order_number': 1, 'item_number': 'A1', 'quantity': 10},
+            {'purchase_order_number': 1, 'item_number': 'A2', 'quantity': 4},
+            {'purchase_order_number': 2, 'item_number': 'A1', 'quantity': 3}
+        ])
+
+def item_quantities(conn):
+    return {item_number: (in_stock, on_order) for item_number, in_stock, on_order in conn.execute(
+        select(ItemInventory.item_number, ItemInventory.in_stock, ItemInventory.qty_ordered_from_vendors)
+    )}
+
+def test_released_drafts_are_on_order_and_can_be_received(backend_engine):
+    add_drafts(backend_engine)
+    with backend_engine.begin() as conn:
+        assert post_receipts(conn, [1])['skipped'] == [1]
+        assert release_drafts(conn, [1, 3]) == {'orders': [1], 'skipped': [3], 'items': 2}
+        # A second release of the same order does not order its lines twice
+        assert release_drafts(conn, [1])['skipped'] == [1]
+        assert item_quantities(conn) == {'A1': (5, 12), 'A2': (0, 4)}
+
+        assert post_receipts(conn, [1])['orders'] == [1]
+        assert item_quantities(conn) == {'A1': (15, 2), 'A2': (4, 0)}
+        assert conn.execute(select(PurchaseOrder.status).filter_by(purchase_order_number=1)).scalar() == RECEIVED_STATUS
+        assert len(conn.execute(select(StockMovement.id)).all()) == 2
+
+def test_erp_release_all(empty_db):
+    add_drafts(empty_db)
+    assert erp_main(['release']) == 2
+    assert erp_main(['release', '--all']) == 0
+
+    with empty_db.connect() as conn:
+        assert set(conn.execute(select(PurchaseOrder.status)).scalars()) == {OPEN_STATUS}
+        assert item_quantities(conn) == {'A1': (5, 15), 'A2': (0, 4)}
+
+def test_mrp_drafts_are_expected_not_received(backend_engine):
+    plan = {
+        'item_number': np.array(['A1', 'A2']), 'manufacturer': np.array(['M1', 'M2']),
+        'order_quantity': np.array([10.0, 4.0]), 'unit_price': np.array([2.0, np.nan]),
+        'lead_time_days': np.array([7.0, 14.0])
+    }
+    with backend_engine.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), [{'item_number': 'A1'}, {'item_number': 'A2'}])
+        assert create_draft_purchase_orders(conn, plan, datetime.date(2026, 10, 1)) == (2, 2)
+        rows = conn.execute(
+            select(PurchaseOrder.supplier, PurchaseOrder.expected_date, PurchaseOrder.receipt_date)
+            .order_by(PurchaseOrder.supplier)
+        ).all()
+    assert rows == [('M1', datetime.date(2026, 10, 8), None), ('M2', datetime.date(2026, 10, 15), None)]
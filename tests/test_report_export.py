@@ -0,0 +1,54 @@
+import os
+import tracemalloc
+
+from sqlalchemy import insert
+
+import report_export
+from models import ItemInventory
+
+# reportlab holds every page of a PDF until it is saved, so a PDF export is split into files of
+# at most REPORT_PDF_MAX_ROWS rows; its memory then depends on that limit, not on the report size
+PDF_MAX_ROWS = 1000
+
+def insert_items(db_engine, first, last):
+    with db_engine.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), [
+            {'item_number': f"A{number:07d}", 'description': f"Item {number}", 'in_stock': number % 50,
+             'last_purchase_price': 1.5 + number % 9}
+            for number in range(first, last)
+        ])
+
+def export_peak(folder):
+    os.makedirs(folder)
+    tracemalloc.start()
+    try:
+        result = report_export.export_report('inventory', os.path.join(folder, 'items.pdf'), chunk_size=300)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def test_short_pdf_exports_stay_in_one_file(empty_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(report_export, 'REPORT_PDF_MAX_ROWS', PDF_MAX_ROWS)
+    insert_items(empty_db, 0, PDF_MAX_ROWS)
+
+    result = report_export.export_report('inventory', str(tmp_path / 'items.pdf'), chunk_size=300)
+    assert result == {'rows': PDF_MAX_ROWS, 'files': [str(tmp_path / 'items.pdf')]}
+    assert os.listdir(tmp_path) == ['items.pdf']
+
+def test_pdf_export_memory_does_not_grow_with_the_report(empty_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(report_export, 'REPORT_PDF_MAX_ROWS', PDF_MAX_ROWS)
+    insert_items(empty_db, 0, 2 * PDF_MAX_ROWS)
+    # reportlab's font and style caches are filled once per process, outside the measured runs
+    report_export.export_report('inventory-levels', str(tmp_path / 'warm_up.pdf'))
+    small, small_peak = export_peak(str(tmp_path / 'small'))
+    # Four times the rows, and one more so the last file holds a single row
+    insert_items(empty_db, 2 * PDF_MAX_ROWS, 8 * PDF_MAX_ROWS + 1)
+    large, large_peak = export_peak(str(tmp_path / 'large'))
+
+    assert (small['rows'], large['rows']) == (2 * PDF_MAX_ROWS, 8 * PDF_MAX_ROWS + 1)
+    # The files reported are the ones on disk; the chosen name itself no longer exists
+    assert small['files'] == [str(tmp_path / 'small' / f"items_part{part}.pdf") for part in (1, 2)]
+    assert large['files'] == [str(tmp_path / 'large' / f"items_part{part}.pdf") for part in range(1, 10)]
+    assert sorted(os.listdir(tmp_path / 'large')) == [os.path.basename(name) for name in large['files']]
+    assert large_peak < small_peak * 1.25, (f"{small_peak / 1e6:.1f} MB for {small['rows']} rows, "
+                                            f"{large_peak / 1e6:.1f} MB for {large['rows']} rows")
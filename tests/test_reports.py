@@ -0,0 +1,29 @@
+import datetime
+
+from sqlalchemy import select, func, insert
+
+import reports
+from models import Session, BusinessPartner, SalesOrder, SalesByCustomer, SalesByMonth
+
+def test_rollups_built_by_a_report_survive_its_session(empty_db):
+    with empty_db.begin() as conn:
+        conn.execute(insert(BusinessPartner.__table__), [{'bp_code': 'C1'}, {'bp_code': 'C2'}])
+        conn.execute(insert(SalesOrder.__table__), [
+            {'sales_order_number': 1, 'bp_code': 'C1', 'posting_date': datetime.date(2026, 1, 5), 'document_total': 100.0},
+            {'sales_order_number': 2, 'bp_code': 'C2', 'posting_date': datetime.date(2026, 2, 5), 'document_total': 50.0}
+        ])
+
+    # The GUI's task sessions are only ever rolled back
+    session = Session()
+    try:
+        top = reports.top_customers(session)
+        monthly = reports.monthly_sales(session)
+        session.rollback()
+    finally:
+        Session.remove()
+
+    assert top['Total'].to_dict() == {'C1': 100.0, 'C2': 50.0}
+    assert monthly['Total'].tolist() == [100.0, 50.0]
+    with empty_db.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(SalesByCustomer)).scalar() == 2
+        assert conn.execute(select(func.count()).select_from(SalesByMonth)).scalar() == 2
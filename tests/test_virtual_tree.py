@@ -0,0 +1,59 @@
+import tkinter as tk
+import pytest
+
+from sqlalchemy import insert
+
+from models import Session, ItemInventory
+from virtual_tree import PagedTreeview
+
+PAGE_SIZE = 5
+MAX_PAGES = 3
+ITEMS = 50
+
+class InlineRunner:
+    # Runs each page fetch straight away on this thread, so the test can step through the scroll
+    def submit(self, name, work, on_success=None, on_error=None):
+        try:
+            result = work(Session(), None)
+        finally:
+            Session.remove()
+        on_success(result)
+
+@pytest.fixture
+def tree(empty_db):
+    with empty_db.begin() as conn:
+        conn.execute(insert(ItemInventory.__table__), [
+            {'item_number': f"A{number:03d}"} for number in range(1, ITEMS + 1)
+        ])
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display for Tk")
+    root.withdraw()
+    tree = PagedTreeview(root, InlineRunner(), [ItemInventory.item_number], ItemInventory.item_number,
+                         page_size=PAGE_SIZE, max_pages=MAX_PAGES, columns=("Item",), show="headings", height=4)
+    yield tree
+    root.destroy()
+
+def loaded_items(tree):
+    return [tree.item(item, 'values')[0] for item in tree.get_children()]
+
+def test_scrolling_down_keeps_only_the_last_pages_loaded(tree):
+    tree.refresh()
+    while not tree.exhausted:
+        tree.load_next_page()
+    assert loaded_items(tree) == [f"A{number:03d}" for number in range(36, ITEMS + 1)]
+    assert not tree.at_start
+
+def test_scrolling_back_up_fetches_the_dropped_pages_again(tree):
+    tree.refresh()
+    while not tree.exhausted:
+        tree.load_next_page()
+    while not tree.at_start:
+        tree.load_previous_page()
+    assert loaded_items(tree) == [f"A{number:03d}" for number in range(1, 16)]
+    assert not tree.exhausted
+
+    # And down again from there, without skipping or repeating a row
+    tree.load_next_page()
+    assert loaded_items(tree) == [f"A{number:03d}" for number in range(6, 21)]
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from data_generator import generate_data
+from data_import import import_all_data
+from models import engine, init_db, Base, Session, TAB_QUERIES
+from workload_benchmark import REPORTS, workload_cases
+
+# The cases workload_benchmark.py times, on a small generated data set, as pytest-benchmark cases:
+#     python -m pytest tests/test_workload_benchmark.py --benchmark-autosave
+#     python -m pytest tests/test_workload_benchmark.py --benchmark-compare --benchmark-compare-fail=median:25%
+# workload_benchmark.py stays the tool for the large scales and the import timings.
+SCALE = 10000
+ROUNDS = 3
+
+CASES = (
+    [f"tab {name} ({where} page)" for name in TAB_QUERIES for where in ('first', 'middle')]
+    + [f"report {name}" for name in REPORTS]
+    + ["search items", "mrp (plan and draft purchase orders)", "generate_pdf (largest purchase order)"]
+)
+
+@pytest.fixture(scope='module')
+def workload(tmp_path_factory):
+    # Generated and imported once for the whole module; the cases only read it, apart from the MRP drafts
+    folder = os.environ['DATA_FOLDER']
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    generate_data(folder, SCALE)
+    Base.metadata.drop_all(engine)
+    init_db()
+    import_all_data(incremental=False, workers=1)
+
+    session = Session()
+    yield workload_cases(session, str(tmp_path_factory.mktemp('workload')))
+    Session.remove()
+
+def test_every_workload_case_is_benchmarked(workload):
+    assert list(workload) == CASES
+
+@pytest.mark.parametrize('label', CASES)
+def test_workload(benchmark, workload, label):
+    benchmark.group = label.split()[0]
+    benchmark.pedantic(workload[label], rounds=ROUNDS, iterations=1)
@@ -0,0 +1,182 @@
+from tkinter import ttk, messagebox
+from sqlalchemy import select
+import os
+import sys
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from config.config import UI_PAGE_SIZE, UI_MAX_LOADED_PAGES
+
+class PagedTreeview(ttk.Treeview):
+    # Treeview that pages rows in with keyset pagination instead of loading the whole table.
+    # The next page is fetched on the task runner once the user scrolls close to the bottom of what is loaded.
+    # At most max_pages pages stay in the widget: the page furthest from the view is dropped, and fetched
+    # again when the user scrolls back to it, so long scrolls do not grow the tree without bound.
+    def __init__(self, master, task_runner, query_columns, key_column, page_size=UI_PAGE_SIZE,
+                 max_pages=UI_MAX_LOADED_PAGES, **kwargs):
+        super().__init__(master, **kwargs)
+        self.task_runner = task_runner
+        self.query_columns = query_columns
+        self.key_column = key_column
+        self.key_index = [column.key for column in query_columns].index(key_column.key)
+        self.page_size = page_size
+        self.max_pages = max(max_pages, 2)
+        # (first key, last key, item ids) of each loaded page, top to bottom
+        self.pages = []
+        self.last_key = None
+        self.exhausted = False
+        self.at_start = True
+        self.loading = False
+        self.generation = 0
+        self.configure(yscrollcommand=self._on_scroll)
+
+    def refresh(self):
+        # Pages still in flight from before the refresh are dropped when they arrive
+        self.generation += 1
+        self.delete(*self.get_children())
+        self.pages = []
+        self.last_key = None
+        self.exhausted = False
+        self.at_start = True
+        self.loading = False
+        self.load_next_page()
+
+    def page_statement(self):
+        stmt = select(*self.query_columns).order_by(self.key_column).limit(self.page_size)
+        if self.last_key is not None:
+            stmt = stmt.where(self.key_column > self.last_key)
+        return stmt
+
+    def previous_page_statement(self):
+        # The page above the first loaded one, newest key first; prepend_rows puts it back in order
+        first_key = self.pages[0][0]
+        return (select(*self.query_columns).where(self.key_column < first_key)
+                .order_by(self.key_column.desc()).limit(self.page_size))
+
+    def load_next_page(self):
+        if not self.exhausted:
+            self._load_page(self.page_statement(), self.append_rows)
+
+    def load_previous_page(self):
+        if not self.at_start and self.pages:
+            self._load_page(self.previous_page_statement(), self.prepend_rows)
+
+    def _load_page(self, stmt, add_rows):
+        if self.loading:
+            return
+
+        self.loading = True
+        generation = self.generation
+
+        def fetch(session, task):
+            return session.execute(stmt).all()
+
+        def loaded(rows):
+            if generation == self.generation:
+                self.loading = False
+                add_rows(rows)
+
+        def failed(error):
+            if generation == self.generation:
+                self.loading = False
+                messagebox.showerror("Error", f"Could not load rows: {error}")
+
+        self.task_runner.submit("Loading rows", fetch, loaded, failed)
+
+    def append_rows(self, rows):
+        rows_above = self._rows_above_view()
+        items = [self.insert("", "end", values=tuple(row)) for row in rows]
+        if rows:
+            self.pages.append((rows[0][self.key_index], rows[-1][self.key_index], items))
+            self.last_key = rows[-1][self.key_index]
+        self.exhausted = len(rows) < self.page_size
+
+        removed_above = 0
+        if len(self.pages) > self.max_pages:
+            removed_above = self._drop_page(0)
+            self.at_start = False
+        self._keep_view(rows_above, -removed_above)
+
+    def prepend_rows(self, rows):
+        rows = list(reversed(rows))
+        rows_above = self._rows_above_view()
+        items = [self.insert("", index, values=tuple(row)) for index, row in enumerate(rows)]
+        if rows:
+            self.pages.insert(0, (rows[0][self.key_index], rows[-1][self.key_index], items))
+        self.at_start = len(rows) < self.page_size
+
+        if len(self.pages) > self.max_pages:
+            self._drop_page(-1)
+            self.last_key = self.pages[-1][1]
+            self.exhausted = False
+        self._keep_view(rows_above, len(rows))
+
+    def _drop_page(self, index):
+        first_key, last_key, items = self.pages.pop(index)
+        self.delete(*items)
+        return len(items)
+
+    def _rows_above_view(self):
+        return self.yview()[0] * len(self.get_children())
+
+    def _keep_view(self, rows_above, added_above):
+        # Scrolls so the rows the user was looking at stay in place after rows above them changed
+        rows = len(self.get_children())
+        if rows and added_above:
+            self.yview_moveto(max(rows_above + added_above, 0) / rows)
+
+    def show_rows(self, rows):
+        # Replaces the paged rows with a fixed set, e.g. search results; refresh() goes back to paging
+        self.generation += 1
+        self.delete(*self.get_children())
+        self.pages = []
+        self.loading = False
+        for row in rows:
+            self.insert("", "end", values=tuple(row))
+        self.exhausted = True
+        self.at_start = True
+
+    def _on_scroll(self, first, last):
+        if float(last) > 0.9 and not self.exhausted:
+            self.after_idle(self.load_next_page)
+        elif float(first) < 0.1 and not self.at_start:
+            self.after_idle(self.load_previous_page)
+
+class ResultGrid(ttk.Treeview):
+    # Treeview for ad-hoc query results. Rows stream in from a background query and are buffered;
+    # only the pages the user has scrolled to are inserted into the widget.
+    def __init__(self, master, page_size=UI_PAGE_SIZE, **kwargs):
+        super().__init__(master, show="headings", **kwargs)
+        self.page_size = page_size
+        self.rows = []
+        self.shown = 0
+        self.configure(yscrollcommand=self._on_scroll)
+
+    def reset(self, columns):
+        self.delete(*self.get_children())
+        self.rows = []
+        self.shown = 0
+        # Column ids are positional because a result can repeat a column name
+        column_ids = [f"c{index}" for index in range(len(columns))]
+        self["columns"] = column_ids
+        for column_id, name in zip(column_ids, columns):
+            self.heading(column_id, text=name)
+            self.column(column_id, width=100)
+
+    def append_rows(self, rows):
+        self.rows.extend(rows)
+        if self.shown < self.page_size:
+            self.show_more()
+
+    def show_more(self):
+        end = min(self.shown + self.page_size, len(self.rows))
+        for row in self.rows[self.shown:end]:
+            self.insert("", "end", values=row)
+        self.shown = end
+
+    def _on_scroll(self, first, last):
+        if float(last) > 0.9 and self.shown < len(self.rows):
+            self.after_idle(self.show_more)
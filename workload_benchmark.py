@@ -0,0 +1,214 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add the project root directory to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from config.config import (BENCHMARK_HISTORY_FILE, BENCHMARK_BASELINE_RUNS, BENCHMARK_TOLERANCE, BENCHMARK_MIN_DELTA,
+                           UI_PAGE_SIZE)
+from data_generator import generate_data, parse_scale
+
+# Times the ERP workload on a generated data set: the full and the unchanged re-import, the first
+# and a middle page of every tab, each report behind the Reports tab, a search, an MRP run and a
+# purchase order PDF. Each case runs --repeat times and the median is kept.
+# The cases run in a fresh interpreter with DATA_FOLDER and DATABASE_URI pointing at the generated
+# files and a scratch SQLite database (or --database-uri), and with the query cache switched off
+# so the reports do their real work on every run.
+# Every run is appended to the history file. A case is a regression when it is more than
+# BENCHMARK_TOLERANCE slower than the median of the last BENCHMARK_BASELINE_RUNS runs at the same
+# scale on the same database, and by more than BENCHMARK_MIN_DELTA; the exit status is then 1,
+# so CI can fail the build on it.
+#     python workload_benchmark.py --scale 100k [--repeat 3] [--history ci/benchmark_history.jsonl]
+#     python workload_benchmark.py --scale 10M --data-dir /data/erp_10m --repeat 1
+
+REPORTS = ['inventory_levels', 'sales_over_time', 'reorder_items', 'low_stock_items', 'top_customers', 'monthly_sales']
+
+def _timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def workload_cases(session, workdir):
+    # label -> function for every case that reads the loaded data; tests/test_workload_benchmark.py
+    # runs the same cases under pytest-benchmark
+    from sqlalchemy import select, func
+    from models import engine, PurchaseOrder, PurchaseOrderItem, TAB_QUERIES, PURCHASE_ORDER_DETAIL
+    from mrp import load_planning_data, plan_requirements, create_draft_purchase_orders
+    from pdf_generator import generate_pdf
+    from search import search
+    import reports
+
+    def page(name, middle):
+        columns, key = TAB_QUERIES[name]
+        stmt = select(*columns).order_by(key).limit(UI_PAGE_SIZE)
+        if middle:
+            # The page PagedTreeview loads after scrolling halfway down the whole table
+            rows = session.execute(select(func.count()).select_from(key.table)).scalar()
+            last_key = session.execute(select(key).order_by(key).offset(rows // 2).limit(1)).scalar()
+            stmt = stmt.where(key > last_key) if last_key is not None else stmt
+        return lambda: session.execute(stmt).all()
+
+    def report(name):
+        def run():
+            getattr(reports, name)(session)
+            session.rollback()
+        return run
+
+    def plan_purchases():
+        with engine.begin() as conn:
+            create_draft_purchase_orders(conn, plan_requirements(load_planning_data(conn)))
+
+    def export_largest_purchase_order():
+        number = session.execute(
+            select(PurchaseOrderItem.purchase_order_number)
+            .group_by(PurchaseOrderItem.purchase_order_number)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar() or session.execute(select(func.min(PurchaseOrder.purchase_order_number))).scalar()
+        order = session.scalars(
+            select(PurchaseOrder).options(*PURCHASE_ORDER_DETAIL).filter_by(purchase_order_number=number)
+        ).first()
+        generate_pdf(order, os.path.join(workdir, 'purchase_order.pdf'))
+        session.rollback()
+
+    cases = {}
+    for name in TAB_QUERIES:
+        cases[f"tab {name} (first page)"] = page(name, False)
+        cases[f"tab {name} (middle page)"] = page(name, True)
+    for name in REPORTS:
+        cases[f"report {name}"] = report(name)
+    cases["search items"] = lambda: search(session.connection(), 'items', "compact print")
+    cases["mrp (plan and draft purchase orders)"] = plan_purchases
+    cases["generate_pdf (largest purchase order)"] = export_largest_purchase_order
+    return cases
+
+def run_cases(repeat, workdir):
+    # Runs in the child interpreter, so these imports see the benchmark's DATABASE_URI and DATA_FOLDER
+    from models import engine, Session
+    from data_import import import_all_data
+
+    session = Session()
+    results = {}
+    def measure(label, function):
+        results[label] = _timed(function, repeat)
+        print(f"{label}: {results[label]:.3f}s", flush=True)
+
+    # The imports come first: every other case reads what they load
+    measure("import_all_data (full)", lambda: import_all_data(incremental=False))
+    measure("import_all_data (unchanged)", lambda: import_all_data(incremental=True))
+    for label, function in workload_cases(session, workdir).items():
+        measure(label, function)
+
+    Session.remove()
+    return {'database': engine.dialect.name, 'cases': results}
+
+def _git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=current_dir, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def read_history(filename):
+    if not os.path.exists(filename):
+        return []
+    with open(filename, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def baselines(history, scale, database, runs=BENCHMARK_BASELINE_RUNS):
+    # Median of each case over the last `runs` comparable runs
+    comparable = [run for run in history if run['scale'] == scale and run['database'] == database][-runs:]
+    timings = {}
+    for run in comparable:
+        for label, elapsed in run['cases'].items():
+            timings.setdefault(label, []).append(elapsed)
+    return {label: statistics.median(values) for label, values in timings.items()}, len(comparable)
+
+def is_regression(elapsed, baseline, tolerance=BENCHMARK_TOLERANCE, min_delta=BENCHMARK_MIN_DELTA):
+    return elapsed > baseline * (1 + tolerance) and elapsed - baseline > min_delta
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ERP workload on generated data and flag regressions.")
+    parser.add_argument('--scale', type=parse_scale, default=parse_scale('100k'),
+                        help="sales order lines to generate, e.g. 10k, 1M or 10M (default 100k)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per case; the median is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help="reuse (or keep) the generated files in this directory")
+    parser.add_argument('--database-uri', help="benchmark against this database instead of a scratch SQLite file; "
+                                               "its tables are reloaded, so never point it at real data")
+    parser.add_argument('--history', default=BENCHMARK_HISTORY_FILE, help="JSON lines file the runs are appended to")
+    parser.add_argument('--no-save', action='store_true', help="compare with the history without appending this run")
+    parser.add_argument('--verbose', action='store_true', help="show the output of the workload itself")
+    parser.add_argument('--run-cases', metavar='RESULTS_FILE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_cases:
+        result = run_cases(args.repeat, os.path.dirname(args.run_cases))
+        with open(args.run_cases, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = args.data_dir or os.path.join(workdir, 'data')
+        if not os.path.exists(os.path.join(data_dir, 'Sales+Order+Line+Item.txt')):
+            started = time.perf_counter()
+            sizes = generate_data(data_dir, args.scale, args.seed)
+            print(f"Generated {sizes['sales_order_lines']:,} sales order lines and their masters "
+                  f"in {time.perf_counter() - started:.2f}s.")
+
+        results_file = os.path.join(workdir, 'results.json')
+        env = dict(os.environ, DATA_FOLDER=data_dir, QUERY_CACHE_ENABLED='0',
+                   DATABASE_URI=args.database_uri or 'sqlite:///' + os.path.join(workdir, 'benchmark.db'))
+        command = [sys.executable, os.path.abspath(__file__), '--run-cases', results_file, '--repeat', str(args.repeat)]
+        result = subprocess.run(command, cwd=current_dir, env=env, capture_output=not args.verbose, text=True)
+        if result.returncode != 0:
+            print(f"The workload failed:\n{result.stderr or ''}")
+            return 2
+        with open(results_file, encoding='utf-8') as f:
+            measured = json.load(f)
+
+    history = read_history(args.history)
+    baseline, runs = baselines(history, args.scale, measured['database'])
+    print(f"Scale {args.scale:,} on {measured['database']}, median of {args.repeat} runs; "
+          f"baseline from {runs} earlier runs (tolerance {BENCHMARK_TOLERANCE:.0%}).")
+
+    regressions = []
+    for label, elapsed in measured['cases'].items():
+        if label not in baseline:
+            print(f"  {label}: {elapsed:.3f}s (no baseline)")
+            continue
+        change = elapsed / baseline[label] - 1 if baseline[label] else 0.0
+        regressed = is_regression(elapsed, baseline[label])
+        if regressed:
+            regressions.append(label)
+        print(f"  {label}: {elapsed:.3f}s (baseline {baseline[label]:.3f}s, {change:+.0%}) {'REGRESSION' if regressed else 'OK'}")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'run_at': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': _git_commit(),
+                'scale': args.scale, 'seed': args.seed, 'repeat': args.repeat, 'database': measured['database'],
+                'python': platform.python_version(), 'cases': measured['cases']
+            }) + '\n')
+
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())